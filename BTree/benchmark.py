@@ -0,0 +1,186 @@
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+
+from btree import BTree, ArrayBTreeNode
+from bplustree import BPlusTree
+
+TREES = {
+    "btree": lambda t: BTree(t),
+    "array": lambda t: BTree(t, ArrayBTreeNode),
+    "bplus": lambda t: BPlusTree(t),
+}
+
+
+'''
+Workloads: each returns (initial keys to bulk load, list of (operation, argument))
+'''
+def insertOrder(order):
+    def workload(n, rnd):
+        keys = rnd.sample(range(n * 10), n)
+        if order == "sorted":
+            keys.sort()
+        elif order == "reverse":
+            keys.sort(reverse=True)
+        elif order == "zigzag":
+            # Adversarial for right-biased splits: alternate smallest / largest remaining
+            keys.sort()
+            keys = [keys[i // 2] if i % 2 == 0 else keys[-1 - i // 2] for i in range(n)]
+        return [], [("insert", key) for key in keys]
+    return workload
+
+
+def mixed(insertShare, deleteShare):
+    """
+    Starts from n keys and runs n operations: the given shares of inserts and
+    deletes, the rest split evenly between select, rank and 100-wide ranges.
+    """
+    def workload(n, rnd):
+        initial = rnd.sample(range(n * 10), n)
+        live = list(initial)
+        operations = []
+        for _ in range(n):
+            r = rnd.random()
+            if r < insertShare:
+                key = rnd.randrange(n * 10)
+                live.append(key)
+                operations.append(("insert", key))
+            elif r < insertShare + deleteShare and live:
+                i = rnd.randrange(len(live))
+                live[i], live[-1] = live[-1], live[i]
+                operations.append(("delete", live.pop()))
+            else:
+                query = rnd.choice(("select", "rank", "keysInRange"))
+                if query == "select":
+                    operations.append(("select", rnd.randint(1, max(len(live), 1))))
+                elif query == "rank":
+                    operations.append(("rank", rnd.choice(live) if live else 0))
+                else:
+                    x = rnd.randrange(n * 10)
+                    operations.append(("keysInRange", (x, x + 100)))
+        return initial, operations
+    return workload
+
+
+WORKLOADS = {
+    "insert-random": insertOrder("random"),
+    "insert-sorted": insertOrder("sorted"),
+    "insert-reverse": insertOrder("reverse"),
+    "insert-zigzag": insertOrder("zigzag"),
+    "mixed-write-heavy": mixed(0.4, 0.4),
+    "mixed-balanced": mixed(0.25, 0.25),
+    "mixed-read-heavy": mixed(0.05, 0.05),
+}
+
+
+def runOperations(tree, operations):
+    for operation, argument in operations:
+        if operation == "insert":
+            tree.insert(argument)
+        elif operation == "delete":
+            tree.delete(argument)
+        elif operation == "select":
+            tree.select(argument)
+        elif operation == "rank":
+            tree.rank(argument)
+        else:
+            tree.keysInRange(*argument)
+
+
+def treeShape(tree):
+    """
+    Returns (height, node count, fill ratio): the fraction of the 2t - 1 key
+    slots in use, averaged over all nodes.
+    """
+    if tree.root is None:
+        return 0, 0, 0.0
+
+    height = 0
+    nodes = 0
+    keys = 0
+    level = [tree.root]
+    while level:
+        height += 1
+        nodes += len(level)
+        keys += sum(len(node.keys) for node in level)
+        level = [child for node in level if not node.leaf for child in node.children]
+    return height, nodes, keys / (nodes * (2 * tree.t - 1))
+
+
+def measure(treeName, t, workloadName, n, seed):
+    """
+    Runs one workload twice on fresh trees: once for timing, once under
+    tracemalloc for peak memory.
+    """
+    initial, operations = WORKLOADS[workloadName](n, random.Random(seed))
+
+    tree = TREES[treeName](t)
+    tree.bulk_load(initial)
+    start = time.perf_counter()
+    runOperations(tree, operations)
+    seconds = time.perf_counter() - start
+    height, nodes, fill = treeShape(tree)
+
+    tracemalloc.start()
+    traced = TREES[treeName](t)
+    traced.bulk_load(initial)
+    runOperations(traced, operations)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "tree": treeName,
+        "t": t,
+        "workload": workloadName,
+        "n": n,
+        "operations": len(operations),
+        "seconds": round(seconds, 6),
+        "ops_per_sec": round(len(operations) / seconds, 1) if seconds else None,
+        "peak_memory_bytes": peak,
+        "height": height,
+        "nodes": nodes,
+        "fill_ratio": round(fill, 4),
+        "final_size": tree.size,
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark BTree variants on synthetic workloads")
+    parser.add_argument("-n", type=int, default=20000, help="keys / operations per workload")
+    parser.add_argument("-t", type=int, nargs="+", default=[2, 4, 16, 64, 256], help="minimum degrees to sweep")
+    parser.add_argument("--trees", nargs="+", choices=sorted(TREES), default=["btree"])
+    parser.add_argument("--workloads", nargs="+", choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for treeName in args.trees:
+        for t in args.t:
+            for workloadName in args.workloads:
+                result = measure(treeName, t, workloadName, args.n, args.seed)
+                results.append(result)
+                print(f"{treeName:6s} t={t:<4d} {workloadName:18s} {result['ops_per_sec']:>12,.0f} ops/s "
+                      f"peak {result['peak_memory_bytes'] / 2 ** 20:7.1f} MiB height {result['height']} "
+                      f"fill {result['fill_ratio']:.2f}", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"n": args.n, "t": args.t, "seed": args.seed},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as out_file:
+            json.dump(report, out_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
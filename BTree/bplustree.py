@@ -0,0 +1,482 @@
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from btree import BTree, runCommands, millerRabin, FLAG_UNKNOWN, FLAG_PRIME, FLAG_COMPOSITE
+
+
+class BPlusTreeNode:
+    __slots__ = ("t", "keys", "flags", "children", "sizes", "leaf", "next")
+
+    def __init__(self, t, isLeaf=False):
+        self.t = t
+        self.leaf = isLeaf
+        # Leaves hold up to 2t - 1 keys and link to the next leaf in key order.
+        # Internal nodes hold up to 2t children; keys[i] separates children[i]
+        # and children[i + 1], with every key of children[i] lying between
+        # keys[i - 1] and keys[i] (inclusive, since keys may repeat)
+        self.keys = []
+        # Primality flags of a leaf's keys (see BTreeNode.flags); separators
+        # are copies of leaf keys and carry none
+        self.flags = bytearray()
+        self.children = () if isLeaf else []
+        # sizes[i] is the number of keys in the subtree rooted at children[i]
+        self.sizes = () if isLeaf else array("q")
+        self.next = None
+
+    def size(self):
+        return len(self.keys) if self.leaf else sum(self.sizes)
+
+    def occupancy(self):
+        """
+        Returns the number of keys of a leaf or children of an internal node.
+        """
+        return len(self.keys) if self.leaf else len(self.children)
+
+    def minimum(self):
+        """
+        Returns the smallest occupancy allowed for a non-root node.
+        """
+        return self.t - 1 if self.leaf else self.t
+
+    '''
+    Insertion
+    '''
+    def insertKey(self, key):
+        """
+        Inserts a key into the subtree rooted at this node.
+        Returns (separator, newRightNode) if this node had to split, else None.
+        """
+        if self.leaf:
+            i = bisect_right(self.keys, key)
+            self.keys.insert(i, key)
+            self.flags.insert(i, FLAG_UNKNOWN)
+            if len(self.keys) == 2 * self.t:
+                return self.splitLeaf()
+            return None
+
+        i = bisect_right(self.keys, key)
+        self.sizes[i] += 1
+        split = self.children[i].insertKey(key)
+        if split is not None:
+            separator, right = split
+            rightSize = right.size()
+            self.keys.insert(i, separator)
+            self.children.insert(i + 1, right)
+            self.sizes[i] -= rightSize
+            self.sizes.insert(i + 1, rightSize)
+            if len(self.children) == 2 * self.t + 1:
+                return self.splitInternal()
+        return None
+
+    def splitLeaf(self):
+        """
+        Moves the upper t keys into a new right leaf; its first key becomes the
+        separator copied up into the parent.
+        """
+        right = BPlusTreeNode(self.t, True)
+        right.keys = self.keys[self.t:]
+        right.flags = self.flags[self.t:]
+        del self.keys[self.t:]
+        del self.flags[self.t:]
+        right.next = self.next
+        self.next = right
+        return right.keys[0], right
+
+    def splitInternal(self):
+        """
+        Splits an internal node with 2t + 1 children into t and t + 1 children,
+        moving the separator between them up into the parent.
+        """
+        right = BPlusTreeNode(self.t, False)
+        separator = self.keys[self.t - 1]
+        right.keys = self.keys[self.t:]
+        right.children = self.children[self.t:]
+        right.sizes = self.sizes[self.t:]
+        del self.keys[self.t - 1:]
+        del self.children[self.t:]
+        del self.sizes[self.t:]
+        return separator, right
+
+    '''
+    Deletion
+    '''
+    def deleteKey(self, key):
+        """
+        Deletes one occurrence of key from the subtree rooted at this node.
+        Returns True if the key was found and removed, else False. Children
+        left under the minimum are rebalanced on the way back up.
+        """
+        if self.leaf:
+            i = bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+                del self.flags[i]
+                return True
+            return False
+
+        # Copies of key may continue into the children after a separator equal to it
+        i = bisect_left(self.keys, key)
+        while True:
+            if self.children[i].deleteKey(key):
+                break
+            if i == len(self.keys) or self.keys[i] != key:
+                return False
+            i += 1
+
+        self.sizes[i] -= 1
+        child = self.children[i]
+        if child.occupancy() < child.minimum():
+            self.rebalance(i)
+        return True
+
+    def rebalance(self, index):
+        """
+        Restores the minimum occupancy of the child at index by borrowing from
+        a sibling or merging with one.
+        """
+        minimum = self.children[index].minimum()
+
+        if index > 0 and self.children[index - 1].occupancy() > minimum:
+            self.borrowLeftSibling(index)
+        elif index < len(self.keys) and self.children[index + 1].occupancy() > minimum:
+            self.borrowRightSibling(index)
+        elif index < len(self.keys):
+            self.merge(index)
+        else:
+            self.merge(index - 1)
+
+    def borrowLeftSibling(self, index):
+        """
+        Moves the last key (leaf) or child (internal) of the left sibling into
+        the child at index.
+        """
+        child = self.children[index]
+        left = self.children[index - 1]
+
+        if child.leaf:
+            child.keys.insert(0, left.keys.pop())
+            child.flags.insert(0, left.flags.pop())
+            self.keys[index - 1] = child.keys[0]
+            moved = 1
+        else:
+            child.keys.insert(0, self.keys[index - 1])
+            self.keys[index - 1] = left.keys.pop()
+            child.children.insert(0, left.children.pop())
+            moved = left.sizes.pop()
+            child.sizes.insert(0, moved)
+
+        self.sizes[index] += moved
+        self.sizes[index - 1] -= moved
+
+    def borrowRightSibling(self, index):
+        """
+        Moves the first key (leaf) or child (internal) of the right sibling into
+        the child at index.
+        """
+        child = self.children[index]
+        right = self.children[index + 1]
+
+        if child.leaf:
+            child.keys.append(right.keys.pop(0))
+            child.flags.append(right.flags.pop(0))
+            self.keys[index] = right.keys[0]
+            moved = 1
+        else:
+            child.keys.append(self.keys[index])
+            self.keys[index] = right.keys.pop(0)
+            child.children.append(right.children.pop(0))
+            moved = right.sizes.pop(0)
+            child.sizes.append(moved)
+
+        self.sizes[index] += moved
+        self.sizes[index + 1] -= moved
+
+    def merge(self, index):
+        """
+        Merges the child at index with its right sibling and drops the
+        separator between them (internal children pull it down).
+        """
+        left = self.children[index]
+        right = self.children[index + 1]
+
+        if left.leaf:
+            left.keys += right.keys
+            left.flags += right.flags
+            left.next = right.next
+        else:
+            left.keys.append(self.keys[index])
+            left.keys += right.keys
+            left.children += right.children
+            left.sizes += right.sizes
+
+        self.sizes[index] += self.sizes[index + 1]
+        del self.keys[index]
+        del self.children[index + 1]
+        del self.sizes[index + 1]
+
+    '''
+    Traversal
+    '''
+    def iterRuns(self, start):
+        """
+        Yields (leaf, i, len(leaf.keys)) from the leaf holding the first key
+        >= start along the leaf chain (see BTreeNode.iterRuns).
+        """
+        node = self
+        while not node.leaf:
+            node = node.children[bisect_left(node.keys, start)]
+        i = bisect_left(node.keys, start)
+        while node is not None:
+            if i < len(node.keys):
+                yield node, i, len(node.keys)
+            node, i = node.next, 0
+
+    def flagsChanged(self):
+        pass
+
+
+class BPlusTree(BTree):
+    """
+    B+-tree with the same API as BTree. Every key lives in a leaf and the
+    leaves are linked in key order, so range scans descend once and then walk
+    the leaf chain linearly. Internal nodes only hold separators and per-child
+    subtree sizes for select and rank.
+    """
+
+    def __init__(self, t):
+        super().__init__(t, BPlusTreeNode)
+
+    def insert(self, key):
+        if self.root is None:
+            self.root = BPlusTreeNode(self.t, True)
+
+        split = self.root.insertKey(key)
+        if split is not None:
+            # Root split -> grow tree height
+            separator, right = split
+            newRoot = BPlusTreeNode(self.t, False)
+            newRoot.keys.append(separator)
+            newRoot.children += [self.root, right]
+            newRoot.sizes.extend([self.root.size(), right.size()])
+            self.root = newRoot
+        self.size += 1
+
+    def delete(self, key):
+        if self.root is None:
+            return
+
+        if self.root.deleteKey(key):
+            self.size -= 1
+
+        # Shrink height if the root is left with a single child
+        if not self.root.leaf and len(self.root.children) == 1:
+            self.root = self.root.children[0]
+        elif self.root.leaf and not self.root.keys:
+            self.root = None
+
+    def bulk_load(self, keys, presorted=False, fill=1.0):
+        """
+        Replaces the contents of the tree with `keys`, packing them into
+        linked leaves and building the internal levels bottom-up.
+        `fill` is the target fraction of the 2t - 1 leaf slots (and 2t child
+        slots) used per node; nodes never drop below the minimum.
+        """
+        if not 0 < fill <= 1:
+            raise ValueError("fill must be in (0, 1]")
+
+        keys = list(keys) if presorted else sorted(keys)
+        self.root = None
+        self.size = len(keys)
+        if not keys:
+            return
+
+        perNode = max(self.t - 1, min(2 * self.t - 1, round(fill * (2 * self.t - 1))))
+
+        nodes = []
+        firstKeys = []
+        position = 0
+        for count in self.groupSizes(len(keys), perNode):
+            leaf = BPlusTreeNode(self.t, True)
+            leaf.keys = keys[position:position + count]
+            leaf.flags = bytearray(count)
+            if nodes:
+                nodes[-1].next = leaf
+            nodes.append(leaf)
+            firstKeys.append(leaf.keys[0])
+            position += count
+
+        # Each parent's separators are the smallest keys of its children after the first
+        while len(nodes) > 1:
+            parents = []
+            parentFirstKeys = []
+            position = 0
+            for count in self.groupSizes(len(nodes), perNode + 1):
+                parent = BPlusTreeNode(self.t, False)
+                parent.children = nodes[position:position + count]
+                parent.keys = firstKeys[position + 1:position + count]
+                parent.sizes.extend(child.size() for child in parent.children)
+                parents.append(parent)
+                parentFirstKeys.append(firstKeys[position])
+                position += count
+            nodes = parents
+            firstKeys = parentFirstKeys
+
+        self.root = nodes[0]
+
+    def findLeaf(self, key):
+        """
+        Descends to the leaf where the first key >= key would be, returning
+        (leaf, index in leaf, number of keys < key).
+        """
+        smaller = 0
+        node = self.root
+        while not node.leaf:
+            i = bisect_left(node.keys, key)
+            smaller += sum(node.sizes[:i])
+            node = node.children[i]
+        i = bisect_left(node.keys, key)
+        return node, i, smaller + i
+
+    def countLess(self, key, inclusive=False):
+        if self.root is None:
+            return 0
+        search = bisect_right if inclusive else bisect_left
+        result = 0
+        node = self.root
+        while not node.leaf:
+            i = search(node.keys, key)
+            result += sum(node.sizes[:i])
+            node = node.children[i]
+        return result + search(node.keys, key)
+
+    def select(self, k):
+        """
+        Returns the k-th smallest key (1-indexed), or -1 if invalid.
+        """
+        if self.root is None or not 1 <= k <= self.size:
+            return -1
+
+        node = self.root
+        while not node.leaf:
+            bounds = list(accumulate(node.sizes))
+            i = bisect_left(bounds, k)
+            if i:
+                k -= bounds[i - 1]
+            node = node.children[i]
+        return node.keys[k - 1]
+
+    def select_many(self, ks):
+        return [self.select(k) for k in ks]
+
+    def rank(self, key):
+        """
+        Returns the 1-indexed position of `key` in sorted order if it exists,
+        otherwise -1.
+        """
+        if self.root is None:
+            return -1
+
+        leaf, i, smaller = self.findLeaf(key)
+        # The first key >= key may sit at the start of the next leaf
+        if i == len(leaf.keys):
+            leaf, i = leaf.next, 0
+        if leaf is not None and leaf.keys[i] == key:
+            return smaller + 1
+        return -1
+
+    def rank_many(self, keys):
+        return [self.rank(key) for key in keys]
+
+    def isPrime(self, n):
+        """
+        Returns True if n is prime, else False, using the flag of the leaf
+        copy of n when n is a key.
+        """
+        n = int(n)
+        if self.root is not None:
+            leaf, i, _ = self.findLeaf(n)
+            if i == len(leaf.keys):
+                leaf, i = leaf.next, 0
+            if leaf is not None and leaf.keys[i] == n:
+                if leaf.flags[i] == FLAG_UNKNOWN:
+                    leaf.flags[i] = FLAG_PRIME if millerRabin(n) else FLAG_COMPOSITE
+                return leaf.flags[i] == FLAG_PRIME
+        return millerRabin(n)
+
+    def iter_range(self, x, y):
+        """
+        Lazily yields all keys k such that x <= k <= y in ascending order:
+        one descent to x, then a linear walk along the leaf chain.
+        """
+        if self.root is None or x > y:
+            return iter(())
+        leaf, i, _ = self.findLeaf(x)
+        return self.walkLeaves(leaf, i, y)
+
+    def walkLeaves(self, leaf, i, y=None):
+        while leaf is not None:
+            end = len(leaf.keys) if y is None else bisect_right(leaf.keys, y)
+            yield from leaf.keys[i:end]
+            if end < len(leaf.keys):
+                return
+            leaf, i = leaf.next, 0
+
+    def iter_keys(self, start=None, reverse=False):
+        """
+        Lazily yields the keys in ascending order from the first key >= start,
+        or in descending order from the last key <= start if reverse is True.
+        Forward scans walk the leaf chain; reverse scans use an explicit stack
+        since the chain only links forwards.
+        """
+        if self.root is None:
+            return iter(())
+        if reverse:
+            return self.iterReverse(start)
+        if start is None:
+            node = self.root
+            while not node.leaf:
+                node = node.children[0]
+            return self.walkLeaves(node, 0)
+        leaf, i, _ = self.findLeaf(start)
+        return self.walkLeaves(leaf, i)
+
+    def iterReverse(self, start):
+        """
+        Yields keys <= start (all keys if start is None) in descending order.
+        Stack entries (node, i) mean children[:i] of node are still pending.
+        """
+        stack = []
+        node = self.root
+        while not node.leaf:
+            i = len(node.keys) if start is None else bisect_right(node.keys, start)
+            stack.append((node, i))
+            node = node.children[i]
+        end = len(node.keys) if start is None else bisect_right(node.keys, start)
+        yield from reversed(node.keys[:end])
+
+        while stack:
+            node, i = stack.pop()
+            if i == 0:
+                continue
+            stack.append((node, i - 1))
+            child = node.children[i - 1]
+            while not child.leaf:
+                stack.append((child, len(child.children) - 1))
+                child = child.children[-1]
+            yield from reversed(child.keys)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print("Usage: python bplustree.py <t> <keystoinsert.txt> <keystodelete.txt> <commands.txt>")
+        sys.exit(1)
+
+    tree = BPlusTree(int(sys.argv[1]))
+    with open(sys.argv[2], 'r') as f:
+        tree.bulk_load(int(line) for line in f if line.strip() != "")
+    with open(sys.argv[3], 'r') as f:
+        tree.delete_many(int(line) for line in f if line.strip() != "")
+    with open(sys.argv[4], 'r') as cmd_file, open("bplustree_output.txt", 'w') as out_file:
+        runCommands(tree, cmd_file, out_file)
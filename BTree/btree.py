@@ -1,13 +1,106 @@
 import sys
 import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import partial
+from itertools import accumulate, compress, groupby, takewhile
+from operator import add, ge, itemgetter
+
+# Keys up to SIEVE_LIMIT are classified by a segmented sieve when a range query
+# has enough unclassified keys; anything else falls back to Miller-Rabin.
+SIEVE_LIMIT = 1 << 40
+SIEVE_SEGMENT = 1 << 20
+SIEVE_DENSITY = 256
+
+# Values of a node's primality flags; flags[i] describes keys[i]
+FLAG_UNKNOWN = 0
+FLAG_COMPOSITE = 1
+FLAG_PRIME = 2
+# Translation tables between flags and classifyKeys' 0/1 prime masks
+PRIME_MASK = bytes(i == FLAG_PRIME for i in range(256))
+MASK_FLAGS = bytes.maketrans(b"\0\1", bytes((FLAG_COMPOSITE, FLAG_PRIME)))
+# primesInRange classifies about this many keys at once, so paged trees do not
+# keep every visited node alive
+CLASSIFY_BATCH = 1 << 16
+
+# Batch deletes touching at least 1/REBUILD_FRACTION of the keys rebuild the tree
+# from the survivors instead of deleting key by key
+REBUILD_FRACTION = 8
+
+# select_many / rank_many answer batches smaller than this one query at a time
+BATCH_MIN = 8
+
+# Deterministic Miller-Rabin witnesses for every n < 3.3 * 10^24 (covers 64-bit keys)
+MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
 
 class BTreeNode:
+    # Nodes are the bulk of the tree's memory, so skip the per-instance __dict__
+    __slots__ = ("t", "keys", "flags", "children", "sizes", "leaf", "version")
+
     def __init__(self, t, isLeaf=False):
         self.t = t
-        self.keys = [None] * (2 * self.t - 1)
-        self.children = [None] * (2 * self.t)
-        self.count = 0
         self.leaf = isLeaf
+        # Copy-on-write generation: a node may only be modified in place by a
+        # parent of the same version (see ownChild)
+        self.version = 0
+        # keys, children and sizes hold exactly count, count + 1 and count + 1
+        # entries; leaves share an empty tuple instead of child arrays
+        self.keys = self.newKeys()
+        # flags[i] caches the primality of keys[i] (FLAG_*) and moves with it
+        self.flags = bytearray()
+        self.children = () if isLeaf else []
+        # sizes[i] is the number of keys in the subtree rooted at children[i]
+        self.sizes = () if isLeaf else array("q")
+
+    @staticmethod
+    def newKeys():
+        """
+        Returns an empty key container for a node.
+        """
+        return []
+
+    def makeNode(self, isLeaf):
+        """
+        Creates a new node of the same kind and version as this one.
+        """
+        node = type(self)(self.t, isLeaf)
+        node.version = self.version
+        return node
+
+    def copy(self, version):
+        """
+        Returns a shallow copy of this node tagged with the given version.
+        """
+        node = self.makeNode(self.leaf)
+        node.keys = self.keys[:]
+        node.flags = self.flags[:]
+        node.children = self.children[:]
+        node.sizes = self.sizes[:]
+        node.version = version
+        return node
+
+    def ownChild(self, index):
+        """
+        Returns children[index], first replacing it with a private copy if it
+        belongs to an older version (i.e. may be shared with a published
+        snapshot). Must be called before a child is modified.
+        """
+        child = self.children[index]
+        if child.version != self.version:
+            child = child.copy(self.version)
+            self.children[index] = child
+        return child
+
+    def discard(self):
+        """
+        Called once the node has been unlinked from the tree.
+        """
+        pass
+
+    @property
+    def count(self):
+        return len(self.keys)
 
     '''
     Insertion
@@ -16,70 +109,58 @@ class BTreeNode:
         """
         Splits the full child at an index into two nodes and promotes the median key.
         """
-        fullChild = self.children[index]
-        newRightNode = BTreeNode(self.t, fullChild.leaf)
+        fullChild = self.ownChild(index)
+        newRightNode = fullChild.makeNode(fullChild.leaf)
 
         # Median key to be promoted
         median = fullChild.keys[self.t - 1]
 
         # Move the upper half of keys from fullChild into newRightNode
-        for i in range(self.t - 1):
-            newRightNode.keys[i] = fullChild.keys[i + self.t]
-
-        newRightNode.count = self.t - 1
+        newRightNode.keys = fullChild.keys[self.t:]
+        newRightNode.flags = fullChild.flags[self.t:]
+        flag = fullChild.flags[self.t - 1]
+        del fullChild.keys[self.t - 1:]
+        del fullChild.flags[self.t - 1:]
 
         # Move the upper half of children (if not leaf)
+        rightSize = self.t - 1
         if not fullChild.leaf:
-            for i in range(self.t):
-                newRightNode.children[i] = fullChild.children[i + self.t]
-
-        # Reduce the key count of the full child
-        fullChild.count = self.t - 1
-
-        # Shift children of current node to make room for newRightNode
-        for i in range(self.count, index, -1):
-            self.children[i + 1] = self.children[i]
-
-        self.children[index + 1] = newRightNode
-
-        # Shift keys of current node to make room for median
-        for i in range(self.count - 1, index - 1, -1):
-            self.keys[i + 1] = self.keys[i]
-
-        # Place median in current node
-        self.keys[index] = median
-        self.count += 1
+            newRightNode.children = fullChild.children[self.t:]
+            newRightNode.sizes = fullChild.sizes[self.t:]
+            del fullChild.children[self.t:]
+            del fullChild.sizes[self.t:]
+            rightSize += sum(newRightNode.sizes)
+
+        # Place median and newRightNode in current node; the median and the
+        # right half leave the full child's subtree
+        self.keys.insert(index, median)
+        self.flags.insert(index, flag)
+        self.children.insert(index + 1, newRightNode)
+        self.sizes.insert(index + 1, rightSize)
+        self.sizes[index] -= rightSize + 1
 
     def insertNotFull(self, key):
         """
         Inserts a key into a node that is not full.
         """
-        i = self.count - 1
+        # Position after any equal keys
+        i = bisect_right(self.keys, key)
 
         if self.leaf:
-            # Shift greater keys to the right to insert in sorted position
-            while i >= 0 and key < self.keys[i]:
-                self.keys[i + 1] = self.keys[i]
-                i -= 1
-
-            self.keys[i + 1] = key
-            self.count += 1
+            self.keys.insert(i, key)
+            self.flags.insert(i, FLAG_UNKNOWN)
 
         else:
-            # Find child to descend into
-            while i >= 0 and key < self.keys[i]:
-                i -= 1
-            i += 1
-
             # If the child is full, split first
-            if self.children[i].count == 2 * self.t - 1:
+            if len(self.children[i].keys) == 2 * self.t - 1:
                 self.split(i)
 
                 # After split, decide which of the two children we actually go into
                 if key > self.keys[i]:
                     i += 1
 
-            self.children[i].insertNotFull(key)
+            self.sizes[i] += 1
+            self.ownChild(i).insertNotFull(key)
 
     '''
     Deletion
@@ -88,47 +169,47 @@ class BTreeNode:
     def deleteKey(self, key):
         """
         Deletes the specified key from the subtree rooted at this node.
+        Returns True if the key was found and removed, else False.
         """
-        index = 0
-        while index < self.count and self.keys[index] < key:
-            index += 1
+        index = bisect_left(self.keys, key)
 
         # Case 1 / 2: key found in this node
-        if index < self.count and self.keys[index] == key:
+        if index < len(self.keys) and self.keys[index] == key:
             if self.leaf:
                 # Case 1: remove directly from leaf
                 self.removeFromLeaf(index)
             else:
                 # Case 2: remove from internal node
                 self.removeInternalNode(index)
+            return True
 
         else:
             # Key not in the current node
             if self.leaf:
                 # Key doesn't exist in tree
-                return
+                return False
 
             # We are going to recurse into child 'index'
             # Make sure that child has at least t keys
-            if self.children[index].count == self.t - 1:
+            if len(self.children[index].keys) == self.t - 1:
                 self.rebalance(index)
 
                 # After rebalancing, if we merged using the left sibling,
                 # 'index' may now be off by 1.
-                if index > self.count:
+                if index > len(self.keys):
                     index -= 1
 
-            self.children[index].deleteKey(key)
+            removed = self.ownChild(index).deleteKey(key)
+            if removed:
+                self.sizes[index] -= 1
+            return removed
 
     def removeFromLeaf(self, index):
         """
         Removes a key from a leaf node directly.
         """
-        for i in range(index, self.count - 1):
-            self.keys[i] = self.keys[i + 1]
-
-        self.keys[self.count - 1] = None
-        self.count -= 1
+        del self.keys[index]
+        del self.flags[index]
 
     def removeInternalNode(self, index):
         """
@@ -137,157 +218,138 @@ class BTreeNode:
         key = self.keys[index]
 
         # Case 2a: left child has at least t keys
-        if self.children[index].count >= self.t:
-            predecessor = self.getInOrderPredecessor(index)
+        if len(self.children[index].keys) >= self.t:
+            predecessor, self.flags[index] = self.getInOrderPredecessor(index)
             self.keys[index] = predecessor
-            self.children[index].deleteKey(predecessor)
+            self.ownChild(index).deleteKey(predecessor)
+            self.sizes[index] -= 1
 
         # Case 2b: right child has at least t keys
-        elif self.children[index + 1].count >= self.t:
-            successor = self.getInOrderSuccessor(index)
+        elif len(self.children[index + 1].keys) >= self.t:
+            successor, self.flags[index] = self.getInOrderSuccessor(index)
             self.keys[index] = successor
-            self.children[index + 1].deleteKey(successor)
+            self.ownChild(index + 1).deleteKey(successor)
+            self.sizes[index + 1] -= 1
 
         # Case 2c: both children have t-1 keys -> merge them with this key
         else:
             self.merge(index)
-            self.children[index].deleteKey(key)
+            self.ownChild(index).deleteKey(key)
+            self.sizes[index] -= 1
 
     def getInOrderPredecessor(self, index):
         """
-        Finds the in-order predecessor of a key at a given index.
+        Finds the in-order predecessor of a key at a given index and its flag.
         """
         current = self.children[index]
         while not current.leaf:
-            current = current.children[current.count]
+            current = current.children[-1]
 
-        return current.keys[current.count - 1]
+        return current.keys[-1], current.flags[-1]
 
     def getInOrderSuccessor(self, index):
         """
-        Finds the in-order successor of a key at a given index.
+        Finds the in-order successor of a key at a given index and its flag.
         """
         current = self.children[index + 1]
         while not current.leaf:
             current = current.children[0]
 
-        return current.keys[0]
+        return current.keys[0], current.flags[0]
 
     def merge(self, index):
         """
         Merges the child at index with its right sibling.
         Pulls down self.keys[index] in between them.
         """
-        left = self.children[index]
+        left = self.ownChild(index)
         right = self.children[index + 1]
 
-        # Move the separator key from parent down into left
-        left.keys[self.t - 1] = self.keys[index]
-
-        # Copy right's keys into left
-        for i in range(right.count):
-            left.keys[i + self.t] = right.keys[i]
+        # Move the separator key from parent down into left, followed by right's keys
+        left.keys.append(self.keys[index])
+        left.keys += right.keys
+        left.flags.append(self.flags[index])
+        left.flags += right.flags
 
         # Copy right's children if not leaf
         if not left.leaf:
-            for i in range(right.count + 1):
-                left.children[i + self.t] = right.children[i]
-
-        # Shift keys and children in the parent left to fill the gap
-        for i in range(index + 1, self.count):
-            self.keys[i - 1] = self.keys[i]
-            self.children[i] = self.children[i + 1]
+            left.children += right.children
+            left.sizes += right.sizes
 
-        # Clear now-unused slots
-        self.keys[self.count - 1] = None
-        self.children[self.count] = None
+        # Left now holds both subtrees plus the separator
+        self.sizes[index] += self.sizes[index + 1] + 1
 
-        # Update counts
-        left.count += right.count + 1
-        self.count -= 1
+        # Close the gap in the parent
+        del self.keys[index]
+        del self.flags[index]
+        del self.children[index + 1]
+        del self.sizes[index + 1]
+        right.discard()
 
     def borrowLeftSibling(self, index):
         """
         Borrows a key from the left sibling to balance the subtree.
         """
-        child = self.children[index]
-        left = self.children[index - 1]
+        child = self.ownChild(index)
+        left = self.ownChild(index - 1)
 
-        # Shift child's keys and children right by 1
-        for i in range(child.count - 1, -1, -1):
-            child.keys[i + 1] = child.keys[i]
-
-        if not child.leaf:
-            for i in range(child.count, -1, -1):
-                child.children[i + 1] = child.children[i]
-
-        # Bring parent's separator key down into child
-        child.keys[0] = self.keys[index - 1]
+        # Bring parent's separator key down into child, move left's last key up
+        child.keys.insert(0, self.keys[index - 1])
+        self.keys[index - 1] = left.keys.pop()
+        child.flags.insert(0, self.flags[index - 1])
+        self.flags[index - 1] = left.flags.pop()
+        moved = 1
 
         # If child is not leaf, move left's last child pointer over
         if not child.leaf:
-            child.children[0] = left.children[left.count]
-
-        # Move left's last key up into parent
-        self.keys[index - 1] = left.keys[left.count - 1]
-
-        # Cleanup left sibling
-        left.keys[left.count - 1] = None
-        left.children[left.count] = None
+            child.children.insert(0, left.children.pop())
+            child.sizes.insert(0, left.sizes.pop())
+            moved += child.sizes[0]
 
-        # Update counts
-        child.count += 1
-        left.count -= 1
+        self.sizes[index] += moved
+        self.sizes[index - 1] -= moved
 
     def borrowRightSibling(self, index):
         """
         Borrows a key from the right sibling to balance the subtree.
         """
-        child = self.children[index]
-        right = self.children[index + 1]
+        child = self.ownChild(index)
+        right = self.ownChild(index + 1)
 
-        # Bring parent's separator key down into child's rightmost slot
-        child.keys[child.count] = self.keys[index]
+        # Bring parent's separator key down into child, move right's first key up
+        child.keys.append(self.keys[index])
+        self.keys[index] = right.keys.pop(0)
+        child.flags.append(self.flags[index])
+        self.flags[index] = right.flags.pop(0)
+        moved = 1
 
         # If child is not leaf, grab right's first child pointer
         if not child.leaf:
-            child.children[child.count + 1] = right.children[0]
+            child.children.append(right.children.pop(0))
+            child.sizes.append(right.sizes.pop(0))
+            moved += child.sizes[-1]
 
-        # Move right's first key up into parent
-        self.keys[index] = right.keys[0]
-
-        # Shift right sibling's keys and children left by 1
-        for i in range(1, right.count):
-            right.keys[i - 1] = right.keys[i]
-
-        if not right.leaf:
-            for i in range(1, right.count + 1):
-                right.children[i - 1] = right.children[i]
-
-        # Cleanup right sibling's old last slot
-        right.keys[right.count - 1] = None
-        right.children[right.count] = None
-
-        # Update counts
-        child.count += 1
-        right.count -= 1
+        self.sizes[index] += moved
+        self.sizes[index + 1] -= moved
 
     def rebalance(self, index):
         """
         Ensures that the child at index has at least t keys before deletion continues.
         """
+        count = len(self.keys)
+
         # Case 3a: can borrow from left sibling?
-        if index != 0 and self.children[index - 1].count >= self.t:
+        if index != 0 and len(self.children[index - 1].keys) >= self.t:
             self.borrowLeftSibling(index)
 
         # Case 3a: can borrow from right sibling?
-        elif index != self.count and self.children[index + 1].count >= self.t:
+        elif index != count and len(self.children[index + 1].keys) >= self.t:
             self.borrowRightSibling(index)
 
         # Case 3b: need to merge
         else:
             # If index is not the last child, merge index with index+1
-            if index != self.count:
+            if index != count:
                 self.merge(index)
             else:
                 # Otherwise merge index-1 with index, and update index
@@ -300,124 +362,767 @@ class BTreeNode:
         """
         Performs an in-order traversal and returns a list of all keys in the subtree.
         """
-        result = []
-        for i in range(self.count):
-            if not self.leaf:
-                result += self.children[i].traverse()
-            result.append(self.keys[i])
+        return list(self.iterKeys())
 
-        if not self.leaf:
-            result += self.children[self.count].traverse()
+    def iterKeys(self, start=None, reverse=False):
+        """
+        Yields the keys of the subtree in order using an explicit stack, so no
+        intermediate lists are built and deep trees cannot hit the recursion
+        limit.
+        Forward iteration begins at the first key >= start; reverse iteration
+        runs in descending order from the last key <= start.
+        Stack entries are (node, i): in forward order keys[i:] of node are still
+        pending, in reverse order keys[:i] are.
+        """
+        stack = []
+        node = self
+        while True:
+            if start is None:
+                i = len(node.keys) if reverse else 0
+            else:
+                i = bisect_right(node.keys, start) if reverse else bisect_left(node.keys, start)
+            stack.append((node, i))
+            if node.leaf:
+                break
+            node = node.children[i]
+
+        while stack:
+            node, i = stack.pop()
+            if node.leaf:
+                if reverse:
+                    yield from reversed(node.keys[:i])
+                else:
+                    yield from node.keys[i:]
+                continue
 
-        return result
+            if reverse:
+                if i == 0:
+                    continue
+                yield node.keys[i - 1]
+                stack.append((node, i - 1))
+                child = node.children[i - 1]
+                while True:
+                    stack.append((child, len(child.keys)))
+                    if child.leaf:
+                        break
+                    child = child.children[-1]
+            else:
+                if i == len(node.keys):
+                    continue
+                yield node.keys[i]
+                stack.append((node, i + 1))
+                child = node.children[i + 1]
+                while True:
+                    stack.append((child, 0))
+                    if child.leaf:
+                        break
+                    child = child.children[0]
+
+    def iterRuns(self, start):
+        """
+        Yields (node, i, j) in key order from the first key >= start, where
+        keys[i:j] of node are the next keys: whole runs from leaves, a single
+        separator from internal nodes. Walks the same stack as iterKeys.
+        """
+        stack = []
+        node = self
+        while True:
+            i = bisect_left(node.keys, start)
+            stack.append((node, i))
+            if node.leaf:
+                break
+            node = node.children[i]
+
+        while stack:
+            node, i = stack.pop()
+            if i == len(node.keys):
+                continue
+            if node.leaf:
+                yield node, i, len(node.keys)
+                continue
+
+            yield node, i, i + 1
+            stack.append((node, i + 1))
+            child = node.children[i + 1]
+            while True:
+                stack.append((child, 0))
+                if child.leaf:
+                    break
+                child = child.children[0]
+
+    def flagsChanged(self):
+        """
+        Called after a reader stored newly computed primality flags.
+        """
+        pass
+
+
+class ArrayBTreeNode(BTreeNode):
+    """
+    BTreeNode storing its keys in a typed array("q"): 8 bytes per key instead of
+    a pointer to a Python int. Keys must be integers in the signed 64-bit range.
+    """
+    __slots__ = ()
+
+    @staticmethod
+    def newKeys():
+        return array("q")
 
 
 class BTree:
 
-    def __init__(self, t):
+    def __init__(self, t, nodeClass=BTreeNode):
+        """
+        nodeClass selects the node representation: BTreeNode stores keys in
+        lists, ArrayBTreeNode in compact typed arrays (64-bit integer keys only).
+        """
         self.root = None
         self.t = t
+        self.nodeClass = nodeClass
+        # Version given to new nodes; only ConcurrentBTree writers change it
+        self.version = 0
+        self.size = 0
+
+    def newNode(self, isLeaf):
+        """
+        Creates an empty node for this tree.
+        """
+        node = self.nodeClass(self.t, isLeaf)
+        node.version = self.version
+        return node
 
     def insert(self, key):
         if self.root is None:
-            self.root = BTreeNode(self.t, True)
-            self.root.keys[0] = key
-            self.root.count = 1
+            self.root = self.newNode(True)
+            self.root.keys.append(key)
+            self.root.flags.append(FLAG_UNKNOWN)
         else:
-            if self.root.count == 2 * self.t - 1:
+            if len(self.root.keys) == 2 * self.t - 1:
                 # Root is full -> grow tree height
-                newNode = BTreeNode(self.t, False)
-                newNode.children[0] = self.root
+                newNode = self.newNode(False)
+                newNode.children.append(self.root)
+                newNode.sizes.append(self.size)
                 newNode.split(0)
 
                 # Pick correct child for insertion
                 i = 0
                 if newNode.keys[0] < key:
                     i += 1
-                newNode.children[i].insertNotFull(key)
+                newNode.sizes[i] += 1
+                newNode.ownChild(i).insertNotFull(key)
 
                 self.root = newNode
             else:
                 self.root.insertNotFull(key)
+        self.size += 1
+
+    def bulk_load(self, keys, presorted=False, fill=1.0):
+        """
+        Replaces the contents of the tree with `keys`, building packed nodes
+        bottom-up instead of inserting one key at a time.
+        Unless presorted is True the keys are sorted first. `fill` is the target
+        fraction of the 2t - 1 key slots used per node; nodes never drop below
+        the t - 1 minimum.
+        Time complexity: O(n) after sorting
+        """
+        if not 0 < fill <= 1:
+            raise ValueError("fill must be in (0, 1]")
+
+        keys = list(keys) if presorted else sorted(keys)
+        self.root = None
+        self.size = len(keys)
+        if not keys:
+            return
+
+        perNode = max(self.t - 1, min(2 * self.t - 1, round(fill * (2 * self.t - 1))))
+
+        # Leaf level: n keys form n + 1 slots, each leaf takes s - 1 keys for a
+        # group of s slots and the key after it becomes a separator
+        nodes = []
+        separators = []
+        position = 0
+        for slots in self.groupSizes(len(keys) + 1, perNode + 1):
+            leaf = self.newNode(True)
+            leaf.keys.extend(keys[position:position + slots - 1])
+            leaf.flags = bytearray(slots - 1)
+            position += slots - 1
+            nodes.append(leaf)
+            if position < len(keys):
+                separators.append(keys[position])
+                position += 1
+
+        # Internal levels: group the nodes below under parents until one is left
+        while len(nodes) > 1:
+            parents = []
+            parentSeparators = []
+            position = 0
+            for slots in self.groupSizes(len(nodes), perNode + 1):
+                parent = self.newNode(False)
+                parent.keys.extend(separators[position:position + slots - 1])
+                parent.flags = bytearray(slots - 1)
+                # Read sizes from the nodes just built rather than through
+                # parent.children, which may reload (and evict) paged nodes
+                children = nodes[position:position + slots]
+                parent.children = children
+                parent.sizes.extend(len(child.keys) + sum(child.sizes) for child in children)
+                position += slots
+                parents.append(parent)
+                if position < len(nodes):
+                    parentSeparators.append(separators[position - 1])
+            nodes = parents
+            separators = parentSeparators
+
+        self.root = nodes[0]
+
+    def groupSizes(self, slots, perGroup):
+        """
+        Splits `slots` children (or key slots) into as few groups of about
+        `perGroup` as possible, keeping every group within [t, 2t].
+        """
+        groups = max(1, min(-(-slots // perGroup), slots // self.t))
+        size, extra = divmod(slots, groups)
+        return [size + 1] * extra + [size] * (groups - extra)
 
     def delete(self, key):
         if not self.root:
             return
 
-        self.root.deleteKey(key)
+        if self.root.deleteKey(key):
+            self.size -= 1
 
         # Shrink height if root got empty
-        if self.root.count == 0:
-            if self.root.leaf:
+        if not self.root.keys:
+            oldRoot = self.root
+            if oldRoot.leaf:
                 self.root = None
             else:
-                self.root = self.root.children[0]
+                self.root = oldRoot.children[0]
+            oldRoot.discard()
+
+    def delete_many(self, keys):
+        """
+        Deletes one occurrence of every key in `keys` and returns how many were
+        removed.
+        The batch is sorted first. Small batches are deleted key by key in that
+        order; large ones are merged against an in-order walk of the tree in a
+        single pass and the survivors are bulk loaded, so every node is
+        rebalanced once rather than once per deleted key.
+        """
+        batch = sorted(keys)
+        if self.root is None or not batch:
+            return 0
+
+        before = self.size
+        if len(batch) * REBUILD_FRACTION < self.size:
+            for key in batch:
+                self.delete(key)
+            return before - self.size
+
+        survivors = []
+        i = 0
+        for key in self.iter_keys():
+            while i < len(batch) and batch[i] < key:
+                i += 1
+            if i < len(batch) and batch[i] == key:
+                i += 1
+            else:
+                survivors.append(key)
+
+        self.bulk_load(survivors, presorted=True)
+        return before - self.size
+
+    def delete_range(self, x, y):
+        """
+        Deletes every key k such that x <= k <= y and returns how many were
+        removed. Large ranges rebuild the tree from the keys outside [x, y].
+        """
+        if self.root is None or x > y:
+            return 0
+
+        removed = self.countLess(y, True) - self.countLess(x)
+        if removed * REBUILD_FRACTION < self.size:
+            for key in list(self.iter_range(x, y)):
+                self.delete(key)
+        elif removed:
+            # Collect the survivors first: bulk_load may discard the nodes being walked
+            survivors = [k for k in self.iter_keys() if not x <= k <= y]
+            self.bulk_load(survivors, presorted=True)
+        return removed
+
+    def countLess(self, key, inclusive=False):
+        """
+        Returns the number of keys < key (or <= key if inclusive).
+        """
+        search = bisect_right if inclusive else bisect_left
+        result = 0
+        node = self.root
+        while node is not None:
+            i = search(node.keys, key)
+            if node.leaf:
+                return result + i
+            result += i + sum(node.sizes[:i])
+            node = node.children[i]
+        return result
 
     def select(self, k):
         """
         Returns the k-th smallest key (1-indexed), or -1 if invalid.
+        Descends a single root-to-leaf path using the subtree sizes.
         """
-        if self.root is None:
+        if self.root is None or not 1 <= k <= self.size:
             return -1
-        result = self.root.traverse()
-        return result[k - 1] if 1 <= k <= len(result) else -1
+
+        node = self.root
+        while not node.leaf:
+            for i, childSize in enumerate(node.sizes):
+                if k <= childSize:
+                    break
+                if k == childSize + 1:
+                    return node.keys[i]
+                k -= childSize + 1
+            node = node.children[i]
+        return node.keys[k - 1]
 
     def rank(self, key):
         """
         Returns the 1-indexed position of `key` in sorted order if it exists,
         otherwise -1.
+        Descends a single root-to-leaf path, counting the keys to the left.
         """
-        if self.root is None:
-            return -1
-        result = self.root.traverse()
-        if key in result:
-            return result.index(key) + 1
-        return -1
+        result = -1
+        smaller = 0
+        node = self.root
+        while node is not None:
+            i = bisect_left(node.keys, key)
+            smaller += i if node.leaf else i + sum(node.sizes[:i])
+
+            if i < len(node.keys) and node.keys[i] == key:
+                # A match deeper in children[i] would sit further left
+                result = smaller + (1 if node.leaf else node.sizes[i] + 1)
+
+            node = None if node.leaf else node.children[i]
+        return result
+
+    def select_many(self, ks):
+        """
+        Answers select(k) for every k in ks, returning the results in the same
+        order. The ranks are sorted and pushed down the tree together, so each
+        node on the paths is visited once per batch instead of once per query.
+        """
+        if len(ks) < BATCH_MIN:
+            return [self.select(k) for k in ks]
+
+        results = [-1] * len(ks)
+        queries = sorted((k, i) for i, k in enumerate(ks) if 1 <= k <= self.size)
+        if queries:
+            self.selectBatch(self.root, queries, results)
+        return results
+
+    def selectBatch(self, node, queries, results):
+        """
+        Resolves sorted (k, index) pairs local to node's subtree into results.
+        """
+        if node.leaf:
+            for k, i in queries:
+                results[i] = node.keys[k - 1]
+            return
+
+        # bounds[i] is the local rank of keys[i]; children[i] covers the ranks
+        # between bounds[i - 1] and bounds[i]
+        bounds = list(map(add, accumulate(node.sizes), range(1, len(node.sizes) + 1)))
+        j = 0
+        while j < len(queries):
+            child = bisect_left(bounds, queries[j][0])
+            if child < len(node.keys) and queries[j][0] == bounds[child]:
+                results[queries[j][1]] = node.keys[child]
+                j += 1
+                continue
+
+            offset = bounds[child - 1] if child else 0
+            end = j + 1
+            while end < len(queries) and queries[end][0] < bounds[child]:
+                end += 1
+            self.selectBatch(node.children[child],
+                             [(k - offset, i) for k, i in queries[j:end]], results)
+            j = end
+
+    def rank_many(self, keys):
+        """
+        Answers rank(key) for every key in keys, returning the results in the
+        same order. Like select_many, sorted queries share each node visit.
+        """
+        if len(keys) < BATCH_MIN:
+            return [self.rank(key) for key in keys]
+
+        results = [-1] * len(keys)
+        if self.root is not None:
+            self.rankBatch(self.root, sorted((key, i) for i, key in enumerate(keys)), 0, results)
+        return results
+
+    def rankBatch(self, node, queries, smaller, results):
+        """
+        Resolves sorted (key, index) pairs against node's subtree, where
+        `smaller` keys precede the subtree.
+        """
+        j = 0
+        while j < len(queries):
+            key = queries[j][0]
+            i = bisect_left(node.keys, key)
+            before = smaller + (i if node.leaf else i + sum(node.sizes[:i]))
+
+            # All queries in this run descend into children[i]
+            end = j + 1
+            limit = node.keys[i] if i < len(node.keys) else None
+            while end < len(queries) and (limit is None or queries[end][0] <= limit):
+                end += 1
+
+            group = queries[j:end]
+            if not node.leaf:
+                self.rankBatch(node.children[i], group, before, results)
+
+            if limit is not None:
+                # A match deeper in children[i] would sit further left
+                position = before + (1 if node.leaf else node.sizes[i] + 1)
+                for key, index in group:
+                    if key == limit and results[index] == -1:
+                        results[index] = position
+            j = end
 
     def keysInRange(self, x, y):
         """
         Returns all keys k such that x <= k <= y in ascending order,
         or -1 if none.
         """
-        if self.root is None:
-            return -1
-        result = [k for k in self.root.traverse() if x <= k <= y]
+        result = list(self.iter_range(x, y))
         return result if result else -1
 
+    def iter_range(self, x, y):
+        """
+        Lazily yields all keys k such that x <= k <= y in ascending order.
+        Only the path down to x and the keys up to y are visited.
+        """
+        if self.root is None or x > y:
+            return iter(())
+        return takewhile(partial(ge, y), self.root.iterKeys(x))
+
+    def iter_keys(self, start=None, reverse=False):
+        """
+        Lazily yields the keys in ascending order from the first key >= start,
+        or in descending order from the last key <= start if reverse is True.
+        """
+        if self.root is None:
+            return iter(())
+        return self.root.iterKeys(start, reverse)
+
+    def __iter__(self):
+        return self.iter_keys()
+
     def isPrime(self, n):
         """
         Returns True if n is prime, else False.
+        When n is a key its flag is looked up first and filled in on a miss, so
+        a key is only tested once.
         """
         n = int(n)
-        if n < 2:
-            return False
-        if n == 2:
-            return True
-        if n % 2 == 0:
-            return False
-
-        # trial division up to sqrt(n), skipping evens
-        limit = int(math.sqrt(n)) + 1
-        for i in range(3, limit, 2):
-            if n % i == 0:
-                return False
-        return True
+        node = self.root
+        while node is not None:
+            i = bisect_left(node.keys, n)
+            if i < len(node.keys) and node.keys[i] == n:
+                if node.flags[i] == FLAG_UNKNOWN:
+                    node.flags[i] = FLAG_PRIME if millerRabin(n) else FLAG_COMPOSITE
+                    node.flagsChanged()
+                return node.flags[i] == FLAG_PRIME
+            node = None if node.leaf else node.children[i]
+        return millerRabin(n)
 
     def primesInRange(self, x, y):
         """
         Returns all prime keys k such that x <= k <= y,
         or -1 if none.
+        Only runs of keys with a FLAG_UNKNOWN flag are tested, in batches of
+        about CLASSIFY_BATCH keys; the results are stored back in the nodes.
         """
-        keys = self.keysInRange(x, y)
-        if keys == -1:
+        if self.root is None or x > y:
             return -1
-        primes = [k for k in keys if self.isPrime(k)]
+
+        keys = []
+        flags = bytearray()
+        pending = []
+        pendingKeys = 0
+        for node, i, j in self.root.iterRuns(x):
+            last = node.keys[j - 1] > y
+            if last:
+                j = bisect_right(node.keys, y, i, j)
+            runFlags = node.flags[i:j]
+            if FLAG_UNKNOWN in runFlags:
+                pending.append((node, i, j, len(keys)))
+                pendingKeys += j - i
+            keys += node.keys[i:j]
+            flags += runFlags
+            if pendingKeys >= CLASSIFY_BATCH:
+                self.storeFlags(pending, keys, flags)
+                pending = []
+                pendingKeys = 0
+            if last:
+                break
+        self.storeFlags(pending, keys, flags)
+
+        primes = list(compress(keys, flags.translate(PRIME_MASK)))
         return primes if primes else -1
 
+    def storeFlags(self, pending, keys, flags):
+        """
+        Classifies the runs keys[i:j] of the pending (node, i, j, position)
+        entries and stores their flags in the node and at flags[position:].
+        """
+        batch = []
+        for node, i, j, position in pending:
+            batch += keys[position:position + j - i]
+        found = classifyKeys(batch).translate(MASK_FLAGS)
+
+        offset = 0
+        for node, i, j, position in pending:
+            run = found[offset:offset + j - i]
+            node.flags[i:j] = run
+            flags[position:position + j - i] = run
+            node.flagsChanged()
+            offset += j - i
+
+
+class ConcurrentBTree:
+    """
+    BTree for many concurrent readers and a serialised stream of writers.
+
+    Readers work on an immutable snapshot: each query takes the currently
+    published BTree and never blocks. A writer holds a lock, copies the root
+    with a new version, and runs the normal insert/delete code on it. Every
+    node the split/merge/borrow code is about to modify is path-copied first
+    (BTreeNode.ownChild), so nodes reachable from a published root are never
+    mutated. The new tree is published with a single attribute assignment.
+    """
+
+    def __init__(self, t, nodeClass=BTreeNode):
+        self.writeLock = threading.Lock()
+        self.current = BTree(t, nodeClass)
+
+    def snapshot(self):
+        """
+        Returns the current version as a BTree that no writer will modify.
+        Use it to run several queries against one consistent state.
+        """
+        return self.current
+
+    @property
+    def size(self):
+        return self.current.size
+
+    def write(self, operation, *args):
+        """
+        Applies operation(tree, *args) to a private copy of the current
+        version, publishes the result and returns the operation's result.
+        """
+        with self.writeLock:
+            published = self.current
+            working = BTree(published.t, published.nodeClass)
+            working.version = published.version + 1
+            working.size = published.size
+            if published.root is not None:
+                working.root = published.root.copy(working.version)
+
+            result = operation(working, *args)
+            self.current = working
+            return result
+
+    # Writers
+    def insert(self, key):
+        self.write(BTree.insert, key)
+
+    def delete(self, key):
+        self.write(BTree.delete, key)
+
+    def bulk_load(self, keys, presorted=False, fill=1.0):
+        self.write(BTree.bulk_load, keys, presorted, fill)
+
+    def delete_many(self, keys):
+        return self.write(BTree.delete_many, keys)
+
+    def delete_range(self, x, y):
+        return self.write(BTree.delete_range, x, y)
+
+    # Readers
+    def select(self, k):
+        return self.current.select(k)
+
+    def select_many(self, ks):
+        return self.current.select_many(ks)
+
+    def rank(self, key):
+        return self.current.rank(key)
+
+    def rank_many(self, keys):
+        return self.current.rank_many(keys)
+
+    def countLess(self, key, inclusive=False):
+        return self.current.countLess(key, inclusive)
+
+    def keysInRange(self, x, y):
+        return self.current.keysInRange(x, y)
+
+    def iter_range(self, x, y):
+        return self.current.iter_range(x, y)
+
+    def isPrime(self, n):
+        return self.current.isPrime(n)
+
+    def primesInRange(self, x, y):
+        return self.current.primesInRange(x, y)
+
+
+basePrimes = [2]
+
+def getBasePrimes(limit):
+    """
+    Returns the cached list of primes, extended with a simple sieve so that
+    it covers every prime <= limit.
+    """
+    if basePrimes[-1] < limit:
+        size = max(limit + 1, 2 * basePrimes[-1])
+        sieve = bytearray([1]) * size
+        sieve[0:2] = b"\x00\x00"
+        for p in range(2, math.isqrt(size - 1) + 1):
+            if sieve[p]:
+                sieve[p * p::p] = bytes(len(range(p * p, size, p)))
+        basePrimes[:] = [p for p in range(size) if sieve[p]]
+    return basePrimes
+
+
+def segmentedSieve(low, high):
+    """
+    Returns a bytearray flags where flags[n - low] == 1 iff n is prime,
+    for 2 <= low <= n <= high.
+    """
+    size = high - low + 1
+    sieve = bytearray([1]) * size
+    root = math.isqrt(high)
+    for p in getBasePrimes(root):
+        if p > root:
+            break
+        start = max(p * p, (low + p - 1) // p * p)
+        if start <= high:
+            sieve[start - low::p] = bytes(len(range(start - low, size, p)))
+    return sieve
+
+
+def millerRabin(n):
+    """
+    Deterministic Miller-Rabin primality test for all 64-bit integers.
+    """
+    if n < 2:
+        return False
+    for p in MR_BASES:
+        if n % p == 0:
+            return n == p
+
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+
+    for a in MR_BASES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+COMMAND_ARGS = {"select": 1, "rank": 1, "keysInRange": 2, "primesInRange": 2}
+
+
+def classifyKeys(keys):
+    """
+    Returns a bytearray holding 1 for every prime of the ascending list `keys`
+    and 0 for the rest. Dense batches are sieved segment by segment; sparse
+    ones are tested individually.
+    """
+    if not keys:
+        return bytearray()
+    low, high = max(keys[0], 2), keys[-1]
+    if high > SIEVE_LIMIT or high - low + 1 > SIEVE_DENSITY * len(keys):
+        return bytearray(map(millerRabin, keys))
+
+    found = bytearray(bisect_left(keys, 2))
+    i = len(found)
+    for segmentLow in range(low, high + 1, SIEVE_SEGMENT):
+        segmentHigh = min(segmentLow + SIEVE_SEGMENT - 1, high)
+        sieve = segmentedSieve(segmentLow, segmentHigh)
+        end = bisect_right(keys, segmentHigh, i)
+        found += bytes(sieve[k - segmentLow] for k in keys[i:end])
+        i = end
+    return found
+
+
+def formatKeys(keys):
+    """
+    Formats an iterable of keys as one space-separated line, or -1 if empty.
+    """
+    return " ".join(map(str, keys)) or "-1"
+
+
+def answerCommands(tree, lines):
+    """
+    Answers a batch of command lines and returns their output as one string.
+    Runs of consecutive select or rank commands are answered together with
+    select_many / rank_many. Malformed lines produce no output.
+    """
+    commands = [parts for parts in map(str.split, lines)
+                if parts and COMMAND_ARGS.get(parts[0]) == len(parts) - 1]
+
+    output = []
+    for cmd, group in groupby(commands, key=itemgetter(0)):
+        if cmd == "select":
+            output.extend(map(str, tree.select_many([int(parts[1]) for parts in group])))
+
+        elif cmd == "rank":
+            output.extend(map(str, tree.rank_many([int(parts[1]) for parts in group])))
+
+        elif cmd == "keysInRange":
+            for parts in group:
+                output.append(formatKeys(tree.iter_range(int(parts[1]), int(parts[2]))))
+
+        elif cmd == "primesInRange":
+            for parts in group:
+                result = tree.primesInRange(int(parts[1]), int(parts[2]))
+                output.append("-1" if result == -1 else formatKeys(result))
+
+    output.append("")
+    return "\n".join(output) if len(output) > 1 else ""
+
+
+def runCommands(tree, in_file, out_file, chunkSize=1 << 20):
+    """
+    Streams commands from in_file to out_file, reading whole lines about
+    chunkSize bytes at a time and writing each chunk's output in one call.
+    A chunkSize of 1 answers and flushes every line as soon as it arrives.
+    """
+    while True:
+        lines = in_file.readlines(chunkSize)
+        if not lines:
+            break
+        out_file.write(answerCommands(tree, lines))
+        out_file.flush()
+
 
 if __name__ == "__main__":
     if len(sys.argv) != 5:
-        print("Usage: python btree.py <t> <keystoinsert.txt> <keystodelete.txt> <commands.txt>")
+        print("Usage: python btree.py <t> <keystoinsert.txt> <keystodelete.txt> <commands.txt | ->")
+        print("Pass - as the command file to read commands from stdin and answer on stdout.")
         sys.exit(1)
 
     t = int(sys.argv[1])
@@ -429,57 +1134,19 @@ if __name__ == "__main__":
 
     # Insert all keys (as INT)
     with open(insert_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line == "":
-                continue
-            key = int(line)
-            tree.insert(key)
+        tree.bulk_load(int(line) for line in f if line.strip() != "")
 
     # Delete all keys (as INT)
     with open(delete_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line == "":
-                continue
-            key = int(line)
-            tree.delete(key)
+        tree.delete_many(int(line) for line in f if line.strip() != "")
 
     # Process commands and write results
-    with open(command_file, 'r') as cmd_file, open("btree_output.txt", 'w') as out_file:
-        for line in cmd_file:
-            parts = line.strip().split()
-            if not parts:
-                continue
-
-            cmd = parts[0]
-
-            if cmd == "select" and len(parts) == 2:
-                k = int(parts[1])
-                result = tree.select(k)
-                out_file.write(f"{result}\n")
-
-            elif cmd == "rank" and len(parts) == 2:
-                x = int(parts[1])
-                result = tree.rank(x)
-                out_file.write(f"{result}\n")
-
-            elif cmd == "keysInRange" and len(parts) == 3:
-                x, y = int(parts[1]), int(parts[2])
-                result = tree.keysInRange(x, y)
-                if result == -1:
-                    out_file.write("-1\n")
-                else:
-                    out_file.write(" ".join(map(str, result)) + "\n")
-
-            elif cmd == "primesInRange" and len(parts) == 3:
-                x, y = int(parts[1]), int(parts[2])
-                result = tree.primesInRange(x, y)
-                if result == -1:
-                    out_file.write("-1\n")
-                else:
-                    out_file.write(" ".join(map(str, result)) + "\n")
+    if command_file == "-":
+        # Answer each command as it arrives instead of waiting for a full chunk
+        runCommands(tree, sys.stdin, sys.stdout, chunkSize=1)
+    else:
+        with open(command_file, 'r') as cmd_file, open("btree_output.txt", 'w') as out_file:
+            runCommands(tree, cmd_file, out_file)
 
 #Run: py btree.py 2 keystoinsert.txt keystodelete.txt commands.txt
 
-    
@@ -0,0 +1,353 @@
+import mmap
+import os
+import struct
+from array import array
+from collections import OrderedDict
+
+from btree import BTree, ArrayBTreeNode
+
+# File header stored in page 0: magic, t, root page, key count, page count, free list head
+HEADER = struct.Struct("<8sqqqqq")
+MAGIC = b"BTREEPG2"
+
+# Per-page header: leaf flag, key count
+PAGE_HEADER = struct.Struct("<qq")
+NO_PAGE = -1
+
+
+class PageList:
+    """
+    List-like view over a node's child page ids. Reading an element loads the
+    child through the pager, storing a node stores its page id.
+    """
+    __slots__ = ("pager", "ids")
+
+    def __init__(self, pager, ids):
+        self.pager = pager
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PageList(self.pager, self.ids[index])
+        return self.pager.load(self.ids[index])
+
+    def __setitem__(self, index, node):
+        self.ids[index] = node.pageId
+
+    def __delitem__(self, index):
+        del self.ids[index]
+
+    def __iter__(self):
+        for pageId in self.ids:
+            yield self.pager.load(pageId)
+
+    def __iadd__(self, nodes):
+        self.ids.extend(pageIds(nodes))
+        return self
+
+    def insert(self, index, node):
+        self.ids.insert(index, node.pageId)
+
+    def append(self, node):
+        self.ids.append(node.pageId)
+
+    def pop(self, index=-1):
+        return self.pager.load(self.ids.pop(index))
+
+
+def pageIds(nodes):
+    """
+    Returns the page ids of a PageList or of an iterable of paged nodes.
+    """
+    if isinstance(nodes, PageList):
+        return nodes.ids
+    return array("q", (node.pageId for node in nodes))
+
+
+class PagedBTreeNode(ArrayBTreeNode):
+    """
+    BTreeNode backed by a fixed-size page of a PagedBTree file. Children are
+    stored as page ids and loaded on demand through the pager.
+    """
+    __slots__ = ("pager", "pageId", "childIds")
+
+    def __init__(self, t, isLeaf=False, pager=None, pageId=NO_PAGE):
+        self.pager = pager
+        self.pageId = pageId
+        super().__init__(t, isLeaf)
+
+    @property
+    def children(self):
+        if self.leaf:
+            return ()
+        return PageList(self.pager, self.childIds)
+
+    @children.setter
+    def children(self, nodes):
+        self.childIds = () if self.leaf else array("q", pageIds(nodes))
+
+    def makeNode(self, isLeaf):
+        return self.pager.allocate(isLeaf)
+
+    def discard(self):
+        self.pager.free(self.pageId)
+
+    def flagsChanged(self):
+        self.pager.touch(self)
+
+    def encode(self, pageSize):
+        """
+        Serialises the node into a page of exactly pageSize bytes.
+        """
+        slots = 2 * self.t
+        data = bytearray(pageSize)
+        PAGE_HEADER.pack_into(data, 0, self.leaf, len(self.keys))
+        offset = PAGE_HEADER.size
+        data[offset:offset + 8 * len(self.keys)] = self.keys.tobytes()
+        flagsOffset = offset + 8 * (3 * slots - 1)
+        data[flagsOffset:flagsOffset + len(self.flags)] = self.flags
+        if not self.leaf:
+            offset += 8 * (slots - 1)
+            data[offset:offset + 8 * len(self.childIds)] = self.childIds.tobytes()
+            offset += 8 * slots
+            data[offset:offset + 8 * len(self.sizes)] = self.sizes.tobytes()
+        return data
+
+    @classmethod
+    def decode(cls, t, pager, pageId, data):
+        """
+        Rebuilds a node from the page bytes written by encode.
+        """
+        slots = 2 * t
+        isLeaf, count = PAGE_HEADER.unpack_from(data, 0)
+        node = cls(t, bool(isLeaf), pager, pageId)
+        offset = PAGE_HEADER.size
+        node.keys.frombytes(data[offset:offset + 8 * count])
+        flagsOffset = offset + 8 * (3 * slots - 1)
+        node.flags = bytearray(data[flagsOffset:flagsOffset + count])
+        if not node.leaf:
+            offset += 8 * (slots - 1)
+            node.childIds.frombytes(data[offset:offset + 8 * (count + 1)])
+            offset += 8 * slots
+            node.sizes.frombytes(data[offset:offset + 8 * (count + 1)])
+        return node
+
+
+class Pager:
+    """
+    Maps fixed-size node pages of a single file through mmap, with an LRU
+    cache of decoded nodes in front.
+
+    While `writing` is set, every node handed out is assumed to be modified
+    and nothing is evicted, so the nodes an insert or delete is holding stay
+    the only copies until trim() writes them back.
+    """
+
+    def __init__(self, path, t, cacheSize):
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+        self.dirty = set()
+        self.writing = False
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            magic, storedT, self.rootId, self.size, self.pageCount, self.freeHead = \
+                HEADER.unpack(self.file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a paged B-tree file")
+            if t is not None and t != storedT:
+                raise ValueError(f"{path} was created with t={storedT}, not t={t}")
+            t = storedT
+        else:
+            if t is None:
+                raise ValueError("t is required to create a new paged B-tree")
+            self.rootId, self.size, self.pageCount, self.freeHead = NO_PAGE, 0, 1, NO_PAGE
+
+        if cacheSize < 2 * t + 2:
+            # A node, its parent and all 2t children must fit while splitting or merging
+            self.file.close()
+            raise ValueError(f"cacheSize must be at least 2t + 2 = {2 * t + 2}, got {cacheSize}")
+        self.t = t
+        # Keys, child ids and sizes, then one primality flag byte per key
+        self.pageSize = PAGE_HEADER.size + 8 * (6 * t - 1) + 2 * t - 1
+        if not exists:
+            self.file.truncate(self.pageSize * 64)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+    def load(self, pageId):
+        """
+        Returns the node stored in a page, decoding it on a cache miss.
+        """
+        node = self.cache.get(pageId)
+        if node is None:
+            offset = pageId * self.pageSize
+            node = PagedBTreeNode.decode(self.t, self, pageId, self.map[offset:offset + self.pageSize])
+            self.cache[pageId] = node
+            self.trim()
+        else:
+            self.cache.move_to_end(pageId)
+        if self.writing:
+            self.dirty.add(pageId)
+        return node
+
+    def touch(self, node):
+        """
+        Marks a node changed outside a write operation as dirty, unless it has
+        already been evicted (its changes are then simply dropped).
+        """
+        if self.cache.get(node.pageId) is node:
+            self.dirty.add(node.pageId)
+
+    def allocate(self, isLeaf):
+        """
+        Returns a new empty node on a free page, growing the file if needed.
+        """
+        if self.freeHead != NO_PAGE:
+            pageId = self.freeHead
+            self.freeHead = struct.unpack_from("<q", self.map, pageId * self.pageSize)[0]
+        else:
+            pageId = self.pageCount
+            self.pageCount += 1
+            if self.pageCount * self.pageSize > len(self.map):
+                self.grow()
+
+        node = PagedBTreeNode(self.t, isLeaf, self, pageId)
+        self.cache[pageId] = node
+        self.dirty.add(pageId)
+        self.trim()
+        return node
+
+    def free(self, pageId):
+        """
+        Drops a page from the cache and pushes it onto the free list.
+        """
+        self.cache.pop(pageId, None)
+        self.dirty.discard(pageId)
+        struct.pack_into("<q", self.map, pageId * self.pageSize, self.freeHead)
+        self.freeHead = pageId
+
+    def reset(self):
+        """
+        Forgets every page, leaving an empty file.
+        """
+        self.cache.clear()
+        self.dirty.clear()
+        self.rootId, self.size, self.pageCount, self.freeHead = NO_PAGE, 0, 1, NO_PAGE
+
+    def grow(self):
+        """
+        Doubles the file and remaps it.
+        """
+        newSize = max(2 * len(self.map), self.pageCount * self.pageSize)
+        self.map.close()
+        self.file.truncate(newSize)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+    def write(self, node):
+        offset = node.pageId * self.pageSize
+        self.map[offset:offset + self.pageSize] = node.encode(self.pageSize)
+
+    def trim(self):
+        """
+        Evicts least recently used nodes beyond the cache size, writing back
+        dirty ones. Does nothing while a write operation is in progress.
+        """
+        if self.writing:
+            return
+        while len(self.cache) > self.cacheSize:
+            pageId, node = self.cache.popitem(last=False)
+            if pageId in self.dirty:
+                self.dirty.discard(pageId)
+                self.write(node)
+
+    def flush(self):
+        """
+        Writes every dirty node and the header back to the file.
+        """
+        for pageId in self.dirty:
+            self.write(self.cache[pageId])
+        self.dirty.clear()
+        self.map[0:HEADER.size] = HEADER.pack(MAGIC, self.t, self.rootId, self.size,
+                                              self.pageCount, self.freeHead)
+        self.map.flush()
+
+    def close(self):
+        self.flush()
+        self.map.close()
+        self.file.close()
+
+
+class PagedBTree(BTree):
+    """
+    Persistent BTree whose nodes live in fixed-size pages of a single file,
+    accessed through mmap with an LRU cache of cacheSize decoded nodes.
+    Reopening an existing file is O(1): only the header is read, nodes are
+    loaded as queries reach them. Keys must be signed 64-bit integers.
+
+    Call close() (or use the tree as a context manager) to persist changes.
+    """
+
+    def __init__(self, path, t=None, cacheSize=1024):
+        self.pager = Pager(path, t, cacheSize)
+        rootId, size = self.pager.rootId, self.pager.size
+        super().__init__(self.pager.t, PagedBTreeNode)
+        self.pager.rootId, self.size = rootId, size
+
+    @property
+    def root(self):
+        if self.pager.rootId == NO_PAGE:
+            return None
+        return self.pager.load(self.pager.rootId)
+
+    @root.setter
+    def root(self, node):
+        self.pager.rootId = NO_PAGE if node is None else node.pageId
+
+    def newNode(self, isLeaf):
+        return self.pager.allocate(isLeaf)
+
+    def insert(self, key):
+        self.pager.writing = True
+        try:
+            super().insert(key)
+        finally:
+            self.pager.writing = False
+            self.pager.trim()
+
+    def delete(self, key):
+        self.pager.writing = True
+        try:
+            super().delete(key)
+        finally:
+            self.pager.writing = False
+            self.pager.trim()
+
+    def bulk_load(self, keys, presorted=False, fill=1.0):
+        # keys may be read from this tree's own pages, so take them all before
+        # the pages are forgotten. Each node is complete before the next one is
+        # allocated (BTree.bulk_load sizes parents from the nodes it built), so
+        # the load can evict and write back nodes as it goes.
+        keys = list(keys) if presorted else sorted(keys)
+        self.pager.reset()
+        super().bulk_load(keys, True, fill)
+
+    def flush(self):
+        """
+        Persists all changes without closing the file.
+        """
+        self.pager.size = self.size
+        self.pager.flush()
+
+    def close(self):
+        self.pager.size = self.size
+        self.pager.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,298 @@
+import os
+import sys
+import time
+import random
+import multiprocessing
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, islice
+
+from btree import BTree, answerCommands
+
+# iter_range fetches keys from a shard this many at a time
+RANGE_CHUNK = 4096
+
+# An insert re-partitions all keys once its shard holds more than this many
+# keys and more than twice the average
+REBALANCE_MIN = 1024
+
+
+def shardWorker(connection, t):
+    """
+    Worker process loop: owns one BTree and answers (method, args) requests
+    until it receives None.
+    """
+    tree = BTree(t)
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        method, args = request
+        if method == "keysInRange":
+            # Ship plain lists rather than the -1 sentinel
+            result = list(tree.iter_range(*args))
+        elif method == "primesInRange":
+            result = tree.primesInRange(*args)
+            result = [] if result == -1 else result
+        elif method == "rangeChunk":
+            # Keys of [low, y] after skipping the first `skip`, at most `limit`
+            low, y, skip, limit = args
+            result = list(islice(tree.iter_range(low, y), skip, skip + limit))
+        elif method == "keys":
+            result = list(tree.iter_keys())
+        else:
+            result = getattr(tree, method)(*args)
+        connection.send(result)
+    connection.close()
+
+
+class ShardedBTree:
+    """
+    Range-partitioned front-end over one BTree per worker process.
+
+    Shard i holds the keys in [boundaries[i - 1], boundaries[i]). The front-end
+    tracks per-shard key counts, so select and rank are routed to a single
+    shard. Batched queries and range queries are split across shards and sent
+    to all of them before any answer is read, so the shards work in parallel.
+    Results are merged back in key order.
+
+    Boundaries are chosen by bulk_load (equal-sized shards) or given up front.
+    When inserts leave one shard with more than twice the average, all keys
+    are re-partitioned into equal shards, so a tree filled only by insert
+    still spreads its keys.
+
+    Shards only answer in parallel with a spare core each; with fewer cores
+    than shards the extra round trips make this slower than a single BTree.
+    """
+
+    def __init__(self, t, shards, boundaries=None):
+        boundaries = list(boundaries) if boundaries else []
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        if boundaries and len(boundaries) != shards - 1:
+            raise ValueError(f"{shards} shards need {shards - 1} boundaries, got {len(boundaries)}")
+        if any(a > b for a, b in zip(boundaries, boundaries[1:])):
+            raise ValueError("boundaries must be sorted")
+
+        self.t = t
+        self.boundaries = boundaries
+        self.counts = [0] * shards
+        self.connections = []
+        self.workers = []
+        for _ in range(shards):
+            parent, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=shardWorker, args=(child, t), daemon=True)
+            worker.start()
+            child.close()
+            self.connections.append(parent)
+            self.workers.append(worker)
+
+    @property
+    def size(self):
+        return sum(self.counts)
+
+    def shardFor(self, key):
+        return min(bisect_right(self.boundaries, key), len(self.counts) - 1)
+
+    def call(self, shard, method, *args):
+        self.connections[shard].send((method, args))
+        return self.connections[shard].recv()
+
+    def fanOut(self, requests):
+        """
+        Sends {shard: (method, args)} to every shard at once, then collects the
+        answers as {shard: result}.
+        """
+        for shard, request in requests.items():
+            self.connections[shard].send(request)
+        return {shard: self.connections[shard].recv() for shard in requests}
+
+    def partition(self, keys):
+        """
+        Groups (key, index) pairs of `keys` by owning shard.
+        """
+        groups = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(self.shardFor(key), []).append((key, i))
+        return groups
+
+    def bulk_load(self, keys, presorted=False, fill=1.0):
+        """
+        Replaces the contents with `keys`, choosing boundaries so that every
+        shard receives the same number of keys.
+        """
+        keys = list(keys) if presorted else sorted(keys)
+        shards = len(self.counts)
+        cuts = [len(keys) * i // shards for i in range(shards + 1)]
+
+        # A run of equal keys must not straddle two shards
+        for i in range(1, shards):
+            while 0 < cuts[i] < len(keys) and keys[cuts[i]] == keys[cuts[i] - 1]:
+                cuts[i] += 1
+            cuts[i] = max(cuts[i], cuts[i - 1])
+        self.boundaries = [keys[cut] if cut < len(keys) else keys[-1] + 1 for cut in cuts[1:-1]] \
+            if keys else []
+
+        self.fanOut({i: ("bulk_load", (keys[cuts[i]:cuts[i + 1]], True, fill)) for i in range(shards)})
+        self.counts = [cuts[i + 1] - cuts[i] for i in range(shards)]
+
+    def insert(self, key):
+        shard = self.shardFor(key)
+        self.call(shard, "insert", key)
+        self.counts[shard] += 1
+        if self.counts[shard] > max(REBALANCE_MIN, 2 * self.size / len(self.counts)):
+            self.rebalance()
+
+    def rebalance(self):
+        """
+        Re-partitions every key into equal-sized shards with new boundaries.
+        """
+        answers = self.fanOut({shard: ("keys", ()) for shard in range(len(self.counts))})
+        keys = []
+        for shard in range(len(self.counts)):
+            keys += answers[shard]
+        self.bulk_load(keys, presorted=True)
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        groups = self.partition(keys)
+        results = self.fanOut({shard: ("delete_many", ([key for key, _ in group],))
+                               for shard, group in groups.items()})
+        for shard, removed in results.items():
+            self.counts[shard] -= removed
+        return sum(results.values())
+
+    def delete_range(self, x, y):
+        if x > y:
+            return 0
+        results = self.fanOut({shard: ("delete_range", (x, y))
+                               for shard in range(self.shardFor(x), self.shardFor(y) + 1)})
+        for shard, removed in results.items():
+            self.counts[shard] -= removed
+        return sum(results.values())
+
+    def select(self, k):
+        return self.select_many([k])[0]
+
+    def select_many(self, ks):
+        """
+        Routes each rank to the shard holding it using the prefix counts.
+        """
+        prefix = [0] + list(accumulate(self.counts))
+        groups = {}
+        results = [-1] * len(ks)
+        for i, k in enumerate(ks):
+            if 1 <= k <= prefix[-1]:
+                shard = bisect_right(prefix, k - 1) - 1
+                groups.setdefault(shard, []).append((k - prefix[shard], i))
+
+        answers = self.fanOut({shard: ("select_many", ([k for k, _ in group],))
+                               for shard, group in groups.items()})
+        for shard, group in groups.items():
+            for (_, i), key in zip(group, answers[shard]):
+                results[i] = key
+        return results
+
+    def rank(self, key):
+        return self.rank_many([key])[0]
+
+    def rank_many(self, keys):
+        """
+        Ranks each key within its shard and offsets it by the keys in the
+        shards before it.
+        """
+        prefix = [0] + list(accumulate(self.counts))
+        groups = self.partition(keys)
+        answers = self.fanOut({shard: ("rank_many", ([key for key, _ in group],))
+                               for shard, group in groups.items()})
+        results = [-1] * len(keys)
+        for shard, group in groups.items():
+            for (_, i), local in zip(group, answers[shard]):
+                if local != -1:
+                    results[i] = prefix[shard] + local
+        return results
+
+    def gatherRange(self, method, x, y):
+        if x > y:
+            return []
+        shards = range(self.shardFor(x), self.shardFor(y) + 1)
+        answers = self.fanOut({shard: (method, (x, y)) for shard in shards})
+        result = []
+        for shard in shards:
+            result += answers[shard]
+        return result
+
+    def iter_range(self, x, y):
+        """
+        Lazily yields all keys k such that x <= k <= y in ascending order,
+        fetching them from one shard at a time in chunks of RANGE_CHUNK keys.
+        """
+        if x > y:
+            return
+        for shard in range(self.shardFor(x), self.shardFor(y) + 1):
+            # Resume after the last key sent; `skip` counts the copies of it
+            # already yielded, as equal keys may cross a chunk boundary
+            low, skip = x, 0
+            while True:
+                chunk = self.call(shard, "rangeChunk", low, y, skip, RANGE_CHUNK)
+                yield from chunk
+                if len(chunk) < RANGE_CHUNK:
+                    break
+                last = chunk[-1]
+                equal = len(chunk) - bisect_left(chunk, last)
+                skip = skip + equal if last == low else equal
+                low = last
+
+    def keysInRange(self, x, y):
+        return self.gatherRange("keysInRange", x, y) or -1
+
+    def primesInRange(self, x, y):
+        return self.gatherRange("primesInRange", x, y) or -1
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for worker in self.workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(keyCount=1000000, commandCount=200000, shards=4, t=32, seed=0):
+    """
+    Times answerCommands on one BTree against a ShardedBTree for long runs of
+    select and rank commands, checking that both produce the same output.
+    """
+    rnd = random.Random(seed)
+    keys = rnd.sample(range(1 << 40), keyCount)
+    lines = [f"select {rnd.randint(1, keyCount)}" for _ in range(commandCount // 2)]
+    lines += [f"rank {rnd.choice(keys)}" for _ in range(commandCount // 2)]
+
+    tree = BTree(t)
+    tree.bulk_load(keys)
+    start = time.perf_counter()
+    expected = answerCommands(tree, lines)
+    single = time.perf_counter() - start
+
+    with ShardedBTree(t, shards) as sharded:
+        sharded.bulk_load(keys)
+        start = time.perf_counter()
+        output = answerCommands(sharded, lines)
+        parallel = time.perf_counter() - start
+
+    assert output == expected
+    cores = os.cpu_count() or 1
+    print(f"{commandCount} commands over {keyCount} keys on {cores} cores: single tree {single:.2f}s, "
+          f"{shards} shards {parallel:.2f}s, speedup {single / parallel:.2f}x")
+    if cores < shards:
+        print(f"Only {cores} cores for {shards} shards: the shards cannot run in parallel here")
+
+
+if __name__ == "__main__":
+    benchmark(shards=int(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from btree import BTree
+from bplustree import BPlusTree
+
+
+def checkNode(test, node):
+    """
+    Checks a B+-tree subtree and returns its keys in order.
+    """
+    if node.leaf:
+        test.assertEqual(len(node.flags), len(node.keys))
+        test.assertEqual(node.keys, sorted(node.keys))
+        return list(node.keys)
+
+    test.assertEqual(len(node.children), len(node.keys) + 1)
+    keys = []
+    for i, child in enumerate(node.children):
+        childKeys = checkNode(test, child)
+        test.assertEqual(node.sizes[i], len(childKeys))
+        if i:
+            test.assertGreaterEqual(childKeys[0], node.keys[i - 1])
+        if i < len(node.keys):
+            test.assertLessEqual(childKeys[-1], node.keys[i])
+        keys += childKeys
+    return keys
+
+
+class BPlusTreeTest(unittest.TestCase):
+    """
+    Applies the same random operations to a BPlusTree and a plain BTree and
+    compares their answers.
+    """
+
+    def compare(self, tree, reference, rnd, high):
+        self.assertEqual(tree.size, reference.size)
+        ks = [rnd.randint(-1, reference.size + 1) for _ in range(10)]
+        self.assertEqual(tree.select_many(ks), reference.select_many(ks))
+        keys = [rnd.randint(-1, high + 1) for _ in range(10)]
+        self.assertEqual(tree.rank_many(keys), reference.rank_many(keys))
+        self.assertEqual([tree.countLess(key, True) for key in keys], [reference.countLess(key, True) for key in keys])
+        x = rnd.randint(-1, high)
+        y = x + rnd.randint(-2, high // 2)
+        self.assertEqual(list(tree.iter_range(x, y)), list(reference.iter_range(x, y)))
+        self.assertEqual(tree.primesInRange(x, y), reference.primesInRange(x, y))
+        self.assertEqual(list(tree.iter_keys(x, reverse=True)), list(reference.iter_keys(x, reverse=True)))
+        self.assertEqual(tree.isPrime(x), reference.isPrime(x))
+
+    def test_random_operations(self):
+        rnd = random.Random(4)
+        high = 300
+        for t in (2, 3, 5):
+            tree = BPlusTree(t)
+            reference = BTree(t)
+            for step in range(1500):
+                operation = rnd.random()
+                key = rnd.randint(0, high)
+                if operation < 0.45:
+                    tree.insert(key)
+                    reference.insert(key)
+                elif operation < 0.7:
+                    tree.delete(key)
+                    reference.delete(key)
+                elif operation < 0.75:
+                    keys = [rnd.randint(0, high) for _ in range(rnd.randint(0, 80))]
+                    self.assertEqual(tree.delete_many(keys), reference.delete_many(keys))
+                elif operation < 0.8:
+                    self.assertEqual(tree.delete_range(key, key + 50), reference.delete_range(key, key + 50))
+                elif operation < 0.82:
+                    keys = [rnd.randint(0, high) for _ in range(rnd.randint(0, 400))]
+                    fill = rnd.choice((0.5, 1.0))
+                    tree.bulk_load(keys, fill=fill)
+                    reference.bulk_load(keys, fill=fill)
+                else:
+                    self.compare(tree, reference, rnd, high)
+                if step % 100 == 0 and tree.root is not None:
+                    self.assertEqual(checkNode(self, tree.root), list(reference))
+            self.assertEqual(list(tree), list(reference))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,227 @@
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from bisect import bisect_left, bisect_right
+
+from btree import BTree, ArrayBTreeNode, BTreeNode, ConcurrentBTree, answerCommands
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def isPrimeReference(n):
+    if n < 2:
+        return False
+    divisor = 2
+    while divisor * divisor <= n:
+        if n % divisor == 0:
+            return False
+        divisor += 1
+    return True
+
+
+def checkNode(test, node, low=None, high=None):
+    """
+    Checks the B-tree invariants of a subtree and returns its key count.
+    """
+    test.assertEqual(len(node.flags), len(node.keys))
+    test.assertEqual(list(node.keys), sorted(node.keys))
+    if low is not None and node.keys:
+        test.assertGreaterEqual(node.keys[0], low)
+    if high is not None and node.keys:
+        test.assertLessEqual(node.keys[-1], high)
+    if node.leaf:
+        return len(node.keys)
+
+    test.assertEqual(len(node.children), len(node.keys) + 1)
+    total = len(node.keys)
+    for i, child in enumerate(node.children):
+        size = checkNode(test, child, node.keys[i - 1] if i else low,
+                         node.keys[i] if i < len(node.keys) else high)
+        test.assertEqual(node.sizes[i], size)
+        test.assertGreaterEqual(len(child.keys), node.t - 1)
+        total += size
+    return total
+
+
+class BTreeTest(unittest.TestCase):
+    """
+    Runs random operations against a sorted list and compares every query.
+    """
+    nodeClass = BTreeNode
+
+    def makeTree(self, t):
+        return BTree(t, self.nodeClass)
+
+    def checkTree(self, tree, reference):
+        if tree.root is not None:
+            self.assertEqual(checkNode(self, tree.root), len(reference))
+        self.assertEqual(tree.size, len(reference))
+        self.assertEqual(list(tree), reference)
+
+    def checkQueries(self, tree, reference, rnd, high):
+        ks = [rnd.randint(-1, len(reference) + 1) for _ in range(20)]
+        expected = [reference[k - 1] if 1 <= k <= len(reference) else -1 for k in ks]
+        self.assertEqual(tree.select_many(ks), expected)
+        self.assertEqual([tree.select(k) for k in ks], expected)
+
+        keys = [rnd.randint(-1, high + 1) for _ in range(20)]
+        expected = [bisect_left(reference, key) + 1 if key in reference else -1 for key in keys]
+        self.assertEqual(tree.rank_many(keys), expected)
+        self.assertEqual([tree.rank(key) for key in keys], expected)
+        self.assertEqual([tree.countLess(key) for key in keys], [bisect_left(reference, key) for key in keys])
+        self.assertEqual([tree.countLess(key, True) for key in keys], [bisect_right(reference, key) for key in keys])
+
+        x = rnd.randint(-1, high)
+        y = x + rnd.randint(-2, high // 2)
+        inRange = [key for key in reference if x <= key <= y]
+        self.assertEqual(list(tree.iter_range(x, y)), inRange)
+        self.assertEqual(tree.keysInRange(x, y), inRange or -1)
+        self.assertEqual(tree.primesInRange(x, y), [key for key in inRange if isPrimeReference(key)] or -1)
+        self.assertEqual(list(tree.iter_keys(x)), reference[bisect_left(reference, x):])
+        self.assertEqual(list(tree.iter_keys(x, reverse=True)), reference[:bisect_right(reference, x)][::-1])
+        key = rnd.randint(-1, high)
+        self.assertEqual(tree.isPrime(key), isPrimeReference(key))
+
+    def test_random_operations(self):
+        rnd = random.Random(1)
+        high = 300
+        for t in (2, 3, 5):
+            tree = self.makeTree(t)
+            reference = []
+            for step in range(1500):
+                operation = rnd.random()
+                if operation < 0.45:
+                    key = rnd.randint(0, high)
+                    tree.insert(key)
+                    reference.insert(bisect_right(reference, key), key)
+                elif operation < 0.7:
+                    key = rnd.randint(0, high)
+                    tree.delete(key)
+                    if key in reference:
+                        reference.remove(key)
+                elif operation < 0.75:
+                    keys = [rnd.randint(0, high) for _ in range(rnd.randint(0, 80))]
+                    removed = 0
+                    for key in keys:
+                        if key in reference:
+                            reference.remove(key)
+                            removed += 1
+                    self.assertEqual(tree.delete_many(keys), removed)
+                elif operation < 0.8:
+                    x = rnd.randint(0, high)
+                    y = x + rnd.randint(0, 60)
+                    survivors = [key for key in reference if not x <= key <= y]
+                    self.assertEqual(tree.delete_range(x, y), len(reference) - len(survivors))
+                    reference = survivors
+                elif operation < 0.82:
+                    reference = sorted(rnd.randint(0, high) for _ in range(rnd.randint(0, 400)))
+                    tree.bulk_load(rnd.sample(reference, len(reference)), fill=rnd.choice((0.5, 0.8, 1.0)))
+                else:
+                    self.checkQueries(tree, reference, rnd, high)
+                if step % 100 == 0:
+                    self.checkTree(tree, reference)
+            self.checkTree(tree, reference)
+
+    def test_bulk_load(self):
+        for t in (2, 4):
+            for count in (0, 1, 2 * t - 1, 2 * t, 1000):
+                for fill in (0.5, 1.0):
+                    keys = list(range(0, 3 * count, 3))
+                    tree = self.makeTree(t)
+                    tree.bulk_load(keys, presorted=True, fill=fill)
+                    self.checkTree(tree, keys)
+                    self.assertEqual(tree.select_many(range(1, count + 1)), keys)
+        with self.assertRaises(ValueError):
+            self.makeTree(2).bulk_load([1], fill=0)
+
+    def test_primes_survive_restructuring(self):
+        # Flags computed before inserts and deletes must stay with their keys
+        rnd = random.Random(2)
+        tree = self.makeTree(2)
+        reference = list(range(500))
+        tree.bulk_load(reference)
+        tree.primesInRange(0, 500)
+        for _ in range(400):
+            key = rnd.randint(0, 600)
+            if key in reference:
+                tree.delete(key)
+                reference.remove(key)
+            else:
+                tree.insert(key)
+                reference.insert(bisect_left(reference, key), key)
+            if rnd.random() < 0.1:
+                tree.primesInRange(rnd.randint(0, 600), 600)
+        self.assertEqual(tree.primesInRange(0, 600), [key for key in reference if isPrimeReference(key)])
+        self.checkTree(tree, reference)
+
+    def test_commands(self):
+        tree = self.makeTree(2)
+        with open(os.path.join(HERE, "keystoinsert.txt")) as f:
+            tree.bulk_load(int(line) for line in f if line.strip())
+        with open(os.path.join(HERE, "keystodelete.txt")) as f:
+            tree.delete_many(int(line) for line in f if line.strip())
+        with open(os.path.join(HERE, "commands.txt")) as f:
+            output = answerCommands(tree, f.read().splitlines())
+        with open(os.path.join(HERE, "expected_output.txt")) as f:
+            self.assertEqual(output.split(), f.read().split())
+
+
+class ArrayBTreeTest(BTreeTest):
+    nodeClass = ArrayBTreeNode
+
+
+class ConcurrentBTreeTest(unittest.TestCase):
+
+    def test_snapshots_do_not_change(self):
+        rnd = random.Random(3)
+        tree = ConcurrentBTree(2)
+        reference = []
+        snapshots = []
+        for step in range(600):
+            key = rnd.randint(0, 200)
+            if rnd.random() < 0.6:
+                tree.insert(key)
+                reference.insert(bisect_right(reference, key), key)
+            else:
+                tree.delete(key)
+                if key in reference:
+                    reference.remove(key)
+            if step % 50 == 0:
+                snapshot = tree.snapshot()
+                snapshot.primesInRange(0, 200)
+                snapshots.append((snapshot, list(reference)))
+        tree.delete_range(50, 150)
+        tree.bulk_load(range(10))
+
+        for snapshot, keys in snapshots:
+            self.assertEqual(list(snapshot), keys)
+            self.assertEqual(snapshot.size, len(keys))
+            self.assertEqual(snapshot.select_many(range(1, len(keys) + 1)), keys)
+            self.assertEqual(snapshot.primesInRange(0, 200), [key for key in keys if isPrimeReference(key)] or -1)
+        self.assertEqual(list(tree.iter_range(0, 100)), list(range(10)))
+
+
+class CommandLineTest(unittest.TestCase):
+
+    def test_sample_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = [os.path.join(HERE, name) for name in ("keystoinsert.txt", "keystodelete.txt", "commands.txt")]
+            subprocess.run([sys.executable, os.path.join(HERE, "btree.py"), "2"] + files, cwd=directory, check=True)
+            with open(os.path.join(directory, "btree_output.txt")) as output, \
+                    open(os.path.join(HERE, "expected_output.txt")) as expected:
+                self.assertEqual(output.read().split(), expected.read().split())
+
+    def test_stdin(self):
+        files = [os.path.join(HERE, name) for name in ("keystoinsert.txt", "keystodelete.txt")]
+        with open(os.path.join(HERE, "commands.txt")) as commands:
+            result = subprocess.run([sys.executable, os.path.join(HERE, "btree.py"), "2"] + files + ["-"],
+                                    stdin=commands, capture_output=True, text=True, check=True)
+        with open(os.path.join(HERE, "expected_output.txt")) as expected:
+            self.assertEqual(result.stdout.split(), expected.read().split())
+
+
+if __name__ == "__main__":
+    unittest.main()
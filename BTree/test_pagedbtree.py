@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from pagedbtree import PagedBTree
+
+
+class PagedBTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "tree.pages")
+
+    def test_delete_range_rebuild(self):
+        # Large ranges rebuild the tree, which resets the pages being read
+        with PagedBTree(self.path, 2, 64) as tree:
+            tree.bulk_load(range(20))
+            self.assertEqual(tree.delete_range(5, 15), 11)
+            self.assertEqual(list(tree), [0, 1, 2, 3, 4, 16, 17, 18, 19])
+
+        with PagedBTree(self.path) as tree:
+            self.assertEqual(list(tree), [0, 1, 2, 3, 4, 16, 17, 18, 19])
+            self.assertEqual(tree.select(6), 16)
+
+    def test_bulk_load_small_cache(self):
+        # Parents are sized while their children are being evicted
+        with PagedBTree(self.path, 16, 34) as tree:
+            tree.bulk_load(range(5000), presorted=True)
+            self.assertEqual(tree.select_many(range(1, 5001)), list(range(5000)))
+            self.assertEqual(tree.delete_many(range(0, 5000, 2)), 2500)
+
+        with PagedBTree(self.path, cacheSize=34) as tree:
+            self.assertEqual(tree.size, 2500)
+            self.assertEqual([tree.select(k) for k in range(1, 2501)], list(range(1, 5000, 2)))
+
+    def test_cache_too_small(self):
+        with self.assertRaises(ValueError):
+            PagedBTree(self.path, 16, 8)
+
+    def test_smallest_cache(self):
+        # 2t + 2 nodes are enough; the pager must not round the size up
+        with PagedBTree(self.path, 2, 6) as tree:
+            self.assertEqual(tree.pager.cacheSize, 6)
+            for key in range(200):
+                tree.insert(key)
+            self.assertEqual(tree.delete_range(50, 149), 100)
+            self.assertEqual(list(tree), list(range(50)) + list(range(150, 200)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import random
+import unittest
+
+import shardedbtree
+from btree import BTree
+from shardedbtree import ShardedBTree
+
+
+class ShardedBTreeTest(unittest.TestCase):
+    """
+    Compares a ShardedBTree against a single BTree holding the same keys.
+    """
+
+    def test_matches_single_tree(self):
+        rnd = random.Random(5)
+        keys = [rnd.randint(0, 500) for _ in range(2000)]
+        with ShardedBTree(3, 3) as tree:
+            reference = BTree(3)
+            tree.bulk_load(keys)
+            reference.bulk_load(keys)
+            for _ in range(300):
+                operation = rnd.random()
+                key = rnd.randint(-10, 520)
+                if operation < 0.3:
+                    tree.insert(key)
+                    reference.insert(key)
+                elif operation < 0.5:
+                    tree.delete(key)
+                    reference.delete(key)
+                elif operation < 0.55:
+                    batch = [rnd.randint(0, 520) for _ in range(30)]
+                    self.assertEqual(tree.delete_many(batch), reference.delete_many(batch))
+                elif operation < 0.6:
+                    self.assertEqual(tree.delete_range(key, key + 10), reference.delete_range(key, key + 10))
+                else:
+                    ks = [rnd.randint(-2, reference.size + 2) for _ in range(20)]
+                    self.assertEqual(tree.select_many(ks), reference.select_many(ks))
+                    queries = [rnd.randint(-2, 520) for _ in range(20)]
+                    self.assertEqual(tree.rank_many(queries), reference.rank_many(queries))
+                    self.assertEqual(tree.keysInRange(key, key + 40), reference.keysInRange(key, key + 40))
+                    self.assertEqual(tree.primesInRange(key, key + 100), reference.primesInRange(key, key + 100))
+            self.assertEqual(tree.size, reference.size)
+
+    def test_inserts_spread_over_shards(self):
+        # Without bulk_load or boundaries the shards are re-partitioned as keys arrive
+        rnd = random.Random(6)
+        with ShardedBTree(3, 4) as tree:
+            reference = BTree(3)
+            for key in range(3000):
+                key = rnd.randint(0, 200) if key % 3 == 0 else key
+                tree.insert(key)
+                reference.insert(key)
+            self.assertTrue(all(tree.counts))
+            self.assertLessEqual(max(tree.counts), max(shardedbtree.REBALANCE_MIN, 2 * tree.size / 4))
+            self.assertEqual(tree.select_many(range(1, 3001)), list(reference))
+
+    def test_iter_range_streams_chunks(self):
+        # Runs of equal keys cross the chunk boundaries
+        chunk = shardedbtree.RANGE_CHUNK
+        shardedbtree.RANGE_CHUNK = 4
+        self.addCleanup(setattr, shardedbtree, "RANGE_CHUNK", chunk)
+        keys = sorted([7] * 11 + list(range(40)) + [25] * 9)
+        with ShardedBTree(2, 3) as tree:
+            tree.bulk_load(keys)
+            for x, y in ((-5, 100), (7, 7), (8, 30), (25, 25), (41, 50)):
+                self.assertEqual(list(tree.iter_range(x, y)), [key for key in keys if x <= key <= y])
+
+    def test_boundaries_are_validated(self):
+        for boundaries in ([1], [1, 2, 3], [5, 2]):
+            with self.assertRaises(ValueError):
+                ShardedBTree(2, 3, boundaries)
+        with ShardedBTree(2, 3, [10, 20]) as tree:
+            for key in (5, 10, 15, 20, 25):
+                tree.insert(key)
+            self.assertEqual(tree.counts, [1, 2, 2])
+            self.assertEqual(list(tree.iter_range(0, 30)), [5, 10, 15, 20, 25])
+
+
+if __name__ == "__main__":
+    unittest.main()
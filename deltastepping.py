@@ -0,0 +1,200 @@
+import random
+import sys
+import time
+from typing import List, Tuple
+
+try:
+    import numpy as np
+except ImportError as error:
+    raise ImportError("deltastepping.py needs NumPy: pip install -r requirements.txt") from error
+
+from dijkstra import CompactTreeMap, TreeMap, route_from_path
+
+# Larger than any escape time, and still safe to add a road time to
+UNREACHED = np.iinfo(np.int64).max // 4
+
+
+class DeltaSteppingTreeMap(CompactTreeMap):
+    # bucket width, chosen from the road times when not given
+    delta = None
+
+    def __init__(self, roads: List[Tuple[int, int, int]], solulus: List[Tuple[int, int, int]], delta: int = None):
+        """
+        Function description:
+        Constructor for DeltaSteppingTreeMap, a CompactTreeMap that answers escape with a delta-stepping search relaxing whole
+        batches of roads with NumPy instead of one road at a time.
+
+        Approach description:
+        The double-sized graph is laid out explicitly as NumPy CSR arrays: the unsealed roads and the solulus are the CompactTreeMap
+        arrays with |T| added to their destinations, then every road is sorted by start vertex, keeping the roads of a tree before
+        its solulus as TreeMap does. Times and previous vertices live in int64 arrays.
+
+        Input:
+        roads - a list of tuples of three integers representing the start, destination and time taken for travel respectively
+        solulus -  a list of tuples of three integers representing the start, time taken to claw a tree, and the destination of teleportation
+        delta - the bucket width, by default the mean road time
+
+        Time complexity: O(|T| + |R|log|R|)
+        Aux space complexity: O(|T| + |R|)
+        """
+        if delta is not None:
+            self.delta = max(delta, 1)
+        super().__init__(roads, solulus)
+
+    def prepare(self):
+        """
+        Function description:
+        Lays out the NumPy arrays once the CSR arrays are in place, after construction or CompactTreeMap.load_snapshot.
+
+        Time complexity: O(|T| + |R|log|R|)
+        Aux space complexity: O(|T| + |R|)
+        """
+        super().prepare()
+        trees_count = self.trees_count
+        road_offsets = np.frombuffer(self.road_offsets, dtype=np.int64)
+        solulu_offsets = np.frombuffer(self.solulu_offsets, dtype=np.int64)
+        road_starts = np.repeat(np.arange(trees_count, dtype=np.int64), np.diff(road_offsets))
+        solulu_starts = np.repeat(np.arange(trees_count, dtype=np.int64), np.diff(solulu_offsets))
+        road_targets = np.frombuffer(self.road_targets, dtype=np.int64)
+        road_weights = np.frombuffer(self.road_weights, dtype=np.int64)
+
+        starts = np.concatenate((road_starts, solulu_starts, road_starts + trees_count))
+        order = np.argsort(starts, kind="stable")
+        self.vertex_offsets = np.concatenate(([0], np.cumsum(np.bincount(starts, minlength=2 * trees_count))))
+        self.edge_targets = np.concatenate((road_targets, np.frombuffer(self.solulu_targets, dtype=np.int64) + trees_count,
+                                            road_targets + trees_count))[order]
+        self.edge_weights = np.concatenate((road_weights, np.frombuffer(self.solulu_weights, dtype=np.int64), road_weights))[order]
+
+        if self.delta is None:
+            self.delta = max(int(self.edge_weights.mean()) if len(self.edge_weights) else 1, 1)
+        self.distance = np.full(2 * trees_count, UNREACHED, dtype=np.int64)
+        self.predecessor = np.full(2 * trees_count, -1, dtype=np.int64)
+        # trees whose time or previous tree the last search wrote
+        self.reached = np.zeros(0, dtype=np.int64)
+
+    def escape(self, start: int, exits: List[int]):
+        """
+        Function description:
+        Finds the shortest escape from start to one of the exits after traversing through a Solulu Tree using delta_stepping. Total
+        times always match TreeMap.escape; where several routes are equally fast the one returned may differ.
+
+        Input:
+        start - integer representing the tree ID of where the bear starts its escape
+        exits - a list of integers representing all exits in the forest
+
+        Output:
+        result - a tuple containing the total time taken during the escape and the route taken to escape
+        OR
+        None
+
+        Time complexity: see delta_stepping
+        Aux space complexity: O(|T|)
+        """
+        exit_found = self.delta_stepping(start, exits)
+        if exit_found is None:
+            return None
+
+        path = [exit_found]
+        while path[-1] != start:
+            path.append(int(self.predecessor[path[-1]]))
+        path.reverse()
+        return (int(self.distance[exit_found]), route_from_path(path, self.trees_count))
+
+    def delta_stepping(self, source: int, exits: List[int]):
+        """
+        Function description:
+        Delta-stepping search from source that stops once the fastest exit is known
+
+        Approach description:
+        Trees are grouped into buckets of width delta by time. The active trees, those whose time improved since their roads were last
+        relaxed, that fall in the current bucket are relaxed together: their roads are gathered from the CSR arrays and the new times
+        are written with np.minimum.at, which keeps the smallest time when several roads reach the same tree. A road sets the previous
+        tree only when it strictly improved its destination, so previous trees form a tree of shortest paths. Improved trees become
+        active and the bucket is repeated until none of its trees is active; its times are then final, so the search stops as soon as
+        an exit has a time inside a finished bucket, and otherwise moves on to the lowest bucket holding an active tree. Times and
+        previous trees stay readable until the next search, which first resets only the trees this one reached.
+
+        Input:
+        source - an integer representing where the bear starts its escape
+        exits - a list of integers representing all exits in the forest
+
+        Output:
+        The vertex ID of the fastest exit on the unsealed forest, or None
+
+        Time complexity: O(|R'| + |T'|log|T'|) vectorised work over B bucket rounds, where |T'|, |R'| are the trees and roads reached
+        Aux space complexity: O(|T'| + |R'|)
+        """
+        distance, predecessor = self.distance, self.predecessor
+        offsets, targets, weights = self.vertex_offsets, self.edge_targets, self.edge_weights
+        exit_ids = np.unique(np.asarray(exits, dtype=np.int64)) + self.trees_count
+        distance[self.reached] = UNREACHED
+        predecessor[self.reached] = -1
+
+        distance[source] = 0
+        active = np.array([source], dtype=np.int64)
+        reached = [active]
+        exit_found = None
+        while len(active):
+            bucket_end = (int(distance[active].min()) // self.delta + 1) * self.delta
+            while True:
+                in_bucket = distance[active] < bucket_end
+                frontier = active[in_bucket]
+                if not len(frontier):
+                    break
+                active = active[~in_bucket]
+
+                # the road indices of every frontier tree, concatenated
+                first = offsets[frontier]
+                counts = offsets[frontier + 1] - first
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                block_starts = np.cumsum(counts) - counts
+                edges = np.arange(total, dtype=np.int64) + np.repeat(first - block_starts, counts)
+
+                starts = np.repeat(frontier, counts)
+                ends = targets[edges]
+                candidate = distance[starts] + weights[edges]
+                before = distance[ends]
+                np.minimum.at(distance, ends, candidate)
+                improved = (candidate < before) & (candidate == distance[ends])
+                predecessor[ends[improved]] = starts[improved]
+
+                improved_ids = np.unique(ends[improved])
+                reached.append(improved_ids)
+                active = np.union1d(active, improved_ids)
+
+            if len(exit_ids) and distance[exit_ids].min() < bucket_end:
+                exit_found = int(exit_ids[np.argmin(distance[exit_ids])])
+                break
+
+        self.reached = np.concatenate(reached)
+        return exit_found
+
+
+def benchmark(trees_count: int = 200000, roads_per_tree: int = 4, max_time: int = 100, queries: int = 5, seed: int = 0):
+    """
+    Function description:
+        Times escape on a random forest with TreeMap, CompactTreeMap and DeltaSteppingTreeMap, checking they agree on every total
+        time.
+    """
+    rnd = random.Random(seed)
+    roads = [(rnd.randrange(trees_count), rnd.randrange(trees_count), rnd.randint(1, max_time))
+             for _ in range(trees_count * roads_per_tree)]
+    solulus = [(rnd.randrange(trees_count), rnd.randint(1, max_time), rnd.randrange(trees_count))
+               for _ in range(max(trees_count // 100, 1))]
+    sample = [(rnd.randrange(trees_count), rnd.sample(range(trees_count), 3)) for _ in range(queries)]
+
+    answers = {}
+    for forest_class in (TreeMap, CompactTreeMap, DeltaSteppingTreeMap):
+        forest = forest_class(roads, solulus)
+        begin = time.perf_counter()
+        answers[forest_class.__name__] = [result and result[0] for result in (forest.escape(*query) for query in sample)]
+        elapsed = time.perf_counter() - begin
+        print(f"{forest_class.__name__:22s} {elapsed / queries:8.3f}s per escape")
+        del forest
+    assert len(set(map(tuple, answers.values()))) == 1, answers
+
+
+if __name__ == "__main__":
+    benchmark(*map(int, sys.argv[1:]))
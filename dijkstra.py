@@ -1,9 +1,16 @@
+import heapq
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
 from typing import List, Tuple, TypeVar
 Vertex = TypeVar("Vertex")
 Edge = TypeVar("Edge")
 
 class TreeMap:
-    def __init__(self, roads: List[Tuple[int, int, int]], solulus: List[Tuple[int, int, int]]):
+    def __init__(self, roads: List[Tuple[int, int, int]], solulus: List[Tuple[int, int, int]], queue = None, cache_size: int = 0,
+                 trees_count: int = 0):
         """
         Function description:
         Constructor for TreeMap
@@ -18,11 +25,19 @@ class TreeMap:
         differentiate the trees from the original graph. As for the Solulu Trees, we swap the time taken to claw the tree and the tree ID
         of the teleportation destination to allow creation of edges with the same 'add_roads' function. The tree ID of the TP destination
         is added with the number of trees so we are taken to the second graph once we use one of the Solulu trees.
+        The input is read once (an iterator is first turned into a list so the trees can be counted): the unsealed forest's roads are
+        copied from the trees of the Delulu Forest rather than from the input, and no list of shifted tuples is kept since the edge
+        lists of the trees are the forest. The roads, seal_undone_roads and solulus properties read the tuples back from the trees.
         
         
         Input:
-        roads - a list of tuples of three integers representing the start, destination and time taken for travel respectively
-        solulus -  a list of tuples of three integers representing the start, time taken to claw a tree, and the destination of teleportation
+        roads - a list of tuples of three integers representing the start, destination and time taken for travel respectively, or an
+                EdgeList
+        solulus -  a list of tuples of three integers representing the start, time taken to claw a tree, and the destination of teleportation,
+                   or an EdgeList
+        queue - the priority queue class used by dijkstra, MinHeap by default (see set_queue)
+        cache_size - how many recent escape results to keep, 0 for none
+        trees_count - the least number of trees, for forests whose last trees have no roads
         
         Output:
         No output lmao
@@ -32,42 +47,146 @@ class TreeMap:
         Aux space complexity: O(|T| + |R|)
         """
     # ToDo: Initialize the graph data structure here.
-        self.roads = roads
-        self.solulus = [None] * len(solulus) 
-       
-        self.trees_count = 0
-        
-        for i in range(len(roads)): #O(|R|)
-            
-            if self.trees_count < roads[i][0]:
-                self.trees_count = roads[i][0]
-            if self.trees_count < roads[i][1]:
-                self.trees_count = roads[i][1]
-                
-        self.trees_count += 1
+        if not isinstance(roads, (list, tuple, EdgeList)):
+            roads = list(roads)
+        self.trees_count = max(count_trees(roads), trees_count) #O(|R|)
         
         self.trees = [None] * self.trees_count * 2
+        self.max_weight = 0
         for i in range(self.trees_count * 2): #O(|T|)
             
             self.trees[i] = Vertex(i)
         
-        self.add_roads(self.roads)
+        self.add_roads(roads)
         
-        self.seal_undone_roads = [None] * len(self.roads)
-        for i in range(len(self.seal_undone_roads)):
-            
-            self.seal_undone_roads[i] = (self.roads[i][0] + self.trees_count, self.roads[i][1] + self.trees_count, self.roads[i][2])
-            
-        self.add_roads(self.seal_undone_roads)
+        self.add_roads((edge.u + self.trees_count, edge.v + self.trees_count, edge.w)
+                       for tree in self.trees[:self.trees_count] for edge in tree.edges)
     
         # solulus: [(Start: 0, Time: 5, Dest: 1)]
         
-        for i in range(len(self.solulus)):
-            self.solulus[i] = (solulus[i][0], solulus[i][2] + self.trees_count, solulus[i][1])
-
+        self.add_roads((x, y + self.trees_count, w) for x, w, y in solulus)
+        
+        # Per-query state lives in epoch stamps on the vertices and one heap reused by every query
+        self.epoch = 0
+        self.set_queue(queue or MinHeap)
         
-        self.add_roads(self.solulus)
+        # Transposed graph for escape_many, built on first use
+        self.reverse_edges = None
+        # Contraction hierarchy for escape_hierarchy, built on first use or by build_hierarchy
+        self.hierarchy = None
         
+        # (start, exits) -> (result, trees served, roads on the route) for recent escapes
+        self.cache_size = cache_size
+        self.escape_cache = OrderedDict()
+    
+    @property
+    def roads(self):
+        """
+        Function description:
+            The roads of the Delulu Forest as (start, destination, time) tuples, including any added or changed since construction,
+            grouped by start tree.
+            
+        Time complexity: O(|T| + |R|)
+        """
+        return [(edge.u, edge.v, edge.w) for tree in self.trees[:self.trees_count] for edge in tree.edges
+                if edge.v < self.trees_count]
+    
+    @property
+    def seal_undone_roads(self):
+        """
+        Function description:
+            The roads of the unsealed forest, i.e. the roads with |T| added to both tree IDs, grouped by start tree.
+            
+        Time complexity: O(|T| + |R|)
+        """
+        return [(edge.u, edge.v, edge.w) for tree in self.trees[self.trees_count:] for edge in tree.edges]
+    
+    @property
+    def solulus(self):
+        """
+        Function description:
+            The solulus as the roads they become: (start, destination + |T|, time taken to claw) tuples, grouped by start tree.
+            
+        Time complexity: O(|T| + |R|)
+        """
+        return [(edge.u, edge.v, edge.w) for tree in self.trees[:self.trees_count] for edge in tree.edges
+                if edge.v >= self.trees_count]
+    
+    @classmethod
+    def from_files(cls, roads_path: str, solulus_path: str, binary: bool = False, chunk_size: int = 1 << 20, **options):
+        """
+        Function description:
+            Builds the forest from edge-list files of roads and solulus (see EdgeList.read). The files are streamed in chunks into
+            compact integer columns, 24 bytes per entry, and the trees' edges are created from those, so no list of tuples is ever
+            held. The columns are dropped once the forest is built.
+            
+        Input:
+            roads_path, solulus_path - the edge-list files
+            binary - True for binary edge lists
+            chunk_size - bytes read at a time
+            options - further constructor arguments (queue, cache_size)
+            
+        Output:
+            The TreeMap
+            
+        Time complexity: O(|T| + |R|)
+        Aux space complexity: O(|T| + |R|)
+        """
+        roads = EdgeList.read(roads_path, binary, chunk_size)
+        solulus = EdgeList.read(solulus_path, binary, chunk_size)
+        return cls(roads, solulus, **options)
+    
+    def save_snapshot(self, path: str):
+        """
+        Function description:
+            Writes the forest as it is now, including roads and solulus added or changed since construction, to a binary snapshot
+            file (see write_snapshot). The file can be loaded by TreeMap.load_snapshot or CompactTreeMap.load_snapshot.
+            
+        Approach description:
+            The trees of the sealed forest hold every road and solulu: an edge to a tree below |T| is a road and an edge to the unsealed
+            forest is a solulu, whose destination is stored without the |T| shift. The edge lists are already grouped by tree, so they
+            are written out in order as CSR arrays.
+            
+        Time complexity: O(|T| + |R|)
+        Aux space complexity: O(|T| + |R|)
+        """
+        road_csr = (array("q", [0]), array("q"), array("q"))
+        solulu_csr = (array("q", [0]), array("q"), array("q"))
+        for i in range(self.trees_count):
+            for edge in self.trees[i].edges:
+                if edge.v < self.trees_count:
+                    road_csr[1].append(edge.v)
+                    road_csr[2].append(edge.w)
+                else:
+                    solulu_csr[1].append(edge.v - self.trees_count)
+                    solulu_csr[2].append(edge.w)
+            road_csr[0].append(len(road_csr[1]))
+            solulu_csr[0].append(len(solulu_csr[1]))
+        write_snapshot(path, self.trees_count, road_csr, solulu_csr)
+    
+    @classmethod
+    def load_snapshot(cls, path: str, **options):
+        """
+        Function description:
+            Rebuilds a forest from a snapshot written by save_snapshot or CompactTreeMap.save_snapshot. The arrays are read straight
+            from the file and the edges are added from them, without parsing text or sizing the forest first.
+            
+        Input:
+            path - the snapshot file
+            options - further constructor arguments (queue, cache_size)
+            
+        Output:
+            The TreeMap
+            
+        Time complexity: O(|T| + |R|)
+        Aux space complexity: O(|T| + |R|)
+        """
+        trees_count, road_csr, solulu_csr = read_snapshot(path)
+        roads = EdgeList.from_csr(*road_csr)
+        solulus = EdgeList.from_csr(*solulu_csr)
+        # solulus are stored as (start, destination, time)
+        solulus.columns = (solulus.columns[0], solulus.columns[2], solulus.columns[1])
+        return cls(roads, solulus, trees_count=trees_count, **options)
         
 
     def escape(self, start: int, exits: List[int]):
@@ -79,14 +198,15 @@ class TreeMap:
         
         Approach description:
         
-        First set isExit attributes to True for all trees with an exit. Exits are only found on the second graph which acts like the forest
-        when the seal is undone thus we have to add the number of trees to the Tree IDs of the exits. After doing so we run dijkstra on the
-        double-sized graph which gives us the exit tree. The idea is that dijkstra will find the shortest path from start to all solulu 
-        trees first which leads to the second graph which contains all the exits and eventually find the one of the exits when the isExit
-        atrribute is true. After using dijkstra, we backtrack using the exit tree and start tree only if the exit we found is not None
+        We run dijkstra on the double-sized graph with the exits, which marks every exit tree for this query and gives us the exit tree.
+        The idea is that dijkstra will find the shortest path from start to all solulu trees first which leads to the second graph which
+        contains all the exits and eventually find the one of the exits when the isExit atrribute is true. After using dijkstra, we backtrack using the exit tree and start tree only if the exit we found is not None
         otherwise we return None. Backtracking is done by retracing all prior trees from the exit tree until we reach the starting tree. 
         We use the time attribute from exit tree accumulated from dijkstra to get our total_time and return the list resulting from the
         backtracking function and return both the total_time and route list.
+        Nothing has to be cleared afterwards: every query runs in a new epoch, so marks left by earlier queries are simply stale.
+        With a cache, the result is kept together with the trees dijkstra served and the roads on the route, which is what later
+        changes to the forest are checked against (see forest_changed).
         
         Input:
         start - integer representing the tree ID of where the bear starts its escape
@@ -97,27 +217,43 @@ class TreeMap:
         OR
         None
         
-        Time complexity: O(|T| + |R|)
-        Aux space complexity: O(|T| + |R|)
+        Time complexity: O(|X| + |R'|log|T'|), where |X| is the number of exits and |T'|, |R'| are the trees and roads explored
+        Aux space complexity: O(|T'|), the heap is allocated once by the constructor
         """
         
-        for i in exits: #O(T)
-
-            self.trees[i + self.trees_count].isExit = True
+        if self.cache_size == 0:
+            exit_found = self.dijkstra(start, exits) 
+            if exit_found != None:
+                total_time = exit_found.time
+                optimal_route = self.dijkstra_backtracking(self.trees[start], exit_found)
+                return (total_time, optimal_route)
+            
+            else:
+                return exit_found
+        
+        key = (start, tuple(sorted(set(exits))))
+        if key in self.escape_cache:
+            self.escape_cache.move_to_end(key)
+            result = self.escape_cache[key][0]
+            return result and (result[0], list(result[1]))
         
-        exit_found = self.dijkstra(start) 
+        settled = []
+        exit_found = self.dijkstra(start, exits, settled)
+        result = None
+        route_roads = set()
         if exit_found != None:
-            total_time = exit_found.time
-            optimal_route = self.dijkstra_backtracking(self.trees[start], exit_found)
-            result = (total_time, optimal_route)
-            self.reset()
-            return result
+            result = (exit_found.time, self.dijkstra_backtracking(self.trees[start], exit_found))
+            current_tree = exit_found
+            while current_tree.id != start:
+                route_roads.add((current_tree.previous.id, current_tree.id))
+                current_tree = current_tree.previous
         
-        else:
-            self.reset()
-            return exit_found
+        self.escape_cache[key] = (result, set(settled), route_roads)
+        if len(self.escape_cache) > self.cache_size:
+            self.escape_cache.popitem(last=False)
+        return result and (result[0], list(result[1]))
         
-    def dijkstra(self, source: int):
+    def dijkstra(self, source: int, exits: List[int] = (), settled: List[int] = None):
         """
         Function description:
         
@@ -125,32 +261,48 @@ class TreeMap:
         exit of the forest.
         Terminates when a tree with an exit is found
         
+        Approach description:
+        
+        Each call starts a new epoch. A vertex counts as discovered, visited or an exit only if the matching attribute holds the current
+        epoch, so stale marks from earlier calls never need clearing and the heap built by the constructor is reused after emptying it.
+        Exits are only found on the second graph which acts like the forest when the seal is undone thus we add the number of trees to
+        the Tree IDs of the exits.
+        
         Input:
         
         source - an integer representing where the bear starts its escape
+        exits - a list of integers representing all exits in the forest
+        settled - if given, a list the IDs of the trees served are appended to
         
         Output: 
         
         The vertex/ tree at which is an exit
         
-        Time complexity: O(|R|log|T|)
-        Space aux complexity: O(|T|), since MinHeap takes in |L| number of locations
+        Time complexity: O(|X| + |R'|log|T'|), where |T'|, |R'| are the trees and roads explored before an exit is found
+        Space aux complexity: O(1), the heap is allocated once by the constructor
         
         """
         
+        self.epoch += 1
+        epoch = self.epoch
+        for i in exits: #O(X)
+            self.trees[i + self.trees_count].isExit = epoch
+        
         start = self.trees[source]
         start.time = 0
     
-        self.discovered = MinHeap(len(self.trees))
+        self.discovered.clear()
         self.discovered.insert(start)
    
         while self.discovered.length > 0:
             
             current_tree = self.discovered.serve()
         
-            current_tree.visit_node()
+            current_tree.visit_node(epoch)
+            if settled is not None:
+                settled.append(current_tree.id)
          
-            if current_tree.isExit == True:
+            if current_tree.isExit == epoch:
                     
                 return current_tree
             
@@ -160,17 +312,17 @@ class TreeMap:
                 adj_tree = self.trees[edge.v]
             
                 
-                if adj_tree.visited == True:
+                if adj_tree.visited == epoch:
                     
                     pass
                 
                 else:
                     
-                    if adj_tree.discovered == False:
+                    if adj_tree.discovered != epoch:
                         
                         adj_tree.time = current_tree.time + edge.w
                         adj_tree.previous = current_tree
-                        adj_tree.discover_node()
+                        adj_tree.discover_node(epoch)
                         self.discovered.insert(adj_tree)
                         
                     else:
@@ -178,10 +330,329 @@ class TreeMap:
                         if adj_tree.time > current_tree.time + edge.w:
                             adj_tree.time = current_tree.time + edge.w
                             adj_tree.previous = current_tree
-                            self.discovered.rise(self.discovered.array_index[adj_tree.id])
+                            self.discovered.update(adj_tree)
                             
                             
                             
+    def escape_many(self, starts: List[int], exits: List[int]):
+        """
+        Function description:
+        
+        Answers escape(start, exits) for every start with a single search
+        
+        Approach description:
+        
+        Instead of one dijkstra per start, run one dijkstra on the transposed double-sized graph from a virtual super-exit joined to
+        every exit tree on the second graph with time 0, which amounts to starting the search with every exit tree in the heap at time
+        0. The time of a tree is then the least time needed to escape from it, and its previous attribute is the next tree on that
+        escape, so each route is read by following previous from the start until an exit. The search stops as soon as every start is
+        visited. Total times always match escape; where several routes are equally fast the one returned may differ.
+        
+        Input:
+        starts - a list of integers representing the tree IDs the bear could start from
+        exits - a list of integers representing all exits in the forest
+        
+        Output:
+        A list with, for each start in order, the (total_time, route) tuple escape would give or None
+        
+        Time complexity: O(|X| + |R|log|T|) for the search plus the length of the routes returned
+        Aux space complexity: O(|T| + |R|) the first time, for the transposed graph, and O(|T|) afterwards
+        """
+        
+        reverse_edges = self.reverse_roads()
+        self.epoch += 1
+        epoch = self.epoch
+        
+        self.discovered.clear()
+        for i in exits: #O(X)
+            exit_tree = self.trees[i + self.trees_count]
+            if exit_tree.discovered != epoch:
+                exit_tree.time = 0
+                exit_tree.previous = None
+                exit_tree.discover_node(epoch)
+                self.discovered.insert(exit_tree)
+        
+        pending = set(starts)
+        while self.discovered.length > 0 and pending:
+            
+            current_tree = self.discovered.serve()
+            current_tree.visit_node(epoch)
+            pending.discard(current_tree.id)
+            
+            for edge in reverse_edges[current_tree.id]:
+                
+                adj_tree = self.trees[edge.v]
+                if adj_tree.visited == epoch:
+                    continue
+                
+                if adj_tree.discovered != epoch:
+                    adj_tree.time = current_tree.time + edge.w
+                    adj_tree.previous = current_tree
+                    adj_tree.discover_node(epoch)
+                    self.discovered.insert(adj_tree)
+                    
+                elif adj_tree.time > current_tree.time + edge.w:
+                    adj_tree.time = current_tree.time + edge.w
+                    adj_tree.previous = current_tree
+                    self.discovered.update(adj_tree)
+        
+        results = []
+        for start in starts:
+            start_tree = self.trees[start]
+            if start_tree.visited != epoch:
+                results.append(None)
+                continue
+            
+            path = []
+            current_tree = start_tree
+            while current_tree is not None: # previous leads towards the exit in the transposed search
+                path.append(current_tree.id)
+                current_tree = current_tree.previous
+            results.append((start_tree.time, self.path_to_route(path)))
+        return results
+    
+    def escape_bidirectional(self, start: int, exits: List[int]):
+        """
+        Function description:
+        
+        Finds the same escape as escape by searching forward from the start and backward from the exits at the same time
+        
+        Approach description:
+        
+        The forward search runs dijkstra from the start over the double-sized graph, the backward search runs dijkstra on the
+        transposed graph from every exit tree on the second graph at time 0. Each step advances the direction with fewer queued trees.
+        Whenever a road reaches a tree already labelled by the other direction, the two partial times give a candidate escape and the
+        best one is kept. Once the smallest queued times of both directions add up to at least the best candidate no shorter escape
+        can exist, so the search stops, usually having settled far fewer trees than one search from the start. Labels are kept in
+        dictionaries so only trees actually reached are touched. Total times always match escape; where several routes are equally
+        fast the one returned may differ.
+        
+        Input:
+        start - integer representing the tree ID of where the bear starts its escape
+        exits - a list of integers representing all exits in the forest
+        
+        Output:
+        result - a tuple containing the total time taken during the escape and the route taken to escape
+        OR
+        None
+        
+        Time complexity: O(|X| + |R'|log|R'|), where |R'| is the number of roads explored by both directions
+        Aux space complexity: O(|T'| + |R'|), plus O(|T| + |R|) the first time for the transposed graph
+        """
+        
+        reverse_edges = self.reverse_roads()
+        # index 0 is the forward search, index 1 the backward search
+        times = ({start: 0}, {})
+        previous = ({start: None}, {})
+        settled = (set(), set())
+        queues = ([(0, start)], [])
+        for i in exits:
+            exit_id = i + self.trees_count
+            if exit_id not in times[1]:
+                times[1][exit_id] = 0
+                previous[1][exit_id] = None
+                queues[1].append((0, exit_id))
+        
+        best_time = float("inf")
+        meeting = None
+        while queues[0] and queues[1] and queues[0][0][0] + queues[1][0][0] < best_time:
+            
+            side = 0 if len(queues[0]) <= len(queues[1]) else 1
+            current_time, current_id = heapq.heappop(queues[side])
+            if current_id in settled[side] or current_time > times[side][current_id]:
+                continue
+            settled[side].add(current_id)
+            
+            if side == 0:
+                edges = self.trees[current_id].edges
+            else:
+                edges = reverse_edges[current_id]
+            for edge in edges:
+                adj_time = current_time + edge.w
+                if edge.v not in settled[side] and adj_time < times[side].get(edge.v, float("inf")):
+                    times[side][edge.v] = adj_time
+                    previous[side][edge.v] = current_id
+                    heapq.heappush(queues[side], (adj_time, edge.v))
+                
+                if edge.v in times[1 - side] and times[side][edge.v] + times[1 - side][edge.v] < best_time:
+                    best_time = times[side][edge.v] + times[1 - side][edge.v]
+                    meeting = edge.v
+        
+        if meeting is None:
+            return None
+        
+        path = []
+        current_id = meeting
+        while current_id is not None:
+            path.append(current_id)
+            current_id = previous[0][current_id]
+        path.reverse()
+        current_id = previous[1][meeting]
+        while current_id is not None:
+            path.append(current_id)
+            current_id = previous[1][current_id]
+        return (times[0][meeting] + times[1][meeting], self.path_to_route(path))
+    
+    def escape_astar(self, start: int, exits: List[int], heuristic):
+        """
+        Function description:
+        
+        Finds the same escape as escape with A* search guided by a heuristic
+        
+        Approach description:
+        
+        Trees are served in order of their time plus the heuristic's estimate of the time still needed to escape, so the search heads
+        towards the exits instead of spreading out evenly. The first exit tree served on the second graph ends the search. A tree
+        whose time improves after it was served is queued again, so the result is optimal for any admissible heuristic, and every tree
+        is served at most once if the heuristic is also consistent. Total times always match escape; where several routes are equally
+        fast the one returned may differ.
+        
+        Input:
+        start - integer representing the tree ID of where the bear starts its escape
+        exits - a list of integers representing all exits in the forest
+        heuristic - a function of a tree ID and whether the seal is undone (the tree is on the second graph), returning a lower bound
+                    on the time needed to escape from it
+        
+        Output:
+        result - a tuple containing the total time taken during the escape and the route taken to escape
+        OR
+        None
+        
+        Time complexity: O(|X| + |R'|log|R'|) heuristic calls and heap operations, where |R'| is the number of roads explored
+        Aux space complexity: O(|X| + |T'| + |R'|)
+        """
+        
+        exit_ids = set()
+        for i in exits:
+            exit_ids.add(i + self.trees_count)
+        
+        times = {start: 0}
+        previous = {start: None}
+        # ties between equal estimates go to the tree with the larger time, i.e. the one closer to an exit
+        queue = [(heuristic(start, False), 0, start)]
+        while queue:
+            
+            _, current_time, current_id = heapq.heappop(queue)
+            current_time = -current_time
+            if current_time > times[current_id]:
+                continue
+            
+            if current_id in exit_ids:
+                path = []
+                while current_id is not None:
+                    path.append(current_id)
+                    current_id = previous[current_id]
+                path.reverse()
+                return (current_time, self.path_to_route(path))
+            
+            for edge in self.trees[current_id].edges:
+                adj_time = current_time + edge.w
+                if adj_time < times.get(edge.v, float("inf")):
+                    times[edge.v] = adj_time
+                    previous[edge.v] = current_id
+                    if edge.v >= self.trees_count:
+                        estimate = heuristic(edge.v - self.trees_count, True)
+                    else:
+                        estimate = heuristic(edge.v, False)
+                    heapq.heappush(queue, (adj_time + estimate, -adj_time, edge.v))
+        return None
+    
+    def reverse_roads(self):
+        """
+        Function description:
+            Returns the transposed graph as a list holding, for each vertex, Edge objects to the vertices with a road or solulu into it.
+            Built on first use and cached until the roads change.
+            
+        Time complexity: O(|T| + |R|) the first time, O(1) afterwards
+        Aux space complexity: O(|T| + |R|)
+        """
+        if self.reverse_edges is None:
+            self.reverse_edges = [[] for _ in range(len(self.trees))]
+            for tree in self.trees:
+                for edge in tree.edges:
+                    self.reverse_edges[edge.v].append(Edge(edge.v, edge.u, edge.w))
+        return self.reverse_edges
+    
+    def path_to_route(self, path: List[int]):
+        """
+        Function description:
+            Converts a list of vertex IDs on the double-sized graph, from the start to the exit, into a route of tree IDs in the format
+            of dijkstra_backtracking: vertices on the second graph are converted back to the original tree IDs, and a tree reached by
+            using its own Solulu is not repeated.
+            
+        Input:
+            path - a list of vertex IDs starting at the start vertex
+            
+        Output:
+            A list of integers representing the route
+            
+        Time complexity: O(P), where P is the length of the path
+        Aux space complexity: O(P)
+        """
+        return route_from_path(path, self.trees_count)
+    
+    def build_hierarchy(self, path: str = None):
+        """
+        Function description:
+            Preprocesses the double-sized graph into a ContractionHierarchy used by escape_hierarchy, optionally saving it to a file so
+            it can be reloaded with load_hierarchy instead of rebuilt.
+            
+        Input:
+            path - file to save the hierarchy to, or None
+            
+        Output:
+            The ContractionHierarchy
+            
+        Time complexity: see ContractionHierarchy.build
+        """
+        self.hierarchy = ContractionHierarchy.build(self)
+        if path is not None:
+            self.hierarchy.save(path)
+        return self.hierarchy
+    
+    def load_hierarchy(self, path: str):
+        """
+        Function description:
+            Loads a hierarchy saved by build_hierarchy for escape_hierarchy to use. Raises ValueError if it was built for a forest with
+            a different number of trees. The file must come from this forest as it is now: the hierarchy is not checked against the
+            roads themselves.
+            
+        Input:
+            path - the file written by build_hierarchy
+            
+        Output:
+            The ContractionHierarchy
+            
+        Time complexity: see ContractionHierarchy.load
+        """
+        hierarchy = ContractionHierarchy.load(path)
+        if hierarchy.trees_count != self.trees_count or len(hierarchy.rank) != len(self.trees):
+            raise ValueError(f"{path} indexes {hierarchy.trees_count} trees and {len(hierarchy.rank)} vertices, but the forest has "
+                             f"{self.trees_count} trees and {len(self.trees)} vertices")
+        self.hierarchy = hierarchy
+        return hierarchy
+    
+    def escape_hierarchy(self, start: int, exits: List[int]):
+        """
+        Function description:
+            Answers escape with the contraction hierarchy of this forest, building it first if needed. Total times always match escape;
+            where several routes are equally fast the one returned may differ.
+            
+        Input:
+            start - integer representing the tree ID of where the bear starts its escape
+            exits - a list of integers representing all exits in the forest
+            
+        Output:
+            result - a tuple containing the total time taken during the escape and the route taken to escape
+            OR
+            None
+            
+        Time complexity: see ContractionHierarchy.escape, plus ContractionHierarchy.build the first time
+        """
+        if self.hierarchy is None:
+            self.build_hierarchy()
+        return self.hierarchy.escape(start, exits)
+    
     def dijkstra_backtracking(self, start: Vertex, end: Vertex):
         
         """
@@ -237,7 +708,7 @@ class TreeMap:
             
         Input:
             
-            roads - a list of tuples containing the (starting vertex, ending vertex, time taken)
+            roads - an iterable of tuples containing the (starting vertex, ending vertex, time taken)
             
         Time complexity: O(|R|)
         Aux space complexity: O(1), constant time
@@ -253,15 +724,204 @@ class TreeMap:
             current_tree = self.trees[u]
             
             current_tree.add_edge(current_edge)
+            if w > self.max_weight:
+                self.max_weight = w
+    
+    def set_queue(self, queue):
+        """
+        Function description:
+            Chooses the priority queue used by dijkstra and escape_many. Any class constructed with (size, max_weight) and providing
+            insert, update, serve, clear and length, ordering vertices by their time attribute: MinHeap, LazyHeap, BucketQueue or
+            PairingHeap.
             
-    def reset(self):
+        Input:
+            queue - the priority queue class
+            
+        Time complexity: that of constructing the queue, O(|T|) for MinHeap
+        """
+        self.queue = queue
+        self.discovered = queue(len(self.trees), self.max_weight)
+    
+    def max_weight_changed(self):
+        """
+        Function description:
+            Brings the queue up to date after max_weight has grown. MinHeap, LazyHeap and PairingHeap do not use it, a queue with a
+            grow method such as BucketQueue adds buckets in place, and any other queue is rebuilt.
+            
+        Time complexity: O(1) amortised for the built-in queues, that of constructing the queue otherwise
+        """
+        if hasattr(self.discovered, "grow"):
+            self.discovered.grow(self.max_weight)
+        elif self.queue not in (MinHeap, LazyHeap, PairingHeap):
+            self.set_queue(self.queue)
+    
+    def add_road(self, u: int, v: int, w: int):
+        """
+        Function description:
+            Adds a road from tree u to tree v taking time w to both the Delulu Forest and the unsealed forest, growing the forest first
+            if u or v is a new tree.
+            
+        Time complexity: O(1) amortised, O(|T| + |R|) when the forest grows
+        Aux space complexity: O(1) amortised
+        """
+        self.ensure_tree(max(u, v))
+        previous_max = self.max_weight
+        self.add_roads([(u, v, w), (u + self.trees_count, v + self.trees_count, w)])
+        if self.max_weight != previous_max:
+            self.max_weight_changed()
+        self.forest_changed([(u, v), (u + self.trees_count, v + self.trees_count)], True)
+    
+    def add_solulu(self, x: int, w: int, y: int):
+        """
+        Function description:
+            Adds a Solulu tree at x taking time w to claw, teleporting to tree y once the seal is undone, growing the forest first if x
+            or y is a new tree.
+            
+        Time complexity: O(1) amortised, O(|T| + |R|) when the forest grows
+        Aux space complexity: O(1) amortised
+        """
+        self.ensure_tree(max(x, y))
+        previous_max = self.max_weight
+        self.add_roads([(x, y + self.trees_count, w)])
+        if self.max_weight != previous_max:
+            self.max_weight_changed()
+        self.forest_changed([(x, y + self.trees_count)], True)
+    
+    def remove_road(self, u: int, v: int, w: int = None):
+        """
+        Function description:
+            Removes the road from tree u to tree v, the one taking time w if given, from both forests. Raises ValueError if there is no
+            such road.
+            
+        Time complexity: O(D), where D is the number of roads leaving u
+        Aux space complexity: O(1)
+        """
+        for edges, i in self.find_road(u, v, w):
+            del edges[i]
+        self.forest_changed([(u, v), (u + self.trees_count, v + self.trees_count)], False)
+    
+    def update_weight(self, u: int, v: int, w: int):
+        """
+        Function description:
+            Changes the time taken by the road from tree u to tree v to w in both forests. Raises ValueError if there is no such road.
+            
+        Time complexity: O(D), where D is the number of roads leaving u
+        Aux space complexity: O(1)
+        """
+        found = self.find_road(u, v)
+        old_w = found[0][0][found[0][1]].w
+        for edges, i in found:
+            edges[i].w = w
+        
+        if w > self.max_weight:
+            self.max_weight = w
+            self.max_weight_changed()
+        if w != old_w:
+            self.forest_changed([(u, v), (u + self.trees_count, v + self.trees_count)], w < old_w)
+    
+    def find_road(self, u: int, v: int, w: int = None):
+        """
+        Function description:
+            Finds the road from tree u to tree v, the one taking time w if given, in both forests without changing anything, so
+            remove_road and update_weight either change both copies or raise before touching either. Raises ValueError if u or v is
+            not a tree of the Delulu Forest (a destination of |T| or more would be a solulu) or if either forest lacks the road.
+            
+        Output:
+            [(edges, i), (edges, i)], the edge list of u and the index of the road in it for the Delulu and the unsealed forest
+            
+        Time complexity: O(D), where D is the number of roads leaving u
+        Aux space complexity: O(1)
+        """
+        if not (0 <= u < self.trees_count and 0 <= v < self.trees_count):
+            raise ValueError(f"no road from {u} to {v}")
+        found = []
+        for layer in (0, self.trees_count):
+            edges = self.trees[u + layer].edges
+            for i in range(len(edges)):
+                if edges[i].v == v + layer and (w is None or edges[i].w == w):
+                    w = edges[i].w
+                    found.append((edges, i))
+                    break
+            else:
+                raise ValueError(f"no road from {u} to {v}")
+        return found
+    
+    def ensure_tree(self, tree: int):
+        """
+        Function description:
+            Makes sure tree IDs up to the given one exist, at least doubling the number of trees when the forest has to grow.
+            
+        Approach description:
+            The unsealed forest starts at trees_count, so growing moves it: every tree on the second graph and every road or solulu
+            leading there gets its IDs shifted by the number of trees added. Doubling keeps the total cost of growing linear in the
+            number of trees added. Trees without roads are simply unreachable.
+            
+        Time complexity: O(1) if the tree exists, O(|T| + |R|) otherwise
+        Aux space complexity: O(|T|) when the forest grows
+        """
+        if tree < self.trees_count:
+            return
         
+        old_count = self.trees_count
+        new_count = max(2 * old_count, tree + 1)
+        shift = new_count - old_count
+        for current_tree in self.trees[:old_count]:
+            for edge in current_tree.edges:
+                if edge.v >= old_count:
+                    edge.v += shift
+        for current_tree in self.trees[old_count:]:
+            current_tree.id += shift
+            for edge in current_tree.edges:
+                edge.u += shift
+                edge.v += shift
+        
+        self.trees = self.trees[:old_count] + [Vertex(i) for i in range(old_count, new_count)] + \
+            self.trees[old_count:] + [Vertex(i + new_count) for i in range(old_count, new_count)]
+        self.trees_count = new_count
+        self.set_queue(self.queue)
+        # cached searches refer to the old IDs of the unsealed forest
+        self.escape_cache.clear()
+        self.forest_changed([], False)
+    
+    def forest_changed(self, roads: List[Tuple[int, int]], faster: bool):
+        """
+        Function description:
+            Drops everything derived from the forest after a change to the given roads (as vertex ID pairs on the double-sized graph).
+            The transposed graph and contraction hierarchy are rebuilt on next use. A cached escape stays valid unless one of the roads
+            is on its route, or the road was added or became faster and starts at a tree its search served: only those trees are
+            reached in less than the cached time, so no other change can make a faster escape.
+            
+        Input:
+            roads - the changed roads as (start, destination) vertex IDs
+            faster - True if the roads were added or now take less time
+            
+        Time complexity: O(C * |roads|), where C is the number of cached escapes
+        Aux space complexity: O(1)
+        """
+        self.reverse_edges = None
+        self.hierarchy = None
+        for key in list(self.escape_cache):
+            _, settled, route_roads = self.escape_cache[key]
+            for road in roads:
+                if road in route_roads or (faster and road[0] in settled):
+                    del self.escape_cache[key]
+                    break
+            
+    def reset(self):
+        """
+        Function description:
+            Clears the epoch marks and previous pointers of every tree. Queries do not need this since each runs in a new epoch.
+            
+        Time complexity: O(|T|)
+        Aux space complexity: O(1), constant time
+        """
         for tree in self.trees:
             
-            tree.discovered = False
-            tree.visited = False
-            tree.isExit = False
-            tree.previous = False
+            tree.discovered = 0
+            tree.visited = 0
+            tree.isExit = 0
+            tree.previous = None
+        self.epoch = 0
         
 
 
@@ -271,7 +931,8 @@ class Vertex:
             Function description: 
             Constructor for Vertex class
             Has a list containing the egdes connecting it to other trees
-            Has 3 boolean variables to check if the vertex has been discovered and visited and if the vertex is an exit
+            Has 3 epoch stamps to check if the vertex has been discovered and visited and if the vertex is an exit during the current
+            query; 0 means never
             Time for the time taken to reach this vertex
             Previous for the vertex prior before arriving to this vertex
         
@@ -285,11 +946,11 @@ class Vertex:
         
         self.id = id
         self.edges = []
-        self.visited = False
-        self.discovered = False
+        self.visited = 0
+        self.discovered = 0
         self.previous = None
         self.time = float("inf")
-        self.isExit = False
+        self.isExit = 0
         
         
     def add_edge(self, edge: Edge):
@@ -306,23 +967,23 @@ class Vertex:
         """
         self.edges.append(edge)
         
-    def discover_node(self):
+    def discover_node(self, epoch: int):
         """
         Function description: 
-            Sets discovered to true
+            Marks the vertex as discovered during the query of the given epoch
             
         Time complexity: O(1)
         """
-        self.discovered = True
+        self.discovered = epoch
     
-    def visit_node(self):
+    def visit_node(self, epoch: int):
         """
         Function description: 
-            Sets visited to true
+            Marks the vertex as visited during the query of the given epoch
             
         Time complexity: O(1)
         """
-        self.visited = True
+        self.visited = epoch
     
         
     def __str__(self) -> str:
@@ -372,9 +1033,9 @@ class Edge:
 
 
 class MinHeap():
-    def __init__(self,size):
+    def __init__(self,size, max_weight = None):
         """
-        Constructor for MinHeap
+        Constructor for MinHeap, max_weight is unused
         """
         self.array = [None] * (size + 1)
         self.array_index = [0] * (size + 1)
@@ -390,10 +1051,24 @@ class MinHeap():
         self.array_index[element.id] = self.length
         self.rise(self.length)
     
-    def serve(self):
+    def clear(self):
         """
-        Removes and returns the smallest number in the MinHeap's array
-        Time Complexity: O(log V), where V is the number of elements in the MinHeap
+        Empties the MinHeap so it can be reused; stale entries are overwritten by later inserts
+        Time Complexity: O(1)
+        """
+        self.length = 0
+    
+    def update(self, element: Vertex):
+        """
+        Restores the heap order after the element's time decreased
+        Time Complexity: O(log V), where V is the number of elements in the MinHeap
+        """
+        self.rise(self.array_index[element.id])
+    
+    def serve(self):
+        """
+        Removes and returns the smallest number in the MinHeap's array
+        Time Complexity: O(log V), where V is the number of elements in the MinHeap
         """
         self.swap(1, self.length)
         pop = self.array[self.length]
@@ -440,6 +1115,1144 @@ class MinHeap():
                 break
 
 
+class LazyHeap():
+    def __init__(self, size, max_weight = None):
+        """
+        Constructor for LazyHeap, a priority queue of vertices on the C-implemented heapq module. A decreased time pushes a new entry
+        instead of moving the old one, and outdated entries are skipped when served. Ties are broken by vertex ID.
+        """
+        self.array = []
+        self.length = 0
+    
+    def insert(self, element: Vertex):
+        """
+        Add a vertex to the LazyHeap
+        Time Complexity: O(log E), where E is the number of entries including outdated ones
+        """
+        heapq.heappush(self.array, (element.time, element.id, element))
+        self.length += 1
+    
+    def update(self, element: Vertex):
+        """
+        Records the vertex's decreased time; the entry with the old time becomes outdated
+        Time Complexity: O(log E)
+        """
+        heapq.heappush(self.array, (element.time, element.id, element))
+    
+    def serve(self):
+        """
+        Removes and returns the vertex with the smallest time
+        Time Complexity: O(log E) amortised
+        """
+        while True:
+            entry_time, _, element = heapq.heappop(self.array)
+            if entry_time == element.time:
+                self.length -= 1
+                return element
+    
+    def clear(self):
+        """
+        Empties the LazyHeap so it can be reused
+        Time Complexity: O(1)
+        """
+        self.array = []
+        self.length = 0
+
+
+class BucketQueue():
+    def __init__(self, size, max_weight):
+        """
+        Constructor for BucketQueue, Dial's bucket queue for small non-negative integer times. While serving time d, every queued time
+        lies in d...d + max_weight, so max_weight + 1 buckets indexed by time modulo their count hold all of them. Entries with a time
+        that has since decreased are skipped when served. Vertices with equal times are served in insertion order.
+        """
+        if not isinstance(max_weight, int) or max_weight < 0:
+            raise ValueError("BucketQueue needs non-negative integer road times")
+        self.buckets = [[] for _ in range(max_weight + 1)]
+        # indices of buckets that were empty when an entry was added since the last clear, so clear only visits those
+        self.used = []
+        self.current = None
+        self.position = 0
+        self.length = 0
+    
+    def insert(self, element: Vertex):
+        """
+        Add a vertex to the bucket of its time, which must not be below the last time served since clear
+        Time Complexity: O(1)
+        """
+        if self.current is None:
+            self.current = element.time
+        self.update(element)
+        self.length += 1
+    
+    def update(self, element: Vertex):
+        """
+        Moves the vertex to the bucket of its decreased time; the old entry becomes outdated
+        Time Complexity: O(1)
+        """
+        index = element.time % len(self.buckets)
+        bucket = self.buckets[index]
+        if not bucket:
+            self.used.append(index)
+        bucket.append((element.time, element))
+    
+    def serve(self):
+        """
+        Removes and returns the vertex with the smallest time, moving on to later buckets when the current one is used up
+        Time Complexity: O(1) amortised over a search, plus O(max_weight) to step over empty buckets
+        """
+        while True:
+            bucket = self.buckets[self.current % len(self.buckets)]
+            while self.position < len(bucket):
+                entry_time, element = bucket[self.position]
+                self.position += 1
+                if entry_time == element.time:
+                    self.length -= 1
+                    return element
+            bucket.clear()
+            self.current += 1
+            self.position = 0
+    
+    def clear(self):
+        """
+        Empties the BucketQueue so it can be reused
+        Time Complexity: O(B), where B is the number of buckets filled since the last clear, at most the number of entries added
+        """
+        for index in self.used:
+            self.buckets[index].clear()
+        self.used.clear()
+        self.current = None
+        self.position = 0
+        self.length = 0
+    
+    def grow(self, max_weight: int):
+        """
+        Makes room for road times up to max_weight, at least doubling the buckets when more are needed so that a run of growing
+        times costs O(1) amortised each. The queue is emptied, as times map to different buckets afterwards.
+        Time Complexity: O(max_weight) when buckets are added, O(1) otherwise
+        """
+        if max_weight + 1 <= len(self.buckets):
+            return
+        self.clear()
+        self.buckets.extend([] for _ in range(max(max_weight + 1, 2 * len(self.buckets)) - len(self.buckets)))
+
+
+class PairingNode():
+    __slots__ = ("element", "child", "sibling", "prev")
+    
+    def __init__(self, element: Vertex):
+        """
+        Constructor for a PairingHeap node: prev is the parent for a first child and the left sibling otherwise
+        """
+        self.element = element
+        self.child = None
+        self.sibling = None
+        self.prev = None
+
+
+class PairingHeap():
+    def __init__(self, size, max_weight = None):
+        """
+        Constructor for PairingHeap, with O(1) insert and O(1) amortised update by cutting the vertex's subtree and melding it with
+        the root
+        """
+        self.nodes = [None] * size
+        self.root = None
+        self.length = 0
+    
+    def meld(self, a, b):
+        """
+        Links two heap-ordered trees, the root with the larger time becoming the first child of the other
+        Time Complexity: O(1)
+        """
+        if a is None:
+            return b
+        if b is None:
+            return a
+        if b.element.time < a.element.time:
+            a, b = b, a
+        b.prev = a
+        b.sibling = a.child
+        if a.child is not None:
+            a.child.prev = b
+        a.child = b
+        return a
+    
+    def insert(self, element: Vertex):
+        """
+        Add a vertex to the PairingHeap
+        Time Complexity: O(1)
+        """
+        node = PairingNode(element)
+        self.nodes[element.id] = node
+        self.root = self.meld(self.root, node)
+        self.length += 1
+    
+    def update(self, element: Vertex):
+        """
+        Restores the heap order after the vertex's time decreased
+        Time Complexity: O(1), O(log V) amortised
+        """
+        node = self.nodes[element.id]
+        if node is self.root:
+            return
+        if node.prev.child is node:
+            node.prev.child = node.sibling
+        else:
+            node.prev.sibling = node.sibling
+        if node.sibling is not None:
+            node.sibling.prev = node.prev
+        node.sibling = node.prev = None
+        self.root = self.meld(self.root, node)
+    
+    def serve(self):
+        """
+        Removes and returns the vertex with the smallest time, pairing up the root's children left to right and melding the pairs
+        right to left
+        Time Complexity: O(log V) amortised
+        """
+        served = self.root
+        pairs = []
+        node = served.child
+        while node is not None:
+            following = node.sibling
+            node.sibling = node.prev = None
+            if following is not None:
+                node_after = following.sibling
+                following.sibling = following.prev = None
+                node = self.meld(node, following)
+                following = node_after
+            pairs.append(node)
+            node = following
+        
+        self.root = None
+        for node in reversed(pairs):
+            self.root = self.meld(node, self.root)
+        self.length -= 1
+        return served.element
+    
+    def clear(self):
+        """
+        Empties the PairingHeap so it can be reused
+        Time Complexity: O(1)
+        """
+        self.root = None
+        self.length = 0
+
+
+def benchmark_queues(roads: List[Tuple[int, int, int]], solulus: List[Tuple[int, int, int]], queries: List[Tuple[int, List[int]]],
+                     queues = None):
+    """
+    Function description:
+        Times escape for a sample of queries with each priority queue and returns the fastest, so the queue can be chosen for a
+        forest's weight distribution. Queues that cannot handle the road times (BucketQueue with large or fractional times) are
+        skipped.
+        
+    Input:
+        roads, solulus - the forest, as for TreeMap
+        queries - a list of (start, exits) tuples
+        queues - the queue classes to try, all four by default
+        
+    Output:
+        A tuple of the fastest queue class and a dictionary of seconds taken by each queue name
+        
+    Time complexity: that of the queries, once per queue
+    """
+    if queues is None:
+        queues = (MinHeap, LazyHeap, BucketQueue, PairingHeap)
+    forest = TreeMap(roads, solulus)
+    timings = {}
+    best = None
+    for queue in queues:
+        if queue is BucketQueue and forest.max_weight > 1 << 16:
+            continue
+        try:
+            forest.set_queue(queue)
+        except ValueError:
+            continue
+        start = time.perf_counter()
+        for query in queries:
+            forest.escape(*query)
+        timings[queue.__name__] = time.perf_counter() - start
+        if best is None or timings[queue.__name__] < timings[best.__name__]:
+            best = queue
+    return best, timings
+
+
+def route_from_path(path: List[int], trees_count: int):
+    """
+    Function description:
+        Converts a list of vertex IDs on the double-sized graph, from the start to the exit, into a route of tree IDs in the format of
+        TreeMap.dijkstra_backtracking: vertices on the second graph are converted back to the original tree IDs, and a tree reached by
+        using its own Solulu is not repeated.
+        
+    Input:
+        path - a list of vertex IDs starting at the start vertex
+        trees_count - the number of trees, the offset of the second graph
+        
+    Output:
+        A list of integers representing the route
+        
+    Time complexity: O(P), where P is the length of the path
+    Aux space complexity: O(P)
+    """
+    route = [path[0]]
+    for i in range(1, len(path)):
+        current_location = path[i]
+        if current_location >= trees_count:
+            current_location -= trees_count
+        if path[i - 1] != current_location:
+            route.append(current_location)
+    return route
+
+
+def count_trees(roads: List[Tuple[int, int, int]]):
+    """
+    Function description:
+        Returns the number of trees in a forest, one more than the largest tree ID used by a road.
+        
+    Time complexity: O(|R|)
+    """
+    if isinstance(roads, EdgeList):
+        return max(max(roads.columns[0], default=0), max(roads.columns[1], default=0)) + 1
+    
+    trees_count = 0
+    for road in roads:
+        if trees_count < road[0]:
+            trees_count = road[0]
+        if trees_count < road[1]:
+            trees_count = road[1]
+    return trees_count + 1
+
+
+# Snapshot file header: magic, number of trees, number of roads, number of solulus
+SNAPSHOT_HEADER = struct.Struct("<8sqqq")
+SNAPSHOT_MAGIC = b"TREEMAP1"
+
+
+def write_snapshot(path: str, trees_count: int, road_csr: Tuple[array, array, array], solulu_csr: Tuple[array, array, array]):
+    """
+    Function description:
+        Writes a forest snapshot: a header holding the number of trees, roads and solulus, then the offsets, targets and times of the
+        roads and then of the solulus, all as little-endian signed 64-bit integers. Solulu targets are original tree IDs.
+        
+    Time complexity: O(|T| + |R|)
+    Aux space complexity: O(1), apart from a swapped copy on big-endian machines
+    """
+    with open(path, "wb") as out_file:
+        out_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, trees_count, len(road_csr[1]), len(solulu_csr[1])))
+        for values in road_csr + solulu_csr:
+            if sys.byteorder == "big":
+                values = array("q", values)
+                values.byteswap()
+            values.tofile(out_file)
+
+
+def read_snapshot(path: str):
+    """
+    Function description:
+        Reads a snapshot written by write_snapshot.
+        
+    Output:
+        The number of trees, the road CSR arrays and the solulu CSR arrays
+        
+    Time complexity: O(|T| + |R|)
+    Aux space complexity: O(|T| + |R|)
+    """
+    with open(path, "rb") as in_file:
+        magic, trees_count, road_count, solulu_count = SNAPSHOT_HEADER.unpack(in_file.read(SNAPSHOT_HEADER.size))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a TreeMap snapshot")
+        arrays = []
+        for count in (trees_count + 1, road_count, road_count, trees_count + 1, solulu_count, solulu_count):
+            values = array("q")
+            values.fromfile(in_file, count)
+            if sys.byteorder == "big":
+                values.byteswap()
+            arrays.append(values)
+    return trees_count, tuple(arrays[:3]), tuple(arrays[3:])
+
+
+def build_csr(vertex_count: int, edges: List[Tuple[int, int, int]], u_index: int = 0, v_index: int = 1, w_index: int = 2):
+    """
+    Function description:
+        Packs edges into compressed sparse row form: the edges leaving vertex u are targets[offsets[u]:offsets[u + 1]] with the
+        matching weights, kept in input order.
+        
+    Input:
+        vertex_count - number of vertices
+        edges - a list of tuples or an EdgeList holding the start vertex, end vertex and weight at the given indices
+        
+    Output:
+        offsets, targets, weights - arrays of signed 64-bit integers
+        
+    Time complexity: O(V + E), counting sort on the start vertex
+    Aux space complexity: O(V + E)
+    """
+    if isinstance(edges, EdgeList):
+        return csr_from_columns(vertex_count, edges.columns[u_index], edges.columns[v_index], edges.columns[w_index])
+    
+    offsets = array("q", bytes(8 * (vertex_count + 1)))
+    for edge in edges:
+        offsets[edge[u_index] + 1] += 1
+    for u in range(vertex_count):
+        offsets[u + 1] += offsets[u]
+    
+    next_slot = offsets[:-1]
+    targets = array("q", bytes(8 * offsets[-1]))
+    weights = array("q", bytes(8 * offsets[-1]))
+    for edge in edges:
+        u = edge[u_index]
+        i = next_slot[u]
+        targets[i] = edge[v_index]
+        weights[i] = edge[w_index]
+        next_slot[u] = i + 1
+    return offsets, targets, weights
+
+
+def csr_from_columns(vertex_count: int, starts: array, ends: array, weights: array):
+    """
+    Function description:
+        build_csr for edges given as three columns instead of tuples.
+        
+    Time complexity: O(V + E)
+    Aux space complexity: O(V + E)
+    """
+    offsets = array("q", bytes(8 * (vertex_count + 1)))
+    for u in starts:
+        offsets[u + 1] += 1
+    for u in range(vertex_count):
+        offsets[u + 1] += offsets[u]
+    
+    next_slot = offsets[:-1]
+    targets = array("q", bytes(8 * offsets[-1]))
+    csr_weights = array("q", bytes(8 * offsets[-1]))
+    for u, v, w in zip(starts, ends, weights):
+        i = next_slot[u]
+        targets[i] = v
+        csr_weights[i] = w
+        next_slot[u] = i + 1
+    return offsets, targets, csr_weights
+
+
+class EdgeList:
+    def __init__(self):
+        """
+        Constructor for EdgeList, a list of (a, b, c) integer tuples such as roads or solulus stored as three columns of signed 64-bit
+        integers, 24 bytes per entry instead of a tuple object each. Indexing and iteration give tuples, so an EdgeList can be used
+        wherever TreeMap and CompactTreeMap take a list of tuples.
+        """
+        self.columns = (array("q"), array("q"), array("q"))
+    
+    def __len__(self):
+        return len(self.columns[0])
+    
+    def __getitem__(self, index):
+        return (self.columns[0][index], self.columns[1][index], self.columns[2][index])
+    
+    def __iter__(self):
+        return zip(*self.columns)
+    
+    @classmethod
+    def from_csr(cls, offsets: array, targets: array, weights: array):
+        """
+        Returns the (start, target, weight) entries of CSR arrays as an EdgeList.
+        Time Complexity: O(V + E)
+        """
+        edges = cls()
+        starts = edges.columns[0]
+        for u in range(len(offsets) - 1):
+            starts.extend(array("q", [u]) * (offsets[u + 1] - offsets[u]))
+        edges.columns[1].extend(targets)
+        edges.columns[2].extend(weights)
+        return edges
+    
+    def append(self, a: int, b: int, c: int):
+        self.columns[0].append(a)
+        self.columns[1].append(b)
+        self.columns[2].append(c)
+    
+    def extend_flat(self, values: array):
+        """
+        Appends the entries of a flat array a0, b0, c0, a1, b1, c1, ...
+        Time Complexity: O(N)
+        """
+        if len(values) % 3:
+            raise ValueError("edge list entries must have exactly three integers")
+        for k in range(3):
+            self.columns[k].extend(values[k::3])
+    
+    @classmethod
+    def read(cls, path: str, binary: bool = False, chunk_size: int = 1 << 20):
+        """
+        Function description:
+            Streams an edge-list file into a new EdgeList, chunk_size bytes at a time.
+            A text file holds one entry per line as three whitespace separated integers, in the same order as the tuples given to
+            TreeMap (start, destination, time for roads; start, time, destination for solulus); blank lines are skipped and any other
+            line raises ValueError with its line number. A binary file, as written by write, holds the entries as consecutive
+            little-endian signed 64-bit integers.
+            
+        Input:
+            path - the file to read
+            binary - True for the binary format
+            chunk_size - bytes read at a time
+            
+        Output:
+            The EdgeList
+            
+        Time complexity: O(E)
+        Aux space complexity: O(E) for the columns, plus O(chunk_size)
+        """
+        edges = cls()
+        with open(path, "rb") as in_file:
+            if binary:
+                chunk_size = max(chunk_size // 24, 1) * 24
+                while True:
+                    chunk = in_file.read(chunk_size)
+                    if not chunk:
+                        break
+                    if len(chunk) % 24:
+                        raise ValueError(f"{path} is not a binary edge list")
+                    values = array("q")
+                    values.frombytes(chunk)
+                    if sys.byteorder == "big":
+                        values.byteswap()
+                    edges.extend_flat(values)
+                return edges
+            
+            rest = b""
+            line = 1
+            while True:
+                chunk = in_file.read(chunk_size)
+                if not chunk:
+                    break
+                chunk = rest + chunk
+                # keep a partial last line for the next chunk
+                cut = chunk.rfind(b"\n") + 1
+                rest = chunk[cut:]
+                edges.extend_flat(cls.parse_lines(path, chunk[:cut], line))
+                line += chunk.count(b"\n", 0, cut)
+            edges.extend_flat(cls.parse_lines(path, rest, line))
+        return edges
+    
+    @staticmethod
+    def parse_lines(path: str, text: bytes, first_line: int):
+        """
+        Returns the integers of whole lines of a text edge list, numbered from first_line, as a flat array. Raises ValueError naming
+        the first line that is neither blank nor three integers.
+        When every line has zero or three fields the integers are split off the whole text at once; otherwise, or if a field is not
+        an integer, the lines are parsed one at a time to find the bad one.
+        Time Complexity: O(N)
+        """
+        lines = text.split(b"\n")
+        if set(map(len, map(bytes.split, lines))) <= {0, 3}:
+            try:
+                return array("q", map(int, text.split()))
+            except (ValueError, OverflowError):
+                pass
+        
+        values = array("q")
+        for number, line in enumerate(lines, first_line):
+            fields = line.split()
+            if not fields:
+                continue
+            try:
+                if len(fields) != 3:
+                    raise ValueError
+                values.extend(map(int, fields))
+            except (ValueError, OverflowError):
+                raise ValueError(f"{path}, line {number}: expected three integers, got {line.strip().decode(errors='replace')!r}") \
+                    from None
+        return values
+    
+    def write(self, path: str, binary: bool = False):
+        """
+        Function description:
+            Writes the entries to a file in the text or binary format read by read.
+            
+        Time complexity: O(E)
+        """
+        with open(path, "wb") as out_file:
+            for start in range(0, len(self), 1 << 16):
+                block = [column[start:start + (1 << 16)] for column in self.columns]
+                if binary:
+                    values = array("q", bytes(8 * 3 * len(block[0])))
+                    for k in range(3):
+                        values[k::3] = block[k]
+                    if sys.byteorder == "big":
+                        values.byteswap()
+                    out_file.write(values.tobytes())
+                else:
+                    out_file.write("".join(f"{a} {b} {c}\n" for a, b, c in zip(*block)).encode())
+
+
+class IndexedMinHeap():
+    def __init__(self, size, key):
+        """
+        Constructor for IndexedMinHeap, a MinHeap of integer vertex ids ordered by key[id]
+        """
+        self.key = key
+        self.array = [0] * (size + 1)
+        self.array_index = [0] * size
+        self.length = 0
+    
+    def insert(self, element: int):
+        """
+        Add a vertex id to the IndexedMinHeap
+        Time Complexity: O(log V), where V is the number of elements in the heap
+        """
+        self.length += 1
+        self.array[self.length] = element
+        self.array_index[element] = self.length
+        self.rise(self.length)
+    
+    def clear(self):
+        """
+        Empties the heap so it can be reused
+        Time Complexity: O(1)
+        """
+        self.length = 0
+    
+    def serve(self):
+        """
+        Removes and returns the vertex id with the smallest key
+        Time Complexity: O(log V), where V is the number of elements in the heap
+        """
+        self.swap(1, self.length)
+        pop = self.array[self.length]
+        self.length -= 1
+        self.sink(1)
+        return pop
+    
+    def swap(self, x, y):
+        """
+        Swap two vertex ids' positions in the heap array
+        Time Complexity: O(1)
+        """
+        array = self.array
+        array[x], array[y] = array[y], array[x]
+        self.array_index[array[x]] = x
+        self.array_index[array[y]] = y
+    
+    def rise(self, element):
+        """
+        Moves the element at the given position up to its place
+        Time Complexity: O(log V), where V is the number of elements in the heap
+        """
+        array, key = self.array, self.key
+        parent = element // 2
+        while parent >= 1 and key[array[parent]] > key[array[element]]:
+            self.swap(parent, element)
+            element = parent
+            parent = element // 2
+    
+    def sink(self, element):
+        """
+        Moves the element at the given position down to its place
+        Time Complexity: O(log V), where V is the number of elements in the heap
+        """
+        array, key = self.array, self.key
+        child = 2 * element
+        while child <= self.length:
+            if child < self.length and key[array[child + 1]] < key[array[child]]:
+                child += 1
+            if key[array[element]] > key[array[child]]:
+                self.swap(element, child)
+                element = child
+                child = 2 * element
+            else:
+                break
+
+
+class CompactTreeMap:
+    def __init__(self, roads: List[Tuple[int, int, int]], solulus: List[Tuple[int, int, int]]):
+        """
+        Function description:
+        Constructor for CompactTreeMap, a TreeMap whose graph is stored in compressed sparse row arrays instead of Vertex and Edge
+        objects, answering the same escape queries.
+        
+        Approach description:
+        The roads are packed once into CSR arrays indexed by tree ID and the solulus into a second set of arrays. The unsealed forest
+        is never copied: vertex i + |T| is the unsealed copy of tree i, whose roads are tree i's roads with |T| added to every
+        destination while relaxing. Solulu destinations are stored as original tree IDs and likewise shifted by |T| when relaxed.
+        Per-query state (time, previous and the epoch stamps) is kept in flat lists of size |T| * 2.
+        
+        Input:
+        roads - a list of tuples of three integers representing the start, destination and time taken for travel respectively, or an
+                EdgeList
+        solulus -  a list of tuples of three integers representing the start, time taken to claw a tree, and the destination of teleportation,
+                   or an EdgeList
+        
+        Time complexity: O(|T| + |R|)
+        Aux space complexity: O(|T| + |R|), with 16 bytes per road or solulu
+        """
+        self.trees_count = count_trees(roads)
+        
+        self.road_offsets, self.road_targets, self.road_weights = build_csr(self.trees_count, roads)
+        # solulus: [(Start: 0, Time: 5, Dest: 1)]
+        self.solulu_offsets, self.solulu_targets, self.solulu_weights = build_csr(self.trees_count, solulus, 0, 2, 1)
+        self.prepare()
+    
+    @classmethod
+    def from_files(cls, roads_path: str, solulus_path: str, binary: bool = False, chunk_size: int = 1 << 20, **options):
+        """
+        Function description:
+            Builds the map from edge-list files of roads and solulus (see EdgeList.read), streaming them into columns that are packed
+            into the CSR arrays and then dropped. No tuple is created per road.
+            
+        Input:
+            roads_path, solulus_path - the edge-list files
+            binary - True for binary edge lists
+            chunk_size - bytes read at a time
+            options - further constructor arguments
+            
+        Time complexity: O(|T| + |R|)
+        Aux space complexity: O(|T| + |R|), peaking at 40 bytes per road while packing
+        """
+        roads = EdgeList.read(roads_path, binary, chunk_size)
+        solulus = EdgeList.read(solulus_path, binary, chunk_size)
+        return cls(roads, solulus, **options)
+    
+    def save_snapshot(self, path: str):
+        """
+        Function description:
+            Writes the CSR arrays to a binary snapshot file: a header, then the road and solulu offsets, targets and times as signed
+            64-bit integers, so the map can be reloaded without rebuilding it.
+            
+        Time complexity: O(|T| + |R|)
+        """
+        write_snapshot(path, self.trees_count, (self.road_offsets, self.road_targets, self.road_weights),
+                       (self.solulu_offsets, self.solulu_targets, self.solulu_weights))
+    
+    @classmethod
+    def load_snapshot(cls, path: str):
+        """
+        Function description:
+            Reads a snapshot written by save_snapshot back into a map, reading the arrays directly from the file.
+            
+        Output:
+            The map
+            
+        Time complexity: O(|T| + |R|) with no per-road Python work
+        """
+        tree_map = cls.__new__(cls)
+        tree_map.trees_count, roads, solulus = read_snapshot(path)
+        tree_map.road_offsets, tree_map.road_targets, tree_map.road_weights = roads
+        tree_map.solulu_offsets, tree_map.solulu_targets, tree_map.solulu_weights = solulus
+        tree_map.prepare()
+        return tree_map
+    
+    def prepare(self):
+        """
+        Function description:
+            Allocates the per-query state once the CSR arrays are in place.
+            
+        Time complexity: O(|T|)
+        """
+        vertex_count = self.trees_count * 2
+        self.epoch = 0
+        self.time = [0] * vertex_count
+        self.previous = [-1] * vertex_count
+        self.discovered = [0] * vertex_count
+        self.visited = [0] * vertex_count
+        self.isExit = [0] * vertex_count
+        self.heap = IndexedMinHeap(vertex_count, self.time)
+    
+    def escape(self, start: int, exits: List[int]):
+        """
+        Function description:
+        Finds the shortest escape from start to one of the exits after traversing through a Solulu Tree, exactly like
+        TreeMap.escape.
+        
+        Input:
+        start - integer representing the tree ID of where the bear starts its escape
+        exits - a list of integers representing all exits in the forest
+        
+        Output:
+        result - a tuple containing the total time taken during the escape and the route taken to escape
+        OR
+        None
+        
+        Time complexity: O(|X| + |R'|log|T'|), where |T'|, |R'| are the trees and roads explored
+        Aux space complexity: O(|T'|)
+        """
+        exit_found = self.dijkstra(start, exits)
+        if exit_found is None:
+            return None
+        return (self.time[exit_found], self.dijkstra_backtracking(start, exit_found))
+    
+    def dijkstra(self, source: int, exits: List[int] = ()):
+        """
+        Function description:
+        Dijkstra's algorithm over the CSR arrays, terminating when a tree with an exit is found. Explores vertices and breaks ties in
+        the same order as TreeMap.dijkstra.
+        
+        Input:
+        source - an integer representing where the bear starts its escape
+        exits - a list of integers representing all exits in the forest
+        
+        Output:
+        The vertex ID of the exit reached on the unsealed forest, or None
+        
+        Time complexity: O(|X| + |R'|log|T'|), where |T'|, |R'| are the trees and roads explored before an exit is found
+        Aux space complexity: O(1), the heap and per-vertex lists are allocated once by the constructor
+        """
+        self.epoch += 1
+        epoch = self.epoch
+        trees_count = self.trees_count
+        for i in exits: #O(X)
+            self.isExit[i + trees_count] = epoch
+        
+        time, previous, discovered, visited, isExit = self.time, self.previous, self.discovered, self.visited, self.isExit
+        heap = self.heap
+        
+        def relax(current, low, high, targets, weights, shift):
+            current_time = time[current]
+            for i in range(low, high):
+                adj = targets[i] + shift
+                if visited[adj] == epoch:
+                    continue
+                adj_time = current_time + weights[i]
+                if discovered[adj] != epoch:
+                    time[adj] = adj_time
+                    previous[adj] = current
+                    discovered[adj] = epoch
+                    heap.insert(adj)
+                elif time[adj] > adj_time:
+                    time[adj] = adj_time
+                    previous[adj] = current
+                    heap.rise(heap.array_index[adj])
+        
+        road_offsets, road_targets, road_weights = self.road_offsets, self.road_targets, self.road_weights
+        solulu_offsets = self.solulu_offsets
+        time[source] = 0
+        heap.clear()
+        heap.insert(source)
+        while heap.length > 0:
+            current = heap.serve()
+            visited[current] = epoch
+            if isExit[current] == epoch:
+                return current
+            
+            if current < trees_count:
+                relax(current, road_offsets[current], road_offsets[current + 1], road_targets, road_weights, 0)
+                relax(current, solulu_offsets[current], solulu_offsets[current + 1],
+                      self.solulu_targets, self.solulu_weights, trees_count)
+            else:
+                tree = current - trees_count
+                relax(current, road_offsets[tree], road_offsets[tree + 1], road_targets, road_weights, trees_count)
+        return None
+    
+    def dijkstra_backtracking(self, start: int, end: int):
+        """
+        Function descripton:
+            Backtracking from the exit vertex ID to the start through the previous list, in the same format as
+            TreeMap.dijkstra_backtracking: tree IDs from the original forest, without repeating a tree teleported onto itself.
+            
+        Input:
+            start - starting vertex ID
+            end - end vertex ID
+            
+        Output:
+            A list of integers representing the optimal path
+        
+        Time complexity: O(V)
+        Aux space complexity: O(V)
+        """
+        route = []
+        current = end
+        while current != start:
+            current_location = current - self.trees_count if current >= self.trees_count else current
+            if self.previous[current] != current_location:
+                route.append(current_location)
+            current = self.previous[current]
+        route.append(start)
+        route.reverse()
+        return route
+
+
+# Hierarchy file header: magic, number of trees, number of vertices, number of edges
+HIERARCHY_HEADER = struct.Struct("<8sqqq")
+HIERARCHY_MAGIC = b"TREECH01"
+
+
+class ContractionHierarchy:
+    def __init__(self, trees_count: int, rank: array, edges):
+        """
+        Function description:
+        Constructor for ContractionHierarchy, the index answering escape queries on a static forest. Use build or load rather than
+        calling it directly.
+        
+        Input:
+        trees_count - the number of trees, the offset of the second graph
+        rank - array giving each vertex of the double-sized graph its position in the contraction order
+        edges - a dictionary from (u, v) to (time, middle) for every road and shortcut of the hierarchy, middle being the vertex a
+                shortcut bypasses or -1 for a road or solulu of the forest
+        
+        Time complexity: O(V + E)
+        Aux space complexity: O(V + E)
+        """
+        self.trees_count = trees_count
+        self.rank = rank
+        self.edges = edges
+        
+        # upward[u] leads to higher ranked vertices along edges, downward[v] to higher ranked vertices against edges
+        self.upward = [[] for _ in range(len(rank))]
+        self.downward = [[] for _ in range(len(rank))]
+        for (u, v), (w, _) in edges.items():
+            if rank[v] > rank[u]:
+                self.upward[u].append((v, w))
+            else:
+                self.downward[v].append((u, w))
+    
+    @classmethod
+    def build(cls, tree_map: TreeMap, witness_limit: int = 256):
+        """
+        Function description:
+        Contracts the vertices of a TreeMap's double-sized graph one at a time, adding a shortcut u -> x for every road pair
+        u -> v -> x through the contracted vertex v unless a witness search finds a path from u to x that is at least as fast
+        without v.
+        
+        Approach description:
+        The contraction order is chosen lazily: vertices are kept in a heap by edge difference (shortcuts needed minus roads removed)
+        plus the number of neighbours already contracted, and the vertex on top is re-evaluated before contracting it, going back in
+        the heap if it no longer has the lowest priority. Witness searches are dijkstra runs that stop after witness_limit vertices;
+        stopping early only adds shortcuts that were not strictly needed, never loses a path.
+        
+        Input:
+        tree_map - the TreeMap to preprocess
+        witness_limit - the number of vertices a witness search may settle
+        
+        Output:
+        The ContractionHierarchy
+        
+        Time complexity: O(V * witness_limit * D log D) in the worst case, where D is the largest number of roads at a vertex
+        Aux space complexity: O(V + E + S), where S is the number of shortcuts
+        """
+        vertex_count = len(tree_map.trees)
+        out_roads = [{} for _ in range(vertex_count)]
+        in_roads = [{} for _ in range(vertex_count)]
+        edges = {}
+        for tree in tree_map.trees:
+            for edge in tree.edges:
+                if edge.u != edge.v and edge.w < out_roads[edge.u].get(edge.v, float("inf")):
+                    out_roads[edge.u][edge.v] = edge.w
+                    in_roads[edge.v][edge.u] = edge.w
+                    edges[(edge.u, edge.v)] = (edge.w, -1)
+        
+        def shortcuts(v):
+            # (u, x, time) for every road pair through v with no witness
+            needed = []
+            for u, w_in in in_roads[v].items():
+                bound = w_in + max((w for x, w in out_roads[v].items() if x != u), default=-1)
+                if bound < w_in:
+                    continue
+                times = {u: 0}
+                queue = [(0, u)]
+                settled = 0
+                while queue and settled < witness_limit:
+                    current_time, current = heapq.heappop(queue)
+                    if current_time > times[current]:
+                        continue
+                    if current_time > bound:
+                        break
+                    settled += 1
+                    for adj, w in out_roads[current].items():
+                        if adj != v and current_time + w < times.get(adj, float("inf")):
+                            times[adj] = current_time + w
+                            heapq.heappush(queue, (current_time + w, adj))
+                for x, w_out in out_roads[v].items():
+                    if x != u and times.get(x, float("inf")) > w_in + w_out:
+                        needed.append((u, x, w_in + w_out))
+            return needed
+        
+        contracted_neighbours = [0] * vertex_count
+        def priority(v, needed):
+            return len(needed) - len(in_roads[v]) - len(out_roads[v]) + contracted_neighbours[v]
+        
+        queue = [(priority(v, shortcuts(v)), v) for v in range(vertex_count)]
+        heapq.heapify(queue)
+        rank = array("q", bytes(8 * vertex_count))
+        order = 0
+        while queue:
+            _, v = heapq.heappop(queue)
+            needed = shortcuts(v)
+            current_priority = priority(v, needed)
+            if queue and current_priority > queue[0][0]:
+                heapq.heappush(queue, (current_priority, v))
+                continue
+            
+            rank[v] = order
+            order += 1
+            for u, x, w in needed:
+                if w < out_roads[u].get(x, float("inf")):
+                    out_roads[u][x] = w
+                    in_roads[x][u] = w
+                    edges[(u, x)] = (w, v)
+            for u in in_roads[v]:
+                del out_roads[u][v]
+                contracted_neighbours[u] += 1
+            for x in out_roads[v]:
+                del in_roads[x][v]
+                contracted_neighbours[x] += 1
+            in_roads[v] = {}
+            out_roads[v] = {}
+        
+        return cls(tree_map.trees_count, rank, edges)
+    
+    def save(self, path: str):
+        """
+        Function description:
+            Writes the hierarchy to a binary file: a header, the rank of every vertex, then the edges as four arrays (start, end, time,
+            middle), all as little-endian signed 64-bit integers like write_snapshot.
+            
+        Input:
+            path - the file to write
+            
+        Time complexity: O(V + E)
+        """
+        starts, ends, times, middles = array("q"), array("q"), array("q"), array("q")
+        for (u, v), (w, middle) in self.edges.items():
+            starts.append(u)
+            ends.append(v)
+            times.append(w)
+            middles.append(middle)
+        with open(path, "wb") as out_file:
+            out_file.write(HIERARCHY_HEADER.pack(HIERARCHY_MAGIC, self.trees_count, len(self.rank), len(starts)))
+            for values in (self.rank, starts, ends, times, middles):
+                if sys.byteorder == "big":
+                    values = array("q", values)
+                    values.byteswap()
+                values.tofile(out_file)
+    
+    @classmethod
+    def load(cls, path: str):
+        """
+        Function description:
+            Reads a hierarchy written by save.
+            
+        Input:
+            path - the file to read
+            
+        Output:
+            The ContractionHierarchy
+            
+        Time complexity: O(V + E)
+        """
+        with open(path, "rb") as in_file:
+            magic, trees_count, vertex_count, edge_count = HIERARCHY_HEADER.unpack(in_file.read(HIERARCHY_HEADER.size))
+            if magic != HIERARCHY_MAGIC:
+                raise ValueError(f"{path} is not a contraction hierarchy file")
+            rank, starts, ends, times, middles = array("q"), array("q"), array("q"), array("q"), array("q")
+            rank.fromfile(in_file, vertex_count)
+            for values in (starts, ends, times, middles):
+                values.fromfile(in_file, edge_count)
+            if sys.byteorder == "big":
+                for values in (rank, starts, ends, times, middles):
+                    values.byteswap()
+        edges = {(u, v): (w, middle) for u, v, w, middle in zip(starts, ends, times, middles)}
+        return cls(trees_count, rank, edges)
+    
+    def escape(self, start: int, exits: List[int]):
+        """
+        Function description:
+        Finds the shortest escape from start to one of the exits after traversing through a Solulu Tree
+        
+        Approach description:
+        Every shortest path in the hierarchy climbs to its highest ranked vertex and then descends, so a forward dijkstra from the start
+        along upward edges and a backward dijkstra from all exit trees on the second graph against downward edges meet at that vertex.
+        Each direction stops once its smallest queued time reaches the best meeting found. The hierarchy edges on the path are then
+        unpacked into roads and solulus and converted to a route like TreeMap.dijkstra_backtracking gives.
+        
+        Input:
+        start - integer representing the tree ID of where the bear starts its escape
+        exits - a list of integers representing all exits in the forest
+        
+        Output:
+        result - a tuple containing the total time taken during the escape and the route taken to escape
+        OR
+        None
+        
+        Time complexity: O(|X| + S log S) for the searches, where S is the size of the upward search spaces, plus the route length
+        Aux space complexity: O(|X| + S)
+        """
+        # index 0 is the forward search, index 1 the backward search
+        times = ({start: 0}, {})
+        previous = ({start: None}, {})
+        queues = ([(0, start)], [])
+        for i in exits:
+            exit_id = i + self.trees_count
+            if exit_id not in times[1]:
+                times[1][exit_id] = 0
+                previous[1][exit_id] = None
+                queues[1].append((0, exit_id))
+        
+        best_time = float("inf")
+        meeting = None
+        active = [True, True]
+        side = 1
+        while active[0] or active[1]:
+            
+            # alternate between the directions still running
+            if active[1 - side]:
+                side = 1 - side
+            queue = queues[side]
+            if not queue or queue[0][0] >= best_time:
+                active[side] = False
+                continue
+            
+            current_time, current = heapq.heappop(queue)
+            if current_time > times[side][current]:
+                continue
+            if current in times[1 - side] and current_time + times[1 - side][current] < best_time:
+                best_time = current_time + times[1 - side][current]
+                meeting = current
+            for adj, w in (self.upward if side == 0 else self.downward)[current]:
+                if current_time + w < times[side].get(adj, float("inf")):
+                    times[side][adj] = current_time + w
+                    previous[side][adj] = current
+                    heapq.heappush(queue, (current_time + w, adj))
+        
+        if meeting is None:
+            return None
+        
+        hierarchy_path = []
+        current = meeting
+        while current is not None:
+            hierarchy_path.append(current)
+            current = previous[0][current]
+        hierarchy_path.reverse()
+        current = previous[1][meeting]
+        while current is not None:
+            hierarchy_path.append(current)
+            current = previous[1][current]
+        
+        path = [start]
+        for i in range(1, len(hierarchy_path)):
+            path += self.unpack(hierarchy_path[i - 1], hierarchy_path[i])
+        return (best_time, route_from_path(path, self.trees_count))
+    
+    def unpack(self, u: int, v: int):
+        """
+        Function description:
+            Expands the hierarchy edge u -> v into the vertices of the roads and solulus it stands for, excluding u.
+            
+        Time complexity: O(P), where P is the number of roads and solulus on the unpacked path
+        Aux space complexity: O(P)
+        """
+        path = []
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            middle = self.edges[(a, b)][1]
+            if middle < 0:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+        return path
+
+
 # roads = [(0,1,4), (1,2,2), (2,3,3), (3,4,1), (1,5,2),
 # (5,6,5), (6,3,2), (6,4,3), (1,7,4), (7,8,2),
 # (8,7,2), (7,3,2), (8,0,11), (4,3,1), (4,8,10)]
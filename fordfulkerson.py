@@ -1,6 +1,5 @@
-from typing import List, Tuple, TypeVar 
-Vertex = TypeVar("Vertex")      
-Edge = TypeVar("Edge")
+from typing import List, Tuple
+from array import array
 from collections import deque
 """
 _______________________________________________________________________________________________________________________________________________
@@ -11,129 +10,296 @@ QUESTION 1: Fast Backups
 _______________________________________________________________________________________________________________________________________________
 """
 
-class Edge:
-    def __init__(self, start: int, destination: int, capacity: int):
-        self.u = start
-        self.v = destination
-        self.capacity = capacity
-        self.flow = 0
-        self.backward_edge = None   
-        self.forward_edge = None    
-
-    def __str__(self) -> str:
-        return f"({self.u},{self.v},cap={self.capacity},flow={self.flow})"
-
-
-class Vertex:
-    def __init__(self, id: int):
-        self.id = id
-        self.edges: List[Edge] = []
-        self.discovered = False
-        self.visited = False
-        self.previous_vertex: "Vertex | None" = None
-        self.previous_edge: "Edge | None" = None
-
-    def add_edge(self, edge: Edge):
-        self.edges.append(edge)
-
-    def discover_node(self):
-        self.discovered = True
-
-    def visit_node(self):
-        self.visited = True
-
-    def reset(self):
-        self.discovered = False
-        self.visited = False
-        self.previous_vertex = None
-        self.previous_edge = None
-
-    def __str__(self) -> str:
-        edges_str = ", ".join(str(edge) for edge in self.edges)
-        return f"Vertex {self.id}, Edges: [{edges_str}]"
-
-
-class Graph:
-    def __init__(self, num_vertices: int):
-        # IMPORTANT: num_vertices is the exact count. No multiplying here.
-        self.data_centres = [Vertex(i) for i in range(num_vertices)]
-
-    def add_edges(self, argv_edges: List[Tuple[int, int, int]]):
+class ResidualGraph:
+    """
+    Flat residual network used by the max-flow engines. Edge 2k is the k-th
+    (u, v, capacity) and edge 2k + 1 its reverse, so e ^ 1 is always the paired
+    edge and the tail of e is head[e ^ 1]. Capacities and remaining capacities
+    live in typed arrays, and arcs[offsets[u]:offsets[u + 1]] lists the edges out
+    of u in the order they were added.
+
+    Per-search state is stamped with an epoch instead of being reset: a vertex was
+    reached by the current search exactly when stamp[vertex] == epoch.
+    """
+    def __init__(self, num_vertices: int, argv_edges: List[Tuple[int, int, int]]):
+        self.num_vertices = num_vertices
+        self.head = array("q")
+        self.capacity = array("q")
         for u, v, capacity in argv_edges:
-            forward_edge = Edge(u, v, capacity)
-            backward_edge = Edge(v, u, 0)
-            forward_edge.backward_edge = backward_edge
-            backward_edge.backward_edge = forward_edge
-            self.data_centres[u].add_edge(forward_edge)
-            self.data_centres[v].add_edge(backward_edge)
+            self.head.extend((v, u))
+            self.capacity.extend((capacity, 0))
+        self.residual = array("q", self.capacity)
+
+        # counting sort of the edges by tail
+        self.offsets = array("q", bytes(8 * (num_vertices + 1)))
+        for e in range(len(self.head)):
+            self.offsets[self.head[e ^ 1] + 1] += 1
+        for u in range(num_vertices):
+            self.offsets[u + 1] += self.offsets[u]
+        next_slot = self.offsets[:-1]
+        self.arcs = array("q", bytes(8 * len(self.head)))
+        for e in range(len(self.head)):
+            u = self.head[e ^ 1]
+            self.arcs[next_slot[u]] = e
+            next_slot[u] += 1
+
+        self.epoch = 0
+        self.stamp = array("q", bytes(8 * num_vertices))
+        # BFS predecessor edge for augmenting paths, distance for Dinic's level graph
+        self.previous_edge = array("q", bytes(8 * num_vertices))
+        self.level = array("q", bytes(8 * num_vertices))
+        self.next_arc = array("q", bytes(8 * num_vertices))
+
+    def flow(self, e: int) -> int:
+        return self.capacity[e] - self.residual[e]
+
+    def add_edge(self, u: int, v: int, capacity: int) -> int:
+        # Appends the edge pair and slots both into their tails' arc ranges, shifting
+        # the later ranges along: O(V + E), but with no per-edge Python work
+        e = len(self.head)
+        self.head.extend((v, u))
+        self.capacity.extend((capacity, 0))
+        self.residual.extend((capacity, 0))
+        for tail, edge in ((u, e), (v, e ^ 1)):
+            self.arcs.insert(self.offsets[tail + 1], edge)
+            for w in range(tail + 1, self.num_vertices + 1):
+                self.offsets[w] += 1
+        return e
+
+    def push(self, e: int, amount: int):
+        self.residual[e] -= amount
+        self.residual[e ^ 1] += amount
 
     def has_augmenting_path(self, source: int, sink: int) -> bool:
-        self.reset()
-        q = deque([self.data_centres[source]])
-        self.data_centres[source].discover_node()
-
+        # BFS over edges with remaining capacity, recording the edge into each vertex
+        self.epoch += 1
+        epoch, stamp = self.epoch, self.stamp
+        head, residual, offsets, arcs = self.head, self.residual, self.offsets, self.arcs
+        stamp[source] = epoch
+        q = deque([source])
         while q:
-            current_vertex = q.popleft()
-            current_vertex.visit_node()
-
-            if current_vertex.id == sink:
+            u = q.popleft()
+            if u == sink:
                 return True
-
-            for edge in current_vertex.edges:
-                remaining_capacity = edge.capacity - edge.flow
-                if remaining_capacity <= 0:
-                    continue
-
-                adjacent_vertex = self.data_centres[edge.v]
-                if adjacent_vertex.visited or adjacent_vertex.discovered:
-                    continue
-
-                # discover and set predecessor info
-                adjacent_vertex.discover_node()
-                adjacent_vertex.previous_vertex = current_vertex
-                adjacent_vertex.previous_edge = edge
-                q.append(adjacent_vertex)
-
+            for i in range(offsets[u], offsets[u + 1]):
+                e = arcs[i]
+                v = head[e]
+                if residual[e] > 0 and stamp[v] != epoch:
+                    stamp[v] = epoch
+                    self.previous_edge[v] = e
+                    q.append(v)
         return False
 
-    def get_augmenting_path(self, source: int, sink: int):
+    def augment_flow(self, source: int, sink: int) -> int:
+        # push the bottleneck along the path found by has_augmenting_path
         path = []
-        current_vertex = self.data_centres[sink]
-        while current_vertex.id != source:
-            edge = current_vertex.previous_edge
-            if edge is None:
-                # no path
-                return []
-            path.append((edge, edge.backward_edge))
-            current_vertex = current_vertex.previous_vertex
-        path.reverse()
-        return path
-
-    def augment_flow(self, flow_path) -> int:
-        bottleneck_capacity = min(edge.capacity - edge.flow for edge, _ in flow_path)
-        for edge, backward_edge in flow_path:
-            edge.flow += bottleneck_capacity
-            backward_edge.flow -= bottleneck_capacity
-        return bottleneck_capacity
-
-    def reset(self):
-        for vertex in self.data_centres:
-            vertex.reset()
+        v = sink
+        while v != source:
+            e = self.previous_edge[v]
+            path.append(e)
+            v = self.head[e ^ 1]
+        bottleneck = min(self.residual[e] for e in path)
+        for e in path:
+            self.push(e, bottleneck)
+        return bottleneck
+
+    def build_levels(self, source: int, sink: int) -> bool:
+        # BFS distances from source over edges with remaining capacity; Dinic only
+        # follows edges that go exactly one level deeper. Reached vertices get their
+        # current arc rewound here, so nothing else is reset between phases
+        self.epoch += 1
+        epoch, stamp, level = self.epoch, self.stamp, self.level
+        head, residual, offsets, arcs = self.head, self.residual, self.offsets, self.arcs
+        stamp[source] = epoch
+        level[source] = 0
+        self.next_arc[source] = offsets[source]
+        q = deque([source])
+        while q:
+            u = q.popleft()
+            # vertices at or past the sink's level are never on a shortest path
+            if stamp[sink] == epoch and level[u] >= level[sink]:
+                break
+            for i in range(offsets[u], offsets[u + 1]):
+                e = arcs[i]
+                v = head[e]
+                if residual[e] > 0 and stamp[v] != epoch:
+                    stamp[v] = epoch
+                    level[v] = level[u] + 1
+                    self.next_arc[v] = offsets[v]
+                    q.append(v)
+        return stamp[sink] == epoch
+
+    def blocking_flow(self, source: int, sink: int, limit: int = None) -> int:
+        # Repeated DFS on the level graph. next_arc[u] is the current arc of u: arcs
+        # before it are saturated or lead to dead ends, so no edge is tried twice per phase.
+        # Stops early once limit units have been pushed
+        epoch, stamp, level, next_arc = self.epoch, self.stamp, self.level, self.next_arc
+        head, residual, offsets, arcs = self.head, self.residual, self.offsets, self.arcs
+        path = []
+        total = 0
+        u = source
+        while True:
+            if u == sink:
+                bottleneck = min(residual[e] for e in path)
+                if limit is not None and bottleneck >= limit - total:
+                    bottleneck = limit - total
+                for e in path:
+                    residual[e] -= bottleneck
+                    residual[e ^ 1] += bottleneck
+                total += bottleneck
+                if total == limit:
+                    return total
+                # retreat to the tail of the first saturated edge
+                i = 0
+                while residual[path[i]] > 0:
+                    i += 1
+                u = head[path[i] ^ 1]
+                del path[i:]
+                continue
+
+            i, end = next_arc[u], offsets[u + 1]
+            next_level = level[u] + 1
+            while i < end:
+                e = arcs[i]
+                v = head[e]
+                if residual[e] > 0 and stamp[v] == epoch and level[v] == next_level:
+                    break
+                i += 1
+            next_arc[u] = i
+            if i < end:
+                path.append(arcs[i])
+                u = head[arcs[i]]
+            elif u == source:
+                return total
+            else:
+                # dead end: drop it from the level graph and skip the edge into it
+                stamp[u] = epoch - 1
+                u = head[path.pop() ^ 1]
+                next_arc[u] += 1
+
+    def augment(self, source: int, sink: int, limit: int = None) -> int:
+        # Dinic phases from the current flow: pushes as much as possible, or at most
+        # limit units, from source to sink and returns the amount pushed
+        total = 0
+        if source == sink:
+            return total
+        while (limit is None or total < limit) and self.build_levels(source, sink):
+            total += self.blocking_flow(source, sink, None if limit is None else limit - total)
+        return total
+
+    def global_relabel(self, sink: int, height: array):
+        # Exact BFS distances to sink over edges with remaining capacity. Vertices that
+        # cannot reach sink get height n, which takes them out of push_relabel
+        n = self.num_vertices
+        head, residual, offsets, arcs = self.head, self.residual, self.offsets, self.arcs
+        for u in range(n):
+            height[u] = n
+        height[sink] = 0
+        q = deque([sink])
+        while q:
+            v = q.popleft()
+            for i in range(offsets[v], offsets[v + 1]):
+                # arcs[i] ^ 1 runs from head[arcs[i]] into v
+                e = arcs[i]
+                u = head[e]
+                if residual[e ^ 1] > 0 and height[u] == n:
+                    height[u] = height[v] + 1
+                    q.append(u)
 
 
 def ford_fulkerson(total_vertices, edges, origin, sink):
-    residual_network = Graph(total_vertices)  # num vertices is exact
-    residual_network.add_edges(edges)
+    residual_network = ResidualGraph(total_vertices, edges)  # num vertices is exact
     max_flow = 0
     while residual_network.has_augmenting_path(origin, sink):
-        path = residual_network.get_augmenting_path(origin, sink)
-        if not path:
-            break
-        max_flow += residual_network.augment_flow(path)
+        max_flow += residual_network.augment_flow(origin, sink)
     return max_flow
 
 
-def maxThroughput(connections, max_in, max_out, origin, targets) -> int:
+def dinic(total_vertices, edges, origin, sink):
+    """
+    Dinic's algorithm: each phase builds the BFS level graph and saturates it with a
+    blocking flow, and there are at most V phases, so O(V^2 E) instead of the O(V E^2)
+    of ford_fulkerson's one BFS per augmenting path.
+    """
+    residual_network = ResidualGraph(total_vertices, edges)
+    return residual_network.augment(origin, sink)
+
+
+def push_relabel(total_vertices, edges, origin, sink):
+    """
+    FIFO push-relabel, O(V^3). Starts from a preflow saturating every edge out of the
+    origin and discharges active vertices in FIFO order, pushing excess downhill and
+    relabelling a vertex when it has no admissible edge left. Heights are recomputed
+    from scratch by global_relabel every V relabels.
+
+    Only the first phase is run: vertices are dropped once their height reaches V, as
+    their excess can only go back to the origin, and the excess at sink is then the
+    maximum flow. The edge flows are a preflow, not a flow.
+    """
+    residual_network = ResidualGraph(total_vertices, edges)
+    head, residual, offsets, arcs = residual_network.head, residual_network.residual, residual_network.offsets, residual_network.arcs
+    n = total_vertices
+    excess = array("q", bytes(8 * n))
+    height = array("q", bytes(8 * n))
+    current_arc = array("q", offsets[:-1])
+    residual_network.global_relabel(sink, height)
+    if height[origin] == n:
+        return 0
+    height[origin] = n
+
+    active = deque()
+    for i in range(offsets[origin], offsets[origin + 1]):
+        e = arcs[i]
+        pushed = residual[e]
+        if pushed > 0:
+            v = head[e]
+            residual[e] = 0
+            residual[e ^ 1] += pushed
+            if excess[v] == 0 and v != sink and v != origin:
+                active.append(v)
+            excess[v] += pushed
+
+    relabels = 0
+    while active:
+        if relabels >= n:
+            residual_network.global_relabel(sink, height)
+            height[origin] = n
+            current_arc = array("q", offsets[:-1])
+            relabels = 0
+
+        u = active.popleft()
+        end = offsets[u + 1]
+        while excess[u] > 0 and height[u] < n:
+            i = current_arc[u]
+            if i == end:
+                # relabel: just above the lowest neighbour still reachable
+                height[u] = min((height[head[arcs[j]]] for j in range(offsets[u], end) if residual[arcs[j]] > 0), default=n - 1) + 1
+                current_arc[u] = offsets[u]
+                relabels += 1
+                continue
+            e = arcs[i]
+            v = head[e]
+            if residual[e] > 0 and height[u] == height[v] + 1:
+                pushed = min(excess[u], residual[e])
+                residual[e] -= pushed
+                residual[e ^ 1] += pushed
+                excess[u] -= pushed
+                if excess[v] == 0 and v != sink and v != origin:
+                    active.append(v)
+                excess[v] += pushed
+            else:
+                current_arc[u] = i + 1
+    return excess[sink]
+
+
+MAX_FLOW_ENGINES = {
+    "ford_fulkerson": ford_fulkerson,
+    "dinic": dinic,
+    "push_relabel": push_relabel,
+}
+
+
+def maxThroughput(connections, max_in, max_out, origin, targets, engine: str = "dinic") -> int:
     """
     Node-splitting per data centre i:
       - 3*i     : 'in'   node
@@ -147,8 +313,23 @@ def maxThroughput(connections, max_in, max_out, origin, targets) -> int:
       inter-DC connections routed from out(u) to in(v) (or in(u) to out(v))
       target out nodes to super sink
       source is origin's mid node
+
+    engine picks the max-flow algorithm from MAX_FLOW_ENGINES; all of them give the
+    same result.
+    """
+    if engine not in MAX_FLOW_ENGINES:
+        raise ValueError(f"unknown max-flow engine {engine!r}, expected one of {sorted(MAX_FLOW_ENGINES)}")
+    return MAX_FLOW_ENGINES[engine](*split_network(connections, max_in, max_out, origin, targets))
+
+
+def split_network(connections, max_in, max_out, origin, targets):
+    """
+    Builds the node-split network described in maxThroughput. The edges are listed as
+    the connections in order, then the in -> mid and mid -> out gates of each data
+    centre, then one edge per target into the super sink.
+
+    Returns (total_vertices, edges, source, sink).
     """
-def maxThroughput(connections, max_in, max_out, origin, targets):
     N = len(max_in)
     super_sink = 3 * N
     total_vertices = 3 * N + 1
@@ -169,7 +350,94 @@ def maxThroughput(connections, max_in, max_out, origin, targets):
         all_connections.append((3*t, super_sink, max_in[t]))
 
     new_origin = 3 * origin + 1  # origin.mid
-    return ford_fulkerson(total_vertices, all_connections, new_origin, super_sink)
+    return total_vertices, all_connections, new_origin, super_sink
+
+
+class FlowNetwork:
+    """
+    The network of maxThroughput kept alive between changes, holding a maximum flow
+    that is repaired after each change instead of solving from scratch:
+      - a larger capacity only adds residual capacity, so the flow is augmented from
+        where it is (ResidualGraph.augment)
+      - a smaller capacity below the flow on the edge is drained: the edge is cut down
+        to its new capacity, the excess is rerouted around it where possible, what
+        cannot be rerouted is sent back to the source and pulled back from the sink,
+        and the flow is augmented again
+
+    Repairs only explore up to the sink's BFS level, so a small change usually costs a
+    few partial BFS passes instead of building and solving the whole split graph.
+    """
+    def __init__(self, connections, max_in, max_out, origin, targets):
+        # parallel connections behave as one with the summed capacity
+        merged = {}
+        for u, v, capacity in connections:
+            merged[(u, v)] = merged.get((u, v), 0) + capacity
+        total_vertices, edges, self.source, self.sink = split_network(
+            [(u, v, capacity) for (u, v), capacity in merged.items()], max_in, max_out, origin, targets)
+        self.residual_network = ResidualGraph(total_vertices, edges)
+
+        # edge ids follow the order of split_network
+        N = len(max_in)
+        self.connection_edges = {connection: 2 * k for k, connection in enumerate(merged)}
+        self.in_edges = [2 * (len(merged) + 2 * i) for i in range(N)]
+        self.out_edges = [2 * (len(merged) + 2 * i + 1) for i in range(N)]
+        self.target_edges = [[] for _ in range(N)]
+        for j, t in enumerate(targets):
+            self.target_edges[t].append(2 * (len(merged) + 2 * N + j))
+
+        self.throughput = self.residual_network.augment(self.source, self.sink)
+
+    def increase_capacity(self, u: int, v: int, amount: int) -> int:
+        if (u, v) not in self.connection_edges:
+            raise ValueError(f"no connection from {u} to {v}")
+        e = self.connection_edges[(u, v)]
+        return self.set_capacity(e, self.residual_network.capacity[e] + amount)
+
+    def decrease_capacity(self, u: int, v: int, amount: int) -> int:
+        if (u, v) not in self.connection_edges:
+            raise ValueError(f"no connection from {u} to {v}")
+        e = self.connection_edges[(u, v)]
+        return self.set_capacity(e, self.residual_network.capacity[e] - amount)
+
+    def add_connection(self, u: int, v: int, capacity: int) -> int:
+        if (u, v) in self.connection_edges:
+            return self.increase_capacity(u, v, capacity)
+        self.connection_edges[(u, v)] = self.residual_network.add_edge(3*u + 2, 3*v, 0)
+        return self.increase_capacity(u, v, capacity)
+
+    def set_max_in(self, i: int, capacity: int) -> int:
+        # max_in[i] also caps the edge into the super sink when i is a target
+        for e in [self.in_edges[i]] + self.target_edges[i]:
+            self.set_capacity(e, capacity)
+        return self.throughput
+
+    def set_max_out(self, i: int, capacity: int) -> int:
+        return self.set_capacity(self.out_edges[i], capacity)
+
+    def set_capacity(self, e: int, capacity: int) -> int:
+        if capacity < 0:
+            raise ValueError(f"capacity must not be negative, got {capacity}")
+        graph = self.residual_network
+        flow = graph.flow(e)
+        graph.residual[e] += capacity - graph.capacity[e]
+        graph.capacity[e] = capacity
+
+        if flow > capacity:
+            # cut the flow on e down to capacity: its tail keeps the excess and its
+            # head is short by the same amount
+            excess = flow - capacity
+            u, v = graph.head[e ^ 1], graph.head[e]
+            graph.push(e ^ 1, excess)
+            excess -= graph.augment(u, v, excess)
+            # the rest no longer reaches the sink: return it to the source along the
+            # paths it came in on, and take it back from the sink the same way
+            graph.augment(u, self.source, excess)
+            graph.augment(self.sink, v, excess)
+            self.throughput -= excess
+
+        self.throughput += graph.augment(self.source, self.sink)
+        return self.throughput
+
 
 if __name__ == "__main__":
     connections = [(9, 7, 386), (10, 22, 274), (2, 13, 285), (23, 17, 460), (7, 2, 500), (17, 10, 241), (0, 17, 187), (1, 5, 210), (4, 30, 168), (17, 28, 237), (20, 0, 156), (12, 6, 165), (13, 21, 302), (27, 1, 184), (15, 8, 189), (22, 11, 260), (22, 19, 99), (24, 12, 108), (11, 1, 493), (7, 17, 93), (19, 21, 374), (26, 5, 126), (23, 26, 296), (18, 7, 217), (32, 23, 483), (21, 24, 414), (6, 2, 491), (14, 27, 101), (7, 4, 314), (24, 28, 154), (11, 19, 408), (12, 8, 248), (11, 12, 433), (16, 15, 351), (8, 30, 429), (16, 23, 398), (9, 8, 334), (4, 27, 120), (29, 23, 159), (16, 12, 214), (30, 20, 472), (7, 23, 476), (20, 24, 92), (0, 16, 175), (17, 26, 419), (27, 11, 75), (22, 15, 92), (3, 0, 361), (8, 7, 112), (6, 32, 228), (18, 8, 396), (7, 24, 205), (18, 23, 458), (24, 22, 99), (4, 12, 335), (2, 20, 172), (22, 24, 79), (29, 2, 278), (18, 3, 173), (23, 15, 94), (5, 20, 500), (20, 26, 295), (18, 12, 313), (14, 25, 134), (13, 31, 298), (9, 16, 342), (31, 1, 367), (11, 29, 382), (29, 22, 203), (13, 6, 390), (31, 19, 134), (17, 1, 216), (21, 11, 470), (1, 23, 102), (28, 29, 142), (19, 22, 178), (9, 4, 473), (27, 30, 479), (0, 27, 196), (15, 13, 377), (4, 7, 489), (20, 16, 359), (27, 2, 444), (13, 4, 319), (6, 25, 347), (26, 23, 254), (8, 5, 422), (1, 32, 317), (4, 6, 382), (7, 32, 144), (9, 22, 145), (20, 11, 200), (27, 13, 367), (32, 6, 79), (26, 25, 153), (1, 0, 205), (11, 7, 422), (20, 32, 314), (8, 10, 466), (9, 31, 486), (5, 14, 420), (29, 25, 297), (20, 5, 162), (21, 23, 192), (0, 21, 169), (1, 17, 196), (9, 17, 297), (24, 0, 491), (2, 5, 240), (29, 7, 403), (6, 8, 413), (30, 24, 173), (25, 32, 278), (5, 7, 437)]
@@ -0,0 +1,27 @@
+import random
+import unittest
+
+from test_dijkstra import EscapeTestCase, random_forest
+
+try:
+    from deltastepping import DeltaSteppingTreeMap
+except ImportError:
+    DeltaSteppingTreeMap = None
+
+
+@unittest.skipIf(DeltaSteppingTreeMap is None, "deltastepping.py needs NumPy")
+class DeltaSteppingTreeMapTest(EscapeTestCase):
+
+    def test_escape(self):
+        rnd = random.Random(8)
+        for delta in (None, 1, 7, 100):
+            for _ in range(15):
+                trees_count = rnd.randint(2, 25)
+                roads, solulus = random_forest(rnd, trees_count, rnd.randint(1, 60), rnd.randint(0, 5))
+                forest = DeltaSteppingTreeMap(roads, solulus, delta)
+                for start, exits in self.queries(rnd, trees_count):
+                    self.check_result(roads, solulus, trees_count, start, exits, forest.escape(start, exits))
+
+
+if __name__ == "__main__":
+    unittest.main()
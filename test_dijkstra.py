@@ -0,0 +1,256 @@
+import heapq
+import os
+import random
+import tempfile
+import unittest
+
+from dijkstra import TreeMap, CompactTreeMap, EdgeList, MinHeap, LazyHeap, BucketQueue, PairingHeap
+
+
+def random_forest(rnd, trees_count, roads_count, solulus_count, max_time=20):
+    roads = [(rnd.randrange(trees_count), rnd.randrange(trees_count), rnd.randint(1, max_time)) for _ in range(roads_count)]
+    roads.append((trees_count - 1, rnd.randrange(trees_count), rnd.randint(1, max_time)))
+    solulus = [(rnd.randrange(trees_count), rnd.randint(0, max_time), rnd.randrange(trees_count)) for _ in range(solulus_count)]
+    return roads, solulus
+
+
+def reference_times(roads, solulus, trees_count, start, exits):
+    """
+    Plain Dijkstra over (tree, seal undone) states: the least time from start to every exit once a Solulu has been clawed, or None.
+    """
+    adjacency = [[] for _ in range(trees_count)]
+    for u, v, w in roads:
+        adjacency[u].append((v, w, False))
+    for x, w, y in solulus:
+        adjacency[x].append((y, w, True))
+    times = {(start, False): 0}
+    queue = [(0, start, False)]
+    while queue:
+        time, tree, undone = heapq.heappop(queue)
+        if times[(tree, undone)] < time:
+            continue
+        if undone and tree in exits:
+            return time
+        for v, w, solulu in adjacency[tree]:
+            if solulu and undone:
+                continue
+            state = (v, undone or solulu)
+            if time + w < times.get(state, float("inf")):
+                times[state] = time + w
+                heapq.heappush(queue, (time + w, v, undone or solulu))
+    return None
+
+
+def route_time(roads, solulus, route):
+    """
+    The least time of any walk through the trees of a route, given in the format of TreeMap.escape, that claws one Solulu; a Solulu
+    teleporting a tree to itself does not repeat the tree in the route.
+    """
+    road_times = {}
+    for u, v, w in roads:
+        road_times[(u, v)] = min(w, road_times.get((u, v), w))
+    solulu_times = {}
+    for x, w, y in solulus:
+        solulu_times[(x, y)] = min(w, solulu_times.get((x, y), w))
+
+    infinity = float("inf")
+    best = [0, solulu_times.get((route[0], route[0]), infinity)]
+    for a, b in zip(route, route[1:]):
+        road = road_times.get((a, b), infinity)
+        sealed = best[0] + road
+        undone = min(best[1] + road, best[0] + solulu_times.get((a, b), infinity))
+        best = [sealed, min(undone, sealed + solulu_times.get((b, b), infinity))]
+    return best[1]
+
+
+class EscapeTestCase(unittest.TestCase):
+
+    def check_result(self, roads, solulus, trees_count, start, exits, result):
+        expected = reference_times(roads, solulus, trees_count, start, exits)
+        if expected is None:
+            self.assertIsNone(result)
+            return
+        self.assertIsNotNone(result)
+        time, route = result
+        self.assertEqual(time, expected)
+        self.assertEqual(route[0], start)
+        self.assertIn(route[-1], exits)
+        self.assertEqual(route_time(roads, solulus, route), time)
+
+    def queries(self, rnd, trees_count, count=15):
+        for _ in range(count):
+            yield rnd.randrange(trees_count), rnd.sample(range(trees_count), rnd.randint(1, min(3, trees_count)))
+
+
+class TreeMapTest(EscapeTestCase):
+
+    def test_example(self):
+        roads = [(0, 1, 4), (1, 2, 2), (2, 3, 3), (3, 4, 1), (1, 5, 2), (5, 6, 5), (6, 3, 2), (6, 4, 3), (1, 7, 4), (7, 8, 2),
+                 (8, 7, 2), (7, 3, 2), (8, 0, 11), (4, 3, 1), (4, 8, 10)]
+        solulus = [(5, 10, 0), (6, 1, 6), (7, 5, 7), (0, 5, 2), (8, 4, 8)]
+        self.assertEqual(TreeMap(roads, solulus).escape(1, [7, 2, 4]), (9, [1, 7]))
+
+    def test_queues(self):
+        rnd = random.Random(1)
+        for queue in (MinHeap, LazyHeap, BucketQueue, PairingHeap):
+            for _ in range(20):
+                trees_count = rnd.randint(2, 25)
+                roads, solulus = random_forest(rnd, trees_count, rnd.randint(1, 60), rnd.randint(0, 5))
+                forest = TreeMap(roads, solulus, queue=queue, cache_size=rnd.choice((0, 4)))
+                for start, exits in self.queries(rnd, trees_count):
+                    self.check_result(roads, solulus, trees_count, start, exits, forest.escape(start, exits))
+
+    def test_escape_many(self):
+        rnd = random.Random(2)
+        for _ in range(30):
+            trees_count = rnd.randint(2, 25)
+            roads, solulus = random_forest(rnd, trees_count, rnd.randint(1, 60), rnd.randint(0, 5))
+            forest = TreeMap(roads, solulus)
+            exits = rnd.sample(range(trees_count), rnd.randint(1, min(3, trees_count)))
+            starts = [rnd.randrange(trees_count) for _ in range(8)]
+            for start, result in zip(starts, forest.escape_many(starts, exits)):
+                self.check_result(roads, solulus, trees_count, start, exits, result)
+
+    def test_bidirectional_and_astar(self):
+        rnd = random.Random(3)
+        for _ in range(30):
+            trees_count = rnd.randint(2, 25)
+            roads, solulus = random_forest(rnd, trees_count, rnd.randint(1, 60), rnd.randint(0, 5))
+            forest = TreeMap(roads, solulus)
+            for start, exits in self.queries(rnd, trees_count, 8):
+                self.check_result(roads, solulus, trees_count, start, exits, forest.escape_bidirectional(start, exits))
+                self.check_result(roads, solulus, trees_count, start, exits,
+                                  forest.escape_astar(start, exits, lambda tree, undone: 0))
+
+                # Half of the true remaining time is admissible
+                def heuristic(tree, undone):
+                    if undone:
+                        remaining = reference_times([(u, v, w) for u, v, w in roads], [(x, 0, x) for x in range(trees_count)],
+                                                    trees_count, tree, exits)
+                    else:
+                        remaining = reference_times(roads, solulus, trees_count, tree, exits)
+                    return 0 if remaining is None else remaining // 2
+                self.check_result(roads, solulus, trees_count, start, exits, forest.escape_astar(start, exits, heuristic))
+
+    def test_hierarchy(self):
+        rnd = random.Random(4)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "forest.ch")
+            for _ in range(15):
+                trees_count = rnd.randint(2, 25)
+                roads, solulus = random_forest(rnd, trees_count, rnd.randint(1, 60), rnd.randint(0, 5))
+                TreeMap(roads, solulus).build_hierarchy(path)
+                forest = TreeMap(roads, solulus)
+                forest.load_hierarchy(path)
+                for start, exits in self.queries(rnd, trees_count):
+                    self.check_result(roads, solulus, trees_count, start, exits, forest.escape_hierarchy(start, exits))
+            with self.assertRaises(ValueError):
+                TreeMap([(0, 1, 1)], []).load_hierarchy(path)
+
+    def test_updates(self):
+        rnd = random.Random(5)
+        for queue in (MinHeap, BucketQueue):
+            trees_count = 6
+            roads = {(0, 1): 3, (1, 2): 4, (5, 0): 2}
+            solulus = [(0, 1, 0)]
+            forest = TreeMap([(u, v, w) for (u, v), w in roads.items()], solulus, queue=queue, cache_size=8)
+            for step in range(300):
+                operation = rnd.random()
+                u, v = rnd.randrange(trees_count + 2), rnd.randrange(trees_count + 2)
+                if operation < 0.35 and (u, v) not in roads:
+                    roads[(u, v)] = rnd.randint(1, 20 + step)
+                    forest.add_road(u, v, roads[(u, v)])
+                elif operation < 0.45:
+                    solulus.append((u, rnd.randint(0, 10), v))
+                    forest.add_solulu(*solulus[-1])
+                elif operation < 0.6 and roads:
+                    u, v = rnd.choice(sorted(roads))
+                    forest.remove_road(u, v, roads.pop((u, v)))
+                elif operation < 0.75 and roads:
+                    u, v = rnd.choice(sorted(roads))
+                    roads[(u, v)] = rnd.randint(1, 40)
+                    forest.update_weight(u, v, roads[(u, v)])
+                trees_count = forest.trees_count
+                road_list = [(u, v, w) for (u, v), w in roads.items()]
+                for start, exits in self.queries(rnd, trees_count, 2):
+                    self.check_result(road_list, solulus, trees_count, start, exits, forest.escape(start, exits))
+                self.assertEqual(sorted(forest.roads), sorted(road_list))
+
+    def test_failed_updates_change_nothing(self):
+        forest = TreeMap([(0, 1, 4), (1, 2, 3), (2, 0, 1)], [(0, 2, 1)])
+        before = (forest.roads, forest.seal_undone_roads, forest.solulus)
+        for u, v in ((0, 4), (5, 1), (1, 0)):
+            with self.assertRaises(ValueError):
+                forest.remove_road(u, v)
+            with self.assertRaises(ValueError):
+                forest.update_weight(u, v, 7)
+        self.assertEqual((forest.roads, forest.seal_undone_roads, forest.solulus), before)
+
+    def test_attributes_and_iterators(self):
+        roads = [(0, 1, 4), (1, 2, 3), (2, 0, 1)]
+        solulus = [(0, 5, 2)]
+        for forest in (TreeMap(roads, solulus), TreeMap(iter(roads), iter(solulus))):
+            self.assertEqual(forest.roads, roads)
+            self.assertEqual(forest.seal_undone_roads, [(3, 4, 4), (4, 5, 3), (5, 3, 1)])
+            self.assertEqual(forest.solulus, [(0, 5, 5)])
+            self.assertEqual(forest.escape(1, [1]), (14, [1, 2, 0, 2, 0, 1]))
+
+
+class CompactTreeMapTest(EscapeTestCase):
+
+    def test_escape(self):
+        rnd = random.Random(6)
+        for _ in range(30):
+            trees_count = rnd.randint(2, 25)
+            roads, solulus = random_forest(rnd, trees_count, rnd.randint(1, 60), rnd.randint(0, 5))
+            forest = CompactTreeMap(roads, solulus)
+            for start, exits in self.queries(rnd, trees_count):
+                self.check_result(roads, solulus, trees_count, start, exits, forest.escape(start, exits))
+
+
+class FilesTest(EscapeTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_edge_lists_and_snapshots(self):
+        rnd = random.Random(7)
+        for binary in (False, True):
+            trees_count = 20
+            roads, solulus = random_forest(rnd, trees_count, 50, 4)
+            for name, entries in (("roads", roads), ("solulus", solulus)):
+                edges = EdgeList()
+                for entry in entries:
+                    edges.append(*entry)
+                edges.write(self.path(name), binary)
+                self.assertEqual(list(EdgeList.read(self.path(name), binary, chunk_size=7)), entries)
+
+            forests = [TreeMap.from_files(self.path("roads"), self.path("solulus"), binary, chunk_size=5),
+                       CompactTreeMap.from_files(self.path("roads"), self.path("solulus"), binary)]
+            forests[0].save_snapshot(self.path("tree.snapshot"))
+            forests[1].save_snapshot(self.path("compact.snapshot"))
+            forests += [TreeMap.load_snapshot(self.path("compact.snapshot")),
+                        CompactTreeMap.load_snapshot(self.path("tree.snapshot"))]
+            for start, exits in self.queries(rnd, trees_count):
+                for forest in forests:
+                    self.check_result(roads, solulus, trees_count, start, exits, forest.escape(start, exits))
+
+    def test_bad_lines(self):
+        for text, line in ((b"0 1 5\n1 2\n3 4 5 6\n", 2), (b"0 1 5\n\n1 2 x\n", 3), (b"0 1 5 6\n", 1), (b"0 1 5\n1 2 3\n4 5", 3)):
+            with open(self.path("roads"), "wb") as out_file:
+                out_file.write(text)
+            for chunk_size in (3, 1 << 20):
+                with self.assertRaisesRegex(ValueError, f"line {line}:"):
+                    EdgeList.read(self.path("roads"), chunk_size=chunk_size)
+        with open(self.path("roads"), "wb") as out_file:
+            out_file.write(b"0 1 5\r\n\n  \n-1 +2 3")
+        self.assertEqual(list(EdgeList.read(self.path("roads"), chunk_size=4)), [(0, 1, 5), (-1, 2, 3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
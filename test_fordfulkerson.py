@@ -0,0 +1,160 @@
+import random
+import unittest
+from collections import deque
+
+from fordfulkerson import MAX_FLOW_ENGINES, FlowNetwork, maxThroughput
+
+
+def edmonds_karp(total_vertices, edges, source, sink):
+    """
+    Reference maximum flow: shortest augmenting paths on a capacity matrix.
+    """
+    capacity = [[0] * total_vertices for _ in range(total_vertices)]
+    for u, v, c in edges:
+        capacity[u][v] += c
+    flow = 0
+    while True:
+        previous = [-1] * total_vertices
+        previous[source] = source
+        queue = deque([source])
+        while queue and previous[sink] == -1:
+            u = queue.popleft()
+            for v in range(total_vertices):
+                if previous[v] == -1 and capacity[u][v] > 0:
+                    previous[v] = u
+                    queue.append(v)
+        if previous[sink] == -1:
+            return flow
+        bottleneck = float("inf")
+        v = sink
+        while v != source:
+            bottleneck = min(bottleneck, capacity[previous[v]][v])
+            v = previous[v]
+        v = sink
+        while v != source:
+            capacity[previous[v]][v] -= bottleneck
+            capacity[v][previous[v]] += bottleneck
+            v = previous[v]
+        flow += bottleneck
+
+
+def reference_throughput(connections, max_in, max_out, origin, targets):
+    """
+    maxThroughput by Edmonds-Karp on the split network: in(i) = 3i, mid(i) = 3i + 1, out(i) = 3i + 2, super sink 3N.
+    """
+    N = len(max_in)
+    edges = [(3 * u + 2, 3 * v, c) for u, v, c in connections]
+    for i in range(N):
+        edges += [(3 * i, 3 * i + 1, max_in[i]), (3 * i + 1, 3 * i + 2, max_out[i])]
+    edges += [(3 * t, 3 * N, max_in[t]) for t in targets]
+    return edmonds_karp(3 * N + 1, edges, 3 * origin + 1, 3 * N)
+
+
+def random_network(rnd, N, connections_count, high=50):
+    connections = [(rnd.randrange(N), rnd.randrange(N), rnd.randint(0, high)) for _ in range(connections_count)]
+    max_in = [rnd.randint(0, 2 * high) for _ in range(N)]
+    max_out = [rnd.randint(0, 2 * high) for _ in range(N)]
+    origin = rnd.randrange(N)
+    targets = rnd.sample([i for i in range(N) if i != origin], rnd.randint(1, min(3, N - 1)))
+    return connections, max_in, max_out, origin, targets
+
+
+class MaxFlowEngineTest(unittest.TestCase):
+
+    def test_engines_match_edmonds_karp(self):
+        rnd = random.Random(1)
+        for _ in range(200):
+            total_vertices = rnd.randint(2, 12)
+            edges = [(rnd.randrange(total_vertices), rnd.randrange(total_vertices), rnd.randint(0, 30))
+                     for _ in range(rnd.randint(0, 40))]
+            source, sink = rnd.sample(range(total_vertices), 2)
+            expected = edmonds_karp(total_vertices, edges, source, sink)
+            for name, engine in MAX_FLOW_ENGINES.items():
+                self.assertEqual(engine(total_vertices, edges, source, sink), expected, name)
+
+    def test_max_throughput(self):
+        rnd = random.Random(2)
+        for _ in range(100):
+            network = random_network(rnd, rnd.randint(2, 10), rnd.randint(0, 30))
+            expected = reference_throughput(*network)
+            for engine in MAX_FLOW_ENGINES:
+                self.assertEqual(maxThroughput(*network, engine=engine), expected, engine)
+        with self.assertRaises(ValueError):
+            maxThroughput(*network, engine="simplex")
+
+    def test_sample(self):
+        # The network from the module's __main__ block, whose throughput before the rewrite was 556
+        connections = [(9, 7, 386), (10, 22, 274), (2, 13, 285), (23, 17, 460), (7, 2, 500), (17, 10, 241), (0, 17, 187), (1, 5, 210), (4, 30, 168), (17, 28, 237), (20, 0, 156), (12, 6, 165), (13, 21, 302), (27, 1, 184), (15, 8, 189), (22, 11, 260), (22, 19, 99), (24, 12, 108), (11, 1, 493), (7, 17, 93), (19, 21, 374), (26, 5, 126), (23, 26, 296), (18, 7, 217), (32, 23, 483), (21, 24, 414), (6, 2, 491), (14, 27, 101), (7, 4, 314), (24, 28, 154), (11, 19, 408), (12, 8, 248), (11, 12, 433), (16, 15, 351), (8, 30, 429), (16, 23, 398), (9, 8, 334), (4, 27, 120), (29, 23, 159), (16, 12, 214), (30, 20, 472), (7, 23, 476), (20, 24, 92), (0, 16, 175), (17, 26, 419), (27, 11, 75), (22, 15, 92), (3, 0, 361), (8, 7, 112), (6, 32, 228), (18, 8, 396), (7, 24, 205), (18, 23, 458), (24, 22, 99), (4, 12, 335), (2, 20, 172), (22, 24, 79), (29, 2, 278), (18, 3, 173), (23, 15, 94), (5, 20, 500), (20, 26, 295), (18, 12, 313), (14, 25, 134), (13, 31, 298), (9, 16, 342), (31, 1, 367), (11, 29, 382), (29, 22, 203), (13, 6, 390), (31, 19, 134), (17, 1, 216), (21, 11, 470), (1, 23, 102), (28, 29, 142), (19, 22, 178), (9, 4, 473), (27, 30, 479), (0, 27, 196), (15, 13, 377), (4, 7, 489), (20, 16, 359), (27, 2, 444), (13, 4, 319), (6, 25, 347), (26, 23, 254), (8, 5, 422), (1, 32, 317), (4, 6, 382), (7, 32, 144), (9, 22, 145), (20, 11, 200), (27, 13, 367), (32, 6, 79), (26, 25, 153), (1, 0, 205), (11, 7, 422), (20, 32, 314), (8, 10, 466), (9, 31, 486), (5, 14, 420), (29, 25, 297), (20, 5, 162), (21, 23, 192), (0, 21, 169), (1, 17, 196), (9, 17, 297), (24, 0, 491), (2, 5, 240), (29, 7, 403), (6, 8, 413), (30, 24, 173), (25, 32, 278), (5, 7, 437)]
+        maxIn = [523, 903, 696, 663, 624, 872, 713, 747, 828, 828, 560, 761, 889, 712, 500, 595, 561, 752, 540, 543, 581, 879, 918, 550, 520, 899, 925, 578, 660, 763, 873, 634, 605]
+        maxOut = [501, 581, 708, 643, 746, 680, 685, 696, 682, 589, 743, 597, 527, 674, 563, 705, 556, 536, 762, 706, 720, 741, 576, 779, 545, 558, 640, 687, 719, 743, 712, 750, 679]
+        self.assertEqual(reference_throughput(connections, maxIn, maxOut, 16, [32, 22, 2, 26]), 556)
+        for engine in MAX_FLOW_ENGINES:
+            self.assertEqual(maxThroughput(connections, maxIn, maxOut, 16, [32, 22, 2, 26], engine), 556)
+
+
+class FlowNetworkTest(unittest.TestCase):
+
+    def check_flow(self, network):
+        # Capacities hold and every vertex but the source and sink passes on what it receives
+        graph = network.residual_network
+        balance = [0] * graph.num_vertices
+        for e in range(0, len(graph.head), 2):
+            flow = graph.flow(e)
+            self.assertTrue(0 <= flow <= graph.capacity[e])
+            balance[graph.head[e]] += flow
+            balance[graph.head[e ^ 1]] -= flow
+        self.assertEqual(balance[network.sink], network.throughput)
+        self.assertEqual(balance[network.source], -network.throughput)
+        for vertex, value in enumerate(balance):
+            if vertex not in (network.source, network.sink):
+                self.assertEqual(value, 0)
+
+    def test_changes_match_full_solve(self):
+        rnd = random.Random(3)
+        for _ in range(40):
+            N = rnd.randint(2, 8)
+            connections, max_in, max_out, origin, targets = random_network(rnd, N, rnd.randint(1, 20))
+            network = FlowNetwork(connections, max_in, max_out, origin, targets)
+            capacities = {}
+            for u, v, c in connections:
+                capacities[(u, v)] = capacities.get((u, v), 0) + c
+
+            for _ in range(25):
+                operation = rnd.random()
+                if operation < 0.25:
+                    (u, v), amount = rnd.choice(sorted(capacities)), rnd.randint(0, 40)
+                    capacities[(u, v)] += amount
+                    result = network.increase_capacity(u, v, amount)
+                elif operation < 0.5:
+                    u, v = rnd.choice(sorted(capacities))
+                    amount = rnd.randint(0, capacities[(u, v)])
+                    capacities[(u, v)] -= amount
+                    result = network.decrease_capacity(u, v, amount)
+                elif operation < 0.65:
+                    u, v, amount = rnd.randrange(N), rnd.randrange(N), rnd.randint(0, 40)
+                    capacities[(u, v)] = capacities.get((u, v), 0) + amount
+                    result = network.add_connection(u, v, amount)
+                elif operation < 0.8:
+                    i = rnd.randrange(N)
+                    max_in[i] = rnd.randint(0, 100)
+                    result = network.set_max_in(i, max_in[i])
+                else:
+                    i = rnd.randrange(N)
+                    max_out[i] = rnd.randint(0, 100)
+                    result = network.set_max_out(i, max_out[i])
+
+                expected = reference_throughput([(u, v, c) for (u, v), c in capacities.items()], max_in, max_out, origin, targets)
+                self.assertEqual(result, expected)
+                self.assertEqual(network.throughput, expected)
+                self.check_flow(network)
+
+    def test_unknown_connection(self):
+        network = FlowNetwork([(0, 1, 5)], [10, 10], [10, 10], 0, [1])
+        with self.assertRaises(ValueError):
+            network.increase_capacity(1, 0, 3)
+        with self.assertRaises(ValueError):
+            network.decrease_capacity(1, 0, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()